@@ -0,0 +1,61 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+compares two results of benchmarks/run.py: the mean time per sentence of each extractor and of the collectors
+in the old and in the new results, and their ratio (new / old, so below 1 is faster)
+
+USAGE:
+python3 -m benchmarks.compare before.json after.json
+python3 -m benchmarks.compare before.json after.json --threshold 0.1
+-- only the rows that changed by more than 10%
+'''
+import sys
+import json
+import argparse
+
+
+# (tree, lang, name) -> us per sentence for the extractors, the counters of the engine and the collectors
+def timings(results):
+	res = {}
+	for code, langs in results['extractors'].items():
+		for lang, lang_res in langs.items():
+			for name, timing in lang_res['extractors'].items():
+				res[(code, lang, name)] = timing['us_per_sentence']
+			for name, timing in lang_res.get('engine', {}).items():
+				res[(code, lang, 'engine:' + name)] = timing['us_per_sentence']
+	for code, timing in results['end_to_end'].items():
+		res[(code, '*', 'collector')] = timing['us_per_sentence']
+	return res
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('old', help="JSON of benchmarks/run.py")
+	parser.add_argument('new', help="JSON of benchmarks/run.py")
+	parser.add_argument('--threshold', default=0.0, type=float, help="Show only the changes larger than this share")
+	args = parser.parse_args()
+
+	with open(args.old) as f:
+		old = json.load(f)
+	with open(args.new) as f:
+		new = json.load(f)
+	if old['settings'] != new['settings']:
+		print('Warning: the results were measured with different settings', file=sys.stderr)
+	print('old: %s %s' % (old['commit'], old['date']))
+	print('new: %s %s' % (new['commit'], new['date']))
+
+	old_times, new_times = timings(old), timings(new)
+	rows = []
+	for key in sorted(set(old_times) & set(new_times)):
+		if not old_times[key] and not new_times[key]:
+			continue  # a counter without matches in the corpus
+		ratio = new_times[key] / old_times[key] if old_times[key] else float('nan')
+		if abs(ratio - 1) >= args.threshold or ratio != ratio:
+			rows.append(key + (old_times[key], new_times[key], ratio))
+	rows.sort(key=lambda row: row[-1] if row[-1] == row[-1] else 0.0)
+	print('%-6s %-4s %-28s %12s %12s %7s' % ('tree', 'lang', 'extractor', 'old us/sent', 'new us/sent', 'ratio'))
+	for code, lang, name, old_us, new_us, ratio in rows:
+		print('%-6s %-4s %-28s %12.2f %12.2f %7.2f' % (code, lang, name, old_us, new_us, ratio))
+	for key in sorted(set(old_times) ^ set(new_times)):
+		print('%s %s %s is only in the %s results' % (key + ('old' if key in old_times else 'new',)))
@@ -0,0 +1,70 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+memory of a parsed corpus in the representations of extractors.py and helpfunctions.py, measured with tracemalloc
+(NumPy reports its arrays to it) and printed as JSON:
+- tuples: the lists of word tuples of get_trees for all documents
+- indexed: the sentences as mega_collector.py reads them for all the counters (children index and FEATS bitmasks)
+- arrays: CorpusArrays of the same documents (corpus_arrays), with its vocabularies
+it is run by benchmarks/run.py in a process of its own (the modules are those of this folder)
+
+USAGE:
+python3 -m benchmarks.corpus_memory --corpus /your/path/preprocessed --encoding ISO-8859-1
+'''
+import os, sys
+import gc
+import json
+import argparse
+import tracemalloc
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def corpus_paths(corpus):
+	paths = []
+	for subdir, dirs, files in os.walk(corpus):
+		paths += [subdir + os.sep + file for file in sorted(files) if file.endswith('.conllu')]
+	return paths
+
+
+# bytes held by the result of build() after it returns (the memory of reading is not counted)
+def held_bytes(build):
+	gc.collect()
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	res = build()
+	held = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+	return res, held
+
+
+def corpus_memory(corpus, encoding='ISO-8859-1'):
+	sys.path.insert(0, repo)
+	from helpfunctions import read_trees, conllu_arrays
+	paths = corpus_paths(corpus)
+
+	def read_all(**options):
+		docs = []
+		for path in paths:
+			with open(path, encoding=encoding) as f:
+				docs.append(list(read_trees(f, **options)))
+		return docs
+
+	docs, tuples = held_bytes(read_all)  # as get_trees
+	tokens = sum(len(tree) for doc in docs for tree in doc)
+	del docs
+	docs, indexed = held_bytes(lambda: read_all(indexed=True, parse_feats=True))
+	del docs
+	arrays, arrays_bytes = held_bytes(lambda: conllu_arrays(paths, encoding))
+	return {'docs': len(paths), 'tokens': tokens, 'tuples': tuples, 'indexed': indexed, 'arrays': arrays_bytes,
+	        'arrays_nbytes': arrays.nbytes, 'arrays_share': arrays_bytes / tuples if tuples else 0.0}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--corpus', required=True, help="Folder with korp/status/lang/*.conllu")
+	parser.add_argument('--encoding', default='ISO-8859-1', help="Encoding of the documents (as in mega_collector.py)")
+	args = parser.parse_args()
+
+	json.dump(corpus_memory(args.corpus, args.encoding), sys.stdout, indent=1, sort_keys=True)
@@ -0,0 +1,279 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+checks that the extraction of this tree reproduces the reference numbers on a sample of a parsed corpus:
+- side by side: the features of each document from the reference extractors and from the candidate
+(see feature_values.py) are compared within a tolerance; for each feature that diverges, the first document where
+it diverges is computed again sentence by sentence (on the prefixes of the document) to find the first sentence
+with a different value
+- golden: the candidate features are compared with published tables (our45features_extracted.tsv,
+alter translationese45/testversion.tsv) for the documents of the sample that are in them
+(by afile, alang, akorp, astatus, from the names of the file and of its folders: korp/status/lang/afile.conllu)
+- kernel: the counts of the vectorized kernel (kernel_counts in extractors.py) are compared with the raw counts
+of the engine of the candidate for each document; comp and sup of the kernel miss the analytical forms (more/most,
+наиболее/самый) and may only be lower, and the features the kernel leaves to the tree (-1) are not compared
+the reference is the first commit of the repository (exported with git archive) unless --reference is given;
+the exit status is 1 if anything diverges, so the check can be run after each change of the extractors
+with --synthetic, the documents are a synthetic corpus of en, de, ru (see synthetic.py) and the reference is the
+candidate itself: the engine of compile_rules is checked against the extractors its rules were copied from
+(benchmarks/run.py runs this check on its corpus)
+
+USAGE (from the root of the repository):
+python3 -m benchmarks.equivalence --synthetic
+python3 -m benchmarks.equivalence --corpus /your/path/preprocessed --sample 20 --golden our45features_extracted.tsv
+python3 -m benchmarks.equivalence --corpus /your/path/pivot --reference "alter translationese45" --encoding utf-8 \
+--golden "alter translationese45/testversion.tsv" --report equivalence.json
+'''
+import os, sys
+import csv
+import json
+import math
+import random
+import shutil
+import argparse
+import tempfile
+import atexit
+import subprocess
+from benchmarks.feature_values import repo
+from benchmarks.synthetic import generate
+
+meta = ['afile', 'alang', 'akorp', 'astatus']
+
+
+# the documents of the corpus, and at most sample of them from each folder (a language of a subcorpus)
+def sample_docs(corpus, sample=None, seed=1):
+	rng = random.Random(seed)
+	paths = []
+	for subdir, dirs, files in sorted(os.walk(corpus)):
+		docs = [os.path.join(subdir, f) for f in sorted(files) if f.endswith('.conllu')]
+		if sample is not None and len(docs) > sample:
+			docs = sorted(rng.sample(docs, sample))
+		paths += docs
+	return paths
+
+
+def doc_key(path):
+	folders = os.path.abspath(path).split(os.sep)
+	return os.path.splitext(folders[-1])[0], folders[-2], folders[-4], folders[-3]  # afile alang akorp astatus
+
+
+# the tree of the code at a revision, in a temporary folder
+def export_revision(rev):
+	folder = tempfile.mkdtemp(prefix='reference_')
+	archive = subprocess.Popen(['git', 'archive', rev], cwd=repo, stdout=subprocess.PIPE)
+	subprocess.check_call(['tar', '-x', '-C', folder], stdin=archive.stdout)
+	if archive.wait():
+		raise RuntimeError('git archive %s failed' % rev)
+	return folder
+
+
+def first_commit():
+	return subprocess.check_output(['git', 'rev-list', '--max-parents=0', 'HEAD'], cwd=repo).decode().split()[0]
+
+
+def run_values(impl, path, paths, args, prefixes=False):
+	with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+		f.write('\n'.join(paths) + '\n')
+	command = [sys.executable, '-m', 'benchmarks.feature_values', '--impl', impl, '--path', path, '--docs', f.name,
+	           '--encoding', args.encoding]
+	lists = args.reference_lists if impl == 'reference' else args.candidate_lists
+	if lists:
+		command += ['--lists', lists]
+	if prefixes:
+		command.append('--prefixes')
+	try:
+		return json.loads(subprocess.check_output(command, cwd=repo).decode())
+	finally:
+		os.remove(f.name)
+
+
+def same(a, b, rtol, atol):
+	if isinstance(a, str) or isinstance(b, str):
+		return a == b
+	if a != a and b != b:  # NaN in both
+		return True
+	return math.isclose(a, b, rel_tol=rtol, abs_tol=atol)
+
+
+# the features (of those in both) whose values differ; an error of one side is a difference in '*'
+def differences(ref, cand, rtol, atol):
+	if 'error' in ref or 'error' in cand:
+		return [] if ref.get('error') == cand.get('error') else ['*']
+	return [k for k in sorted(set(ref) & set(cand)) if not same(ref[k], cand[k], rtol, atol)]
+
+
+# the first prefix (1-based number of sentences) where the feature differs, with the values of both sides;
+# the prefixes where one side fails (e.g. a division by zero in a short prefix) are skipped
+def first_sentence(feature, ref_prefixes, cand_prefixes, rtol, atol):
+	for k, (ref, cand) in enumerate(zip(ref_prefixes, cand_prefixes)):
+		if 'error' in ref or 'error' in cand:
+			continue
+		if feature == '*' or not same(ref.get(feature), cand.get(feature), rtol, atol):
+			return k + 1, ref.get(feature), cand.get(feature)
+	return None
+
+
+# the kernel features that miss some words of the engine, and may only be lower
+kernel_below = ('comp', 'sup')
+
+
+# {feature: {'docs': number of differences, 'first': the first one}} of the kernel against the engine
+def compare_kernel(kernel, engine):
+	features = {}
+	for doc, counts in sorted(kernel.items()):
+		if 'error' in engine[doc]:
+			continue
+		for feature, value in sorted(counts.items()):
+			if value == -1 or feature not in engine[doc]:
+				continue
+			expected = engine[doc][feature]
+			if value > expected if feature in kernel_below else value != expected:
+				entry = features.setdefault(feature, {'docs': 0, 'first': {
+					'doc': doc, 'engine': expected, 'kernel': value}})
+				entry['docs'] += 1
+	return features
+
+
+def read_golden(path):
+	with open(path, newline='', encoding='utf-8') as f:
+		rows = list(csv.DictReader(f, delimiter='\t'))
+	return {tuple(row[k] for k in meta): row for row in rows}
+
+
+# golden table -> {'docs': compared, 'missing': docs of the sample not in it, 'columns': not in the candidate,
+# 'features': {feature: {'docs': number of differences, 'first': the first one}}}
+def compare_golden(path, candidate, rtol, atol):
+	golden = read_golden(path)
+	report = {'docs': 0, 'missing': 0, 'columns': [], 'features': {}}
+	for doc, values in sorted(candidate.items()):
+		row = golden.get(doc_key(doc))
+		if row is None:
+			report['missing'] += 1
+			continue
+		report['docs'] += 1
+		if 'error' in values:
+			report['features'].setdefault('*', {'docs': 0, 'first': {'doc': doc, 'candidate': values['error']}})
+			report['features']['*']['docs'] += 1
+			continue
+		report['columns'] = sorted(set(row) - set(values) - set(meta))
+		for feature in sorted(set(row) & set(values)):
+			if not same(float(row[feature]), values[feature], rtol, atol):
+				entry = report['features'].setdefault(feature, {'docs': 0, 'first': {
+					'doc': doc, 'golden': float(row[feature]), 'candidate': values[feature]}})
+				entry['docs'] += 1
+	return report
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--corpus', default=None, help="Path to the tree of folders with *.conllu: korp/status/lang/")
+	parser.add_argument('--synthetic', action='store_true',
+	                    help="Check the candidate against its own extractors on a synthetic corpus instead of --corpus")
+	parser.add_argument('--sample', default=None, type=int, help="Number of documents per folder (all by default)")
+	parser.add_argument('--seed', default=1, type=int)
+	parser.add_argument('--reference', default=None,
+	                    help="Folder of the tree of the code with the reference extractors, e.g. 'alter translationese45'")
+	parser.add_argument('--reference-rev', default=None,
+	                    help="Git revision with the reference extractors (the first commit by default)")
+	parser.add_argument('--candidate', default=repo, help="Folder of the tree of the code with mega_collector.py to check")
+	parser.add_argument('--reference-lists', default=None, help="Searchlists of the reference (its searchlists/ by default)")
+	parser.add_argument('--candidate-lists', default=None, help="Searchlists of the candidate (its searchlists/ by default)")
+	parser.add_argument('--encoding', default='ISO-8859-1', help="Encoding of the documents")
+	parser.add_argument('--golden', nargs='+', default=[], help="Published tables to compare the candidate with")
+	parser.add_argument('--no-reference', action='store_true', help="Compare only with the golden tables")
+	parser.add_argument('--no-kernel', action='store_true', help="Do not compare the vectorized kernel with the engine")
+	parser.add_argument('--rtol', default=1e-6, type=float, help="Relative tolerance of the comparison of the values")
+	parser.add_argument('--atol', default=1e-9, type=float, help="Absolute tolerance of the comparison of the values")
+	parser.add_argument('--report', default=None, help="Path to a JSON with the full report")
+	args = parser.parse_args()
+
+	if args.synthetic:
+		args.corpus = tempfile.mkdtemp(prefix='equivalence_')
+		atexit.register(shutil.rmtree, args.corpus)
+		generate(args.corpus, ['en', 'de', 'ru'], docs=5, sents=40, seed=args.seed)
+		args.encoding = 'utf-8'
+		if not args.reference and not args.reference_rev:
+			args.reference = args.candidate
+	elif not args.corpus:
+		parser.error('--corpus or --synthetic is required')
+
+	paths = sample_docs(args.corpus, args.sample, args.seed)
+	if not paths:
+		parser.error('no *.conllu in %s' % args.corpus)
+	print('%s documents in the sample' % len(paths), file=sys.stderr)
+	candidate_path = os.path.abspath(args.candidate)
+	candidate = run_values('candidate', candidate_path, paths, args)
+	report = {'docs': len(paths), 'reference': None, 'side_by_side': {}, 'golden': {}, 'kernel': {}}
+	diverged = False
+
+	if not args.no_kernel:
+		report['kernel'] = compare_kernel(run_values('kernel', candidate_path, paths, args),
+		                                  run_values('engine', candidate_path, paths, args))
+		print('kernel: counts of %s documents compared with the engine' % len(paths), file=sys.stderr)
+		for feature, entry in sorted(report['kernel'].items()):
+			diverged = True
+			print('    %s differs in %s documents; first: %s' % (feature, entry['docs'], entry['first']), file=sys.stderr)
+
+	if not args.no_reference:
+		exported = None
+		if args.reference:
+			reference_path = os.path.abspath(args.reference)
+			report['reference'] = reference_path
+		else:
+			rev = args.reference_rev or first_commit()
+			reference_path = exported = export_revision(rev)
+			report['reference'] = rev
+		try:
+			reference = run_values('reference', reference_path, paths, args)
+			features = {}
+			for doc in paths:
+				for feature in differences(reference[doc], candidate[doc], args.rtol, args.atol):
+					entry = features.setdefault(feature, {'docs': 0, 'first': {
+						'doc': doc, 'reference': reference[doc].get(feature, reference[doc].get('error')),
+						'candidate': candidate[doc].get(feature, candidate[doc].get('error'))}})
+					entry['docs'] += 1
+			# the first divergent sentence of each feature, in the first document where the feature diverges
+			firsts = sorted({entry['first']['doc'] for entry in features.values()})
+			if firsts:
+				ref_prefixes = run_values('reference', reference_path, firsts, args, prefixes=True)
+				cand_prefixes = run_values('candidate', candidate_path, firsts, args, prefixes=True)
+				for feature, entry in features.items():
+					doc = entry['first']['doc']
+					found = first_sentence(feature, ref_prefixes[doc]['prefixes'], cand_prefixes[doc]['prefixes'],
+					                       args.rtol, args.atol)
+					if found:
+						k, ref_value, cand_value = found
+						entry['first']['sentence'] = {'number': k, 'text': ref_prefixes[doc]['texts'][k - 1],
+						                              'reference': ref_value, 'candidate': cand_value}
+			report['side_by_side'] = features
+		finally:
+			if exported:
+				shutil.rmtree(exported)
+
+		compared = len(set().union(*[set(v) - {'error'} for v in candidate.values()]))
+		print('reference %s: %s features of %s documents compared' % (report['reference'], compared, len(paths)),
+		      file=sys.stderr)
+		for feature, entry in sorted(report['side_by_side'].items()):
+			diverged = True
+			first = entry['first']
+			print('%s differs in %s documents; first in %s: reference %s, candidate %s'
+			      % (feature, entry['docs'], first['doc'], first['reference'], first['candidate']), file=sys.stderr)
+			if 'sentence' in first:
+				print('    from sentence %s: %s' % (first['sentence']['number'], first['sentence']['text']), file=sys.stderr)
+
+	for path in args.golden:
+		golden = report['golden'][path] = compare_golden(path, candidate, args.rtol, args.atol)
+		print('%s: %s documents compared, %s of the sample not in the table' % (path, golden['docs'], golden['missing']),
+		      file=sys.stderr)
+		if golden['columns']:
+			print('    columns without a candidate feature: %s' % ' '.join(golden['columns']), file=sys.stderr)
+		for feature, entry in sorted(golden['features'].items()):
+			diverged = True
+			print('    %s differs in %s documents; first: %s' % (feature, entry['docs'], entry['first']), file=sys.stderr)
+
+	if args.report:
+		with open(args.report, 'w') as f:
+			json.dump(report, f, indent=1, sort_keys=True)
+	print('DIVERGED' if diverged else 'EQUIVALENT', file=sys.stderr)
+	sys.exit(1 if diverged else 0)
@@ -0,0 +1,202 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+times each extractor of one of the two trees of the code on a parsed corpus and prints the results as JSON;
+it is run by benchmarks/run.py in a process of its own for each tree, because both trees have an extractors.py
+and a helpfunctions.py of the same name
+- root: extractors.py of this folder for en, de, ru; also the counters of the engine (see timed_rules),
+and the vectorized kernel: corpus_arrays (reading the documents into CorpusArrays) and kernel_counts
+- new: neuer Code/UD_features_en-es/get_feats/extraction/extractors.py for en, es
+
+USAGE:
+python3 -m benchmarks.extractor_times --tree root --corpus /tmp/synthetic --langs en de ru
+'''
+import os, sys
+import json
+import argparse
+from time import perf_counter
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+code_trees = {'root': {'path': repo, 'lists': repo + '/searchlists/', 'langs': ['en', 'de', 'ru']},
+         'new': {'path': repo + '/neuer Code/UD_features_en-es/get_feats/extraction',
+                 'lists': repo + '/neuer Code/UD_features_en-es/get_feats/extraction/searchlists/', 'langs': ['en', 'es']}}
+
+## the extractors of each tree with their arguments: tree (a sentence) or trees (all sentences of a document),
+## lang and the names of the support data (see supports_root, supports_new)
+root_extractors = [
+	('av_s_length', ('trees', 'lang')), ('prsp', ('tree', 'lang')), ('possdet', ('tree', 'lang')),
+	('anysome', ('tree', 'lang')), ('cconj', ('tree', 'lang')), ('sconj', ('tree', 'lang')), ('whconj', ('tree', 'lang')),
+	('relativ', ('tree', 'lang')), ('word_length', ('tree',)), ('copulas', ('tree',)), ('interrog', ('tree', 'lang')),
+	('nn', ('tree', 'lang')), ('attrib', ('tree',)), ('pasttense', ('tree',)), ('tree_depths', ('tree',)),
+	('speakdiff', ('tree',)), ('readerdiff', ('tree',)), ('lex_ty_to', ('tree', 'lang')),
+	('modpred', ('tree', 'lang', 'mpred')), ('advquantif', ('tree', 'lang', 'madv')), ('finites', ('tree', 'lang')),
+	('infinitives', ('tree', 'lang', 'mpred')), ('participles', ('tree', 'lang')),
+	('nominals', ('trees', 'lang', 'stop', 'deverbs')), ('passives', ('tree', 'lang')),
+	('count_all_dms', ('automata', 'trees', 'lang')), ('get_epistemic_stance', ('trees', 'lang')),
+	('and_or_counts', ('trees', 'lang')), ('but_counts', ('trees', 'lang')), ('comparison_degrees', ('trees', 'lang')),
+	('polarity', ('trees', 'lang')), ('sents_complexity', ('trees',)), ('demdeterm', ('trees', 'lang')),
+	('nouns_to_all', ('trees',)), ('ud_probabilities', ('trees', 'lang')), ('fused_counts', ('trees', 'rules')),
+]
+new_extractors = [
+	('av_s_length', ('trees', 'lang')), ('word_length', ('tree',)), ('interrog', ('tree',)), ('nn', ('tree',)),
+	('tree_depths', ('tree',)), ('speakdiff', ('tree',)), ('readerdiff', ('tree',)), ('content_ty_to', ('tree',)),
+	('finites', ('tree',)), ('attrib', ('tree',)), ('pasttense', ('tree',)), ('count_all_dms', ('automata', 'trees', 'lang')),
+	('get_epistemic_stance', ('trees', 'lang')), ('relation_histogram', ('trees', 'hist_columns')),
+	('sents_complexity', ('trees',)), ('ud_freqs', ('trees', 'udrels')), ('ud_probabilities', ('trees', 'udrels')),
+	('nouns_to_all', ('trees',)), ('prsp', ('tree', 'lang')), ('possdet', ('tree', 'lang')), ('anysome', ('tree', 'lang')),
+	('cconj', ('tree', 'lang')), ('sconj', ('tree', 'lang')), ('polarity', ('tree', 'lang')), ('copulas', ('tree',)),
+	('demdeterm', ('tree', 'lang')), ('propn', ('tree',)), ('preps', ('tree', 'lang')),
+]
+
+
+# the documents of a language: {lang: [path]} from corpus/korp/status/lang/*.conllu
+def corpus_docs(corpus, langs):
+	docs = {}
+	for subdir, dirs, files in os.walk(corpus):
+		lang = os.path.basename(subdir)
+		if lang in langs:
+			docs.setdefault(lang, []).extend(os.path.join(subdir, f) for f in sorted(files) if f.endswith('.conllu'))
+	return docs
+
+
+def supports_root(langs):
+	import helpfunctions
+	helpfunctions.lists_path = code_trees['root']['lists']
+	import extractors
+	supports = {'mpred': {}, 'madv': {}, 'stop': {}, 'deverbs': {}, 'automata': {}, 'rules': {}}
+	for lang in langs:
+		madv, mpred, stop, deverbs = extractors.support_all_lang(lang)
+		supports['madv'][lang], supports['mpred'][lang] = madv, mpred
+		supports['stop'][lang], supports['deverbs'][lang] = stop, deverbs
+		supports['automata'][lang] = extractors.dms_automaton(dict(zip(
+			['addit', 'advers', 'caus', 'tempseq', 'epist'], extractors.dms_support_all_langs(lang))))
+	for lang in langs:
+		supports['rules'][lang] = extractors.compile_rules(lang, supports['mpred'], supports['madv'], supports['stop'],
+		                                                   supports['deverbs'])
+
+	# the sentences as mega_collector.py reads them for all the counters
+	def read(f):
+		return list(extractors.read_trees(f, indexed=True, parse_feats=True))
+
+	return extractors, read, supports
+
+
+def supports_new(langs):
+	import helpfunctions
+	import extractors
+	import new_mega_collector
+	supports = {'automata': {}, 'udrels': new_mega_collector.all_udrels,
+	            'hist_columns': new_mega_collector.hist_columns}
+	for lang in langs:
+		addit, advers, caus, seque, epist = helpfunctions.dms_support_all_langs(lang, lists_path=code_trees['new']['lists'])
+		supports['automata'][lang] = helpfunctions.dms_automaton({'addit': addit, 'advers': advers, 'caus': caus,
+		                                                           'tempseq': seque, 'epist': epist})
+
+	def read(f):
+		return list(helpfunctions.read_trees(f, minlen=2))
+
+	return extractors, read, supports
+
+
+# best of repeat runs of func over the documents: {'seconds', 'calls', 'errors'};
+# errors are the calls that raised (some extractors divide by counts that are zero in a document)
+def time_calls(func, args_list, repeat):
+	best = None
+	for _ in range(repeat):
+		errors = 0
+		start = perf_counter()
+		for args in args_list:
+			try:
+				func(*args)
+			except Exception:
+				errors += 1
+		seconds = perf_counter() - start
+		if best is None or seconds < best:
+			best = seconds
+	return {'seconds': best, 'calls': len(args_list), 'errors': errors}
+
+
+def arguments(names, lang, supports, tree=None, trees=None):
+	res = []
+	for name in names:
+		if name == 'tree':
+			res.append(tree)
+		elif name == 'trees':
+			res.append(trees)
+		elif name == 'lang':
+			res.append(lang)
+		elif name == 'rules':
+			res.append(supports['rules'][lang])
+		else:
+			res.append(supports[name])  # the support dicts are keyed by language as in the collectors
+	return res
+
+
+def per_sentence(entry, sents):
+	entry['us_per_sentence'] = entry['seconds'] * 1e6 / sents if sents else 0.0
+	return entry
+
+
+# {lang: {'docs', 'sents', 'words', 'extractors': {name: timing}, 'engine': {counter: timing}}}
+def time_tree(code, corpus, langs, repeat=3):
+	sys.path.insert(0, code_trees[code]['path'])
+	if code == 'root':
+		extractors, read, supports = supports_root(langs)
+		table = root_extractors
+	else:
+		extractors, read, supports = supports_new(langs)
+		table = new_extractors
+
+	res = {}
+	for lang, paths in sorted(corpus_docs(corpus, langs).items()):
+		docs = []
+		for path in paths:
+			with open(path, encoding='utf-8') as f:
+				docs.append(read(f))
+		sents = sum(len(doc) for doc in docs)
+		res[lang] = {'docs': len(docs), 'sents': sents, 'words': sum(len(tree) for doc in docs for tree in doc)}
+
+		def read_all():
+			for path in paths:
+				with open(path, encoding='utf-8') as f:
+					read(f)
+
+		timings = {'read': per_sentence(time_calls(read_all, [()], repeat), sents)}
+		timings['read']['calls'] = len(paths)
+		for name, names in table:
+			if 'tree' in names:
+				args_list = [arguments(names, lang, supports, tree=tree) for doc in docs for tree in doc]
+			else:
+				args_list = [arguments(names, lang, supports, trees=doc) for doc in docs]
+			timings[name] = per_sentence(time_calls(getattr(extractors, name), args_list, repeat), sents)
+		if code == 'root':
+			# the vectorized kernel on all the documents of the language at once
+			arrays = lambda: extractors.conllu_arrays(paths, 'utf-8')
+			timings['corpus_arrays'] = per_sentence(time_calls(arrays, [()], repeat), sents)
+			corpus = arrays()
+			timings['kernel_counts'] = per_sentence(time_calls(extractors.kernel_counts, [(corpus, [lang] * len(paths))],
+			                                                   repeat), sents)
+		res[lang]['extractors'] = timings
+
+		if code == 'root':
+			# the share of each counter in fused_counts, as with mega_collector.py --profile-features
+			times = {}
+			rules = extractors.timed_rules(supports['rules'][lang], times)
+			for doc in docs:
+				extractors.fused_counts(doc, rules)
+			res[lang]['engine'] = {name: per_sentence({'seconds': seconds, 'calls': calls}, sents)
+			                       for name, (seconds, calls) in sorted(times.items())}
+	return res
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--tree', required=True, choices=sorted(code_trees))
+	parser.add_argument('--corpus', required=True, help="Folder with korp/status/lang/*.conllu")
+	parser.add_argument('--langs', nargs='+', default=None, help="Languages of the tree to time (all by default)")
+	parser.add_argument('--repeat', default=3, type=int, help="Number of runs of each extractor; the best one is kept")
+	args = parser.parse_args()
+
+	langs = [lang for lang in args.langs or code_trees[args.tree]['langs'] if lang in code_trees[args.tree]['langs']]
+	json.dump(time_tree(args.tree, args.corpus, langs, args.repeat), sys.stdout, indent=1, sort_keys=True)
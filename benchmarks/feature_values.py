@@ -0,0 +1,215 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+computes the features of documents with one implementation of the extractors and prints them as JSON;
+it is run by benchmarks/equivalence.py in a process of its own for each implementation, because the trees
+of the code have modules of the same names
+- reference: the features as the first mega_collector.py computed them, from the functions of a tree of the code
+that has them (prsp, relativ, passives, etc.): this folder, alter translationese45, or a revision exported from git
+- candidate: the features as mega_collector.py of a tree computes them now (fused_counts, count_all_dms, etc.)
+- engine: the raw counts of fused_counts (mega_collector.py of a tree) for the features of the vectorized kernel
+- kernel: the counts of kernel_counts (extractors.py of a tree) on CorpusArrays of all the documents
+with --prefixes, the features of each prefix of a document (its first 1, 2, ... sentences) are computed instead,
+to find the sentence where two implementations diverge
+
+USAGE:
+python3 -m benchmarks.feature_values --impl reference --path "alter translationese45" --encoding utf-8 --docs docs.txt
+-- docs.txt has the paths of the documents, one per line: /your/path/preprocessed/croco/pro/de/*.conllu
+'''
+import os, sys
+import json
+import argparse
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# the supports of the first mega_collector.py for the languages; ex is the module with the extractors of a tree
+def reference_supports(ex, languages):
+	supports = {name: {} for name in ('adv', 'mpred', 'pseudo_deverbs', 'vconverts',
+	                                  'additive', 'adversative', 'causal', 'sequen', 'epistem')}
+	for l in languages:
+		adv_lst, mpred_lst, pseudo_deverbs_lst, vconverts_lst = ex.support_all_lang(l)
+		supports['adv'][l] = adv_lst
+		supports['mpred'][l] = mpred_lst
+		supports['pseudo_deverbs'][l] = pseudo_deverbs_lst
+		supports['vconverts'][l] = vconverts_lst
+		additive_lst, adversative_lst, causal_lst, sequen_lst, epistem_lst = ex.dms_support_all_langs(l)
+		supports['additive'][l] = additive_lst
+		supports['adversative'][l] = adversative_lst
+		supports['causal'][l] = causal_lst
+		supports['sequen'][l] = sequen_lst
+		supports['epistem'][l] = epistem_lst
+	return supports
+
+
+## the features of a document as the loop over the documents of the first mega_collector.py computed them
+def reference_features(ex, s, sents, language):
+	normBy_wc = ex.wordcount(sents)
+	normBy_sentnum = ex.sents_num(sents, language)
+	normBy_verbnum = ex.verbs_num(sents, language)
+
+	## text-level counts
+	deverbals_res = ex.nominals(sents, language, s['pseudo_deverbs'], s['vconverts'])
+	addit_res = ex.count_dms(s['additive'], sents, language)
+	advers_res = ex.count_dms(s['adversative'], sents, language)
+	caus_res = ex.count_dms(s['causal'], sents, language)
+	tempseq_res = ex.count_dms(s['sequen'], sents, language)
+	epist_res = ex.count_dms(s['epistem'], sents, language) + ex.get_epistemic_stance(sents, language)
+	but_res = ex.but_counts(sents, language)
+	comp_res, sup_res = ex.comparison_degrees(sents, language)
+	neg_res = ex.polarity(sents, language)
+	numcls_res, simple_res = ex.sents_complexity(sents)
+	demdets_res = ex.demdeterm(sents, language)
+	nnargs_res = ex.nouns_to_all(sents)
+
+	## absolute freqs of the sentence-level extractors
+	c = dict.fromkeys(['ppron', 'possdet', 'indef', 'cconj', 'sconj', 'whconj', 'mhd', 'mdd', 'relativ', 'pied', 'correl',
+	                   'copula', 'attrib', 'pasttense', 'lex_ty', 'lex_to', 'mpred', 'mquantif', 'finites', 'infs',
+	                   'pverbals', 'bypassives', 'longpassives'], 0)
+	for sent in sents:
+		c['ppron'] += ex.prsp(sent, language)[0]
+		c['possdet'] += ex.possdet(sent, language)[0]
+		c['indef'] += ex.anysome(sent, language)[0]
+		c['cconj'] += ex.cconj(sent, language)[0]
+		c['sconj'] += ex.sconj(sent, language)[0]
+		c['whconj'] += ex.whconj(sent, language)[0]
+		mhd = ex.speakdiff(sent)
+		if mhd:
+			c['mhd'] += ex.speakdiff(sent)
+			c['mdd'] += ex.readerdiff(sent)
+		rel, _, ppiping, correlat = ex.relativ(sent, language)
+		c['relativ'] += rel
+		c['pied'] += ppiping
+		c['correl'] += correlat
+		c['copula'] += ex.copulas(sent)
+		c['attrib'] += ex.attrib(sent)[0]
+		c['pasttense'] += ex.pasttense(sent)
+		ty, to = ex.lex_ty_to(sent, language)
+		c['lex_ty'] += ty
+		c['lex_to'] += to
+		c['mpred'] += ex.modpred(sent, language, s['mpred'])[0]
+		c['mquantif'] += ex.advquantif(sent, language, s['adv'])[0]
+		c['finites'] += ex.finites(sent, language)[0]
+		c['infs'] += ex.infinitives(sent, language, s['mpred'])
+		c['pverbals'] += ex.participles(sent, language)
+		bys, nobys = ex.passives(sent, language)
+		c['bypassives'] += bys
+		c['longpassives'] += nobys
+
+	current = {'sentlength': ex.av_s_length(sents, language)}
+	## by number of words in the text
+	for feature in ('ppron', 'possdet', 'indef', 'mquantif'):
+		current[feature] = c[feature] / normBy_wc
+	current['lexdens'] = c['lex_ty'] / normBy_wc
+	current['lexTTR'] = c['lex_ty'] / c['lex_to']
+	current['demdets'] = demdets_res / normBy_wc
+	## by number of sentences
+	for feature in ('cconj', 'sconj', 'whconj', 'mpred', 'mhd', 'mdd', 'relativ', 'pied', 'correl', 'copula', 'attrib',
+	                'pasttense', 'bypassives', 'longpassives'):
+		current[feature] = c[feature] / normBy_sentnum
+	for feature, res in (('addit', addit_res), ('advers', advers_res), ('caus', caus_res), ('tempseq', tempseq_res),
+	                     ('epist', epist_res), ('but', but_res), ('neg', neg_res)):
+		current[feature] = res / normBy_sentnum
+	## by number of verbs
+	for feature in ('finites', 'infs', 'pverbals'):
+		current[feature] = c[feature] / normBy_verbnum
+	current['deverbals'] = deverbals_res / normBy_verbnum
+	## normalized internally
+	current['comp'], current['sup'] = comp_res, sup_res
+	current['numcls'], current['simple'] = numcls_res, simple_res
+	current['nnargs'] = nnargs_res
+	current.update(ex.ud_probabilities(sents, language))
+	return current
+
+
+# the features of a document from mega_collector.py of a tree (mc is the module)
+def candidate_features(mc, spec, sents, filepath):
+	subdir, file = os.path.split(filepath)
+	raw, _, _ = mc.doc_row(subdir, file, mc.sents_parts(sents, mc.doc_language(subdir), mc.doc_parts))
+	return mc.normalize(raw, spec)
+
+
+def plain(features):
+	return {k: v if isinstance(v, (int, str)) else float(v) for k, v in features.items()}
+
+
+# impl -> (read(filepath), features(sents, filepath)) for a tree of the code at path
+def implementation(impl, path, lists, encoding, languages):
+	sys.path.insert(0, path)
+	import helpfunctions
+	helpfunctions.lists_path = os.path.join(lists or os.path.join(path, 'searchlists'), '')
+	language = lambda filepath: os.path.basename(os.path.dirname(os.path.abspath(filepath)))
+	if impl == 'reference':
+		import extractors as ex
+		supports = reference_supports(ex, languages)
+
+		def read(filepath):
+			with open(filepath, encoding=encoding) as f:
+				return ex.get_trees(f.readlines())
+
+		return read, lambda sents, filepath: reference_features(ex, supports, sents, language(filepath))
+
+	import mega_collector as mc
+	mc.load_supports()
+	read = lambda filepath: mc.read_doc(filepath, language(filepath), mc.doc_parts, encoding=encoding)
+	if impl == 'engine':
+		from extractors import kernel_features
+
+		def counts(sents, filepath):
+			raw = mc.sents_parts(sents, language(filepath), ('counts',))['counts']
+			return {k: v for k, v in raw.items() if k in kernel_features}
+
+		return read, counts
+
+	spec = mc.load_spec()
+	return read, lambda sents, filepath: candidate_features(mc, spec, sents, filepath)
+
+
+# {path: {feature: count}} of the vectorized kernel of a tree; the documents are read at once into CorpusArrays
+def kernel_values(path, paths, encoding):
+	sys.path.insert(0, path)
+	from helpfunctions import conllu_arrays
+	from extractors import kernel_counts
+	corpus = conllu_arrays(paths, encoding)
+	counts = kernel_counts(corpus)
+	return {doc: {f: int(counts[f][d]) for f in counts} for d, doc in enumerate(corpus.docs)}
+
+
+# {path: features or {'error': ...}}, or with prefixes {path: {'texts': [sentence], 'prefixes': [features]}}
+def feature_values(paths, read, features, prefixes=False):
+	def values(sents, filepath):
+		try:
+			return plain(features(sents, filepath))
+		except Exception as e:
+			return {'error': '%s: %s' % (type(e).__name__, e)}
+
+	res = {}
+	for filepath in paths:
+		sents = read(filepath)
+		if prefixes:
+			res[filepath] = {'texts': [' '.join(w[1] for w in sent) for sent in sents],
+			                 'prefixes': [values(sents[:k], filepath) for k in range(1, len(sents) + 1)]}
+		else:
+			res[filepath] = values(sents, filepath)
+	return res
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--impl', required=True, choices=['reference', 'candidate', 'engine', 'kernel'])
+	parser.add_argument('--path', default=repo, help="Folder of the tree of the code with the implementation")
+	parser.add_argument('--lists', default=None, help="Folder with the searchlists (path/searchlists/ by default)")
+	parser.add_argument('--encoding', default='ISO-8859-1', help="Encoding of the documents (as in mega_collector.py)")
+	parser.add_argument('--docs', required=True, help="File with the paths of the documents, one per line")
+	parser.add_argument('--prefixes', action='store_true', help="Compute the features of every prefix of the documents")
+	args = parser.parse_args()
+
+	with open(args.docs, encoding='utf-8') as f:
+		paths = [line.rstrip('\n') for line in f if line.strip()]
+	if args.impl == 'kernel':
+		json.dump(kernel_values(os.path.abspath(args.path), paths, args.encoding), sys.stdout)
+		sys.exit(0)
+	languages = sorted({os.path.basename(os.path.dirname(os.path.abspath(p))) for p in paths})
+	read, features = implementation(args.impl, os.path.abspath(args.path), args.lists, args.encoding, languages)
+	json.dump(feature_values(paths, read, features, args.prefixes), sys.stdout)
@@ -0,0 +1,148 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+benchmark of the extractors on a synthetic corpus (see synthetic.py):
+- each extractor of extractors.py (en, de, ru) and of the new code (en, es), timed by extractor_times.py,
+and the counters of the engine of extractors.py
+- the end-to-end runs of mega_collector.py and of new_mega_collector.py on the same documents
+(with the start of the interpreter and the reading of the searchlists)
+- the memory of the documents of extractors.py as lists of tuples and as CorpusArrays (see corpus_memory.py)
+before the timings, the engine of extractors.py is checked against the extractors on the same corpus
+(see equivalence.py); the exit status is 1 if they diverge, after the results are saved
+the results are saved as JSON with the commit they were measured on; compare two of them with compare.py
+
+USAGE (from the root of the repository):
+python3 -m benchmarks.run --output bench.json
+python3 -m benchmarks.run --output bench.json --docs 40 --sents 80 --repeat 5 --jobs 4
+python3 -m benchmarks.run --output bench.json --langs en ru --sent-mu 3.2 --deprel acl:relcl=4 --no-end-to-end
+'''
+import os, sys
+import json
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter, strftime
+from benchmarks.synthetic import generate, add_arguments, generator_options
+from benchmarks.extractor_times import code_trees
+
+
+def commit():
+	try:
+		return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=code_trees['root']['path'],
+		                               stderr=subprocess.DEVNULL).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def corpus_memory(corpus):
+	out = subprocess.check_output([sys.executable, '-m', 'benchmarks.corpus_memory', '--corpus', corpus],
+	                              cwd=code_trees['root']['path'])
+	return json.loads(out.decode())
+
+
+# the engine and the kernel of the root tree against its own extractors (the divergences go to stderr)
+def check_equivalence(corpus):
+	command = [sys.executable, '-m', 'benchmarks.equivalence', '--corpus', corpus,
+	           '--reference', code_trees['root']['path'], '--encoding', 'utf-8']
+	return subprocess.call(command, cwd=code_trees['root']['path']) == 0
+
+
+def time_extractors(code, corpus, langs, repeat):
+	out = subprocess.check_output([sys.executable, '-m', 'benchmarks.extractor_times', '--tree', code,
+	                               '--corpus', corpus, '--langs'] + langs + ['--repeat', str(repeat)],
+	                              cwd=code_trees['root']['path'])
+	return json.loads(out.decode())
+
+
+# the command line of the collector of a tree; output is the folder for its table
+def collector_command(code, corpus, langs, output, jobs):
+	if code == 'root':
+		return [sys.executable, os.path.join(code_trees['root']['path'], 'mega_collector.py'), '--input', corpus,
+		        '--output', os.path.join(output, 'out.tsv'), '--lists', code_trees['root']['lists'], '--jobs', str(jobs)]
+	return [sys.executable, os.path.join(code_trees['new']['path'], 'new_mega_collector.py'), '--input', corpus,
+	        '--output', os.path.join(output, 'out.tsv'), '--supports', code_trees['new']['lists'], '--langs'] + langs + \
+	       ['--levels', 'doc', 'korp', 'status', 'lang', '--jobs', str(jobs)]
+
+
+# best wall time of repeat runs of the collector
+def time_collector(code, corpus, langs, repeat, jobs):
+	output = tempfile.mkdtemp(prefix='bench_%s_' % code)
+	best = None
+	try:
+		for _ in range(repeat):
+			start = perf_counter()
+			# new_mega_collector.py writes its log to data/ in the current folder
+			subprocess.check_call(collector_command(code, corpus, langs, output, jobs), cwd=output,
+			                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+			seconds = perf_counter() - start
+			if best is None or seconds < best:
+				best = seconds
+	finally:
+		shutil.rmtree(output)
+	return best
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--output', default='bench.json', help="Path to the JSON with the results")
+	parser.add_argument('--corpus', default=None,
+	                    help="Folder for the synthetic corpus (a temporary folder that is removed at the end by default)")
+	parser.add_argument('--repeat', default=3, type=int, help="Number of runs of each measurement; the best one is kept")
+	parser.add_argument('--jobs', default=1, type=int, help="Worker processes of the collectors in the end-to-end runs")
+	parser.add_argument('--no-end-to-end', action='store_true', help="Time only the extractors")
+	add_arguments(parser)
+	args = parser.parse_args()
+
+	corpus = args.corpus or tempfile.mkdtemp(prefix='bench_corpus_')
+	res = {'commit': commit(), 'date': strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+	       'platform': platform.platform(), 'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'corpus')},
+	       'extractors': {}, 'end_to_end': {}, 'memory': {}, 'equivalent': None}
+	try:
+		# each tree gets the languages it supports; the documents of a language are the same in both trees
+		for code, tree in sorted(code_trees.items()):
+			langs = [lang for lang in args.langs if lang in tree['langs']]
+			if not langs:
+				continue
+			folder = os.path.join(corpus, code)
+			generate(folder, langs, args.docs, args.sents, args.seed, **generator_options(args))
+			if code == 'root':
+				print('checking the engine of root against the extractors', file=sys.stderr)
+				res['equivalent'] = check_equivalence(folder)
+			print('timing the extractors of %s for %s' % (code, ' '.join(langs)), file=sys.stderr)
+			res['extractors'][code] = time_extractors(code, folder, langs, args.repeat)
+			if code == 'root':
+				res['memory'] = corpus_memory(folder)
+			if args.no_end_to_end:
+				continue
+			print('timing the collector of %s' % code, file=sys.stderr)
+			seconds = time_collector(code, folder, langs, args.repeat, args.jobs)
+			sents = sum(lang_res['sents'] for lang_res in res['extractors'][code].values())
+			res['end_to_end'][code] = {'seconds': seconds, 'docs': args.docs * len(langs), 'sents': sents,
+			                           'us_per_sentence': seconds * 1e6 / sents if sents else 0.0}
+	finally:
+		if not args.corpus:
+			shutil.rmtree(corpus)
+
+	with open(args.output, 'w') as f:
+		json.dump(res, f, indent=1, sort_keys=True)
+
+	for code, langs in sorted(res['extractors'].items()):
+		for lang, lang_res in sorted(langs.items()):
+			slowest = sorted(lang_res['extractors'].items(), key=lambda item: -item[1]['seconds'])[:5]
+			print('%s %s: %s sentences; slowest: %s' % (code, lang, lang_res['sents'],
+			      ', '.join('%s %.1f us' % (name, timing['us_per_sentence']) for name, timing in slowest)), file=sys.stderr)
+	if res['memory']:
+		memory = res['memory']
+		print('root corpus of %s tokens: %.1f MB as tuples, %.1f MB as read by the collector, %.1f MB as CorpusArrays (%.0f%%)'
+		      % (memory['tokens'], memory['tuples'] / 2 ** 20, memory['indexed'] / 2 ** 20, memory['arrays'] / 2 ** 20,
+		         100 * memory['arrays_share']), file=sys.stderr)
+	for code, timing in sorted(res['end_to_end'].items()):
+		print('%s collector: %.2f s, %.1f us per sentence' % (code, timing['seconds'], timing['us_per_sentence']),
+		      file=sys.stderr)
+	print('The results are in %s' % args.output, file=sys.stderr)
+	if res['equivalent'] is False:
+		print('The engine of root diverges from the extractors (see above)', file=sys.stderr)
+		sys.exit(1)
@@ -0,0 +1,307 @@
+#! /usr/bin/python3
+# coding: utf-8
+
+'''
+generates a synthetic parsed corpus in the folder structure of the collectors: outdir/korp/status/lang/*.conllu
+- each sentence is a valid UD tree: one root, every other word has a head in the sentence, no cycles;
+the punctuation is attached to the root
+- sentence lengths are drawn from a lognormal distribution (sent_mu, sent_sigma), clipped to min_len..max_len
+- the relation of a word is drawn from the relations for its UPOS (deprels below), with the weights scaled by deprel_weights
+- the lexicon of a language is a small set of words with their tags plus the words of the searchlists of the language,
+so that the lexical extractors and the DM counts find something
+
+USAGE:
+python3 -m benchmarks.synthetic --output /tmp/synthetic --langs en de ru es --docs 20 --sents 50
+python3 -m benchmarks.synthetic --output /tmp/synthetic --sent-mu 3.2 --deprel acl:relcl=4 parataxis=0
+'''
+import os, sys
+import glob
+import random
+import argparse
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# folders with the searchlists of each language (the Spanish ones are in the extraction of the new code)
+lists_folders = {'en': [repo + '/searchlists/', repo + '/neuer Code/UD_features_en-es/get_feats/extraction/searchlists/'],
+                 'de': [repo + '/searchlists/'],
+                 'ru': [repo + '/searchlists/'],
+                 'es': [repo + '/neuer Code/UD_features_en-es/get_feats/extraction/searchlists/']}
+
+## lexicon: (form, lemma, upos, xpos, feats) of the function words and of some content words of each language
+lexicon = {
+	'en': [('the', 'the', 'DET', 'DT', 'Definite=Def|PronType=Art'), ('a', 'a', 'DET', 'DT', 'Definite=Ind|PronType=Art'),
+	       ('this', 'this', 'DET', 'DT', 'Number=Sing|PronType=Dem'), ('those', 'those', 'PRON', 'DT', 'Number=Plur|PronType=Dem'),
+	       ('some', 'some', 'DET', 'DT', '_'), ('no', 'no', 'DET', 'DT', '_'),
+	       ('of', 'of', 'ADP', 'IN', '_'), ('in', 'in', 'ADP', 'IN', '_'), ('by', 'by', 'ADP', 'IN', '_'),
+	       ('to', 'to', 'PART', 'TO', '_'), ('not', 'not', 'PART', 'RB', '_'),
+	       ('and', 'and', 'CCONJ', 'CC', '_'), ('or', 'or', 'CCONJ', 'CC', '_'), ('but', 'but', 'CCONJ', 'CC', '_'),
+	       ('that', 'that', 'SCONJ', 'IN', '_'), ('because', 'because', 'SCONJ', 'IN', '_'), ('if', 'if', 'SCONJ', 'IN', '_'),
+	       ('which', 'which', 'PRON', 'WDT', 'PronType=Rel'), ('who', 'who', 'PRON', 'WP', 'PronType=Rel'),
+	       ('when', 'when', 'ADV', 'WRB', 'PronType=Int'), ('where', 'where', 'ADV', 'WRB', 'PronType=Int'),
+	       ('I', 'I', 'PRON', 'PRP', 'Case=Nom|Number=Sing|Person=1|PronType=Prs'),
+	       ('we', 'we', 'PRON', 'PRP', 'Case=Nom|Number=Plur|Person=1|PronType=Prs'),
+	       ('it', 'it', 'PRON', 'PRP', 'Case=Nom|Gender=Neut|Number=Sing|Person=3|PronType=Prs'),
+	       ('there', 'there', 'PRON', 'EX', '_'), ('something', 'something', 'PRON', 'NN', 'Number=Sing|PronType=Ind'),
+	       ('his', 'he', 'PRON', 'PRP$', 'Gender=Masc|Number=Sing|Person=3|Poss=Yes|PronType=Prs'),
+	       ('their', 'they', 'PRON', 'PRP$', 'Number=Plur|Person=3|Poss=Yes|PronType=Prs'),
+	       ('is', 'be', 'AUX', 'VBZ', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'),
+	       ('was', 'be', 'AUX', 'VBD', 'Mood=Ind|Number=Sing|Person=3|Tense=Past|VerbForm=Fin'),
+	       ('been', 'be', 'AUX', 'VBN', 'Tense=Past|VerbForm=Part'), ('has', 'have', 'AUX', 'VBZ', 'Mood=Ind|Tense=Pres|VerbForm=Fin'),
+	       ('would', 'would', 'AUX', 'MD', 'VerbForm=Fin'), ('can', 'can', 'AUX', 'MD', 'VerbForm=Fin'),
+	       ('time', 'time', 'NOUN', 'NN', 'Number=Sing'), ('people', 'people', 'NOUN', 'NNS', 'Number=Plur'),
+	       ('government', 'government', 'NOUN', 'NN', 'Number=Sing'), ('question', 'question', 'NOUN', 'NN', 'Number=Sing'),
+	       ('development', 'development', 'NOUN', 'NN', 'Number=Sing'), ('decisions', 'decision', 'NOUN', 'NNS', 'Number=Plur'),
+	       ('London', 'London', 'PROPN', 'NNP', 'Number=Sing'),
+	       ('say', 'say', 'VERB', 'VB', 'VerbForm=Inf'), ('said', 'say', 'VERB', 'VBD', 'Mood=Ind|Tense=Past|VerbForm=Fin'),
+	       ('made', 'make', 'VERB', 'VBN', 'Tense=Past|VerbForm=Part|Voice=Pass'), ('making', 'make', 'VERB', 'VBG', 'VerbForm=Ger'),
+	       ('think', 'think', 'VERB', 'VBP', 'Mood=Ind|Tense=Pres|VerbForm=Fin'), ('argue', 'argue', 'VERB', 'VB', 'VerbForm=Inf'),
+	       ('good', 'good', 'ADJ', 'JJ', 'Degree=Pos'), ('better', 'good', 'ADJ', 'JJR', 'Degree=Cmp'),
+	       ('most', 'most', 'ADV', 'RBS', '_'), ('important', 'important', 'ADJ', 'JJ', 'Degree=Pos'),
+	       ('very', 'very', 'ADV', 'RB', '_'), ('also', 'also', 'ADV', 'RB', '_'), ('3', '3', 'NUM', 'CD', 'NumType=Card')],
+	'de': [('der', 'der', 'DET', 'ART', 'Case=Nom|Definite=Def|PronType=Art'), ('eine', 'ein', 'DET', 'ART', 'Definite=Ind|PronType=Art'),
+	       ('dies', 'dies', 'DET', 'PDAT', 'PronType=Dem'), ('kein', 'kein', 'DET', 'PIAT', 'PronType=Neg'),
+	       ('von', 'von', 'ADP', 'APPR', '_'), ('in', 'in', 'ADP', 'APPR', '_'), ('zu', 'zu', 'PART', 'PTKZU', '_'),
+	       ('nicht', 'nicht', 'PART', 'PTKNEG', 'Polarity=Neg'),
+	       ('und', 'und', 'CCONJ', 'KON', '_'), ('oder', 'oder', 'CCONJ', 'KON', '_'), ('aber', 'aber', 'CCONJ', 'KON', '_'),
+	       ('dass', 'dass', 'SCONJ', 'KOUS', '_'), ('weil', 'weil', 'SCONJ', 'KOUS', '_'),
+	       ('die', 'der', 'PRON', 'PRELS', 'PronType=Dem,Rel'), ('welche', 'welch', 'PRON', 'PRELS', 'PronType=Int,Rel'),
+	       ('wo', 'wo', 'ADV', 'PWAV', 'PronType=Int'),
+	       ('ich', 'ich', 'PRON', 'PPER', 'Case=Nom|Number=Sing|Person=1|PronType=Prs'),
+	       ('wir', 'wir', 'PRON', 'PPER', 'Case=Nom|Number=Plur|Person=1|PronType=Prs'),
+	       ('es', 'es', 'PRON', 'PPER', 'Case=Nom|Number=Sing|Person=3|PronType=Prs'),
+	       ('etwas', 'etwas', 'PRON', 'PIS', 'PronType=Ind'), ('sein', 'sein', 'DET', 'PPOSAT', 'Poss=Yes|PronType=Prs'),
+	       ('ist', 'sein', 'AUX', 'VAFIN', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'),
+	       ('wird', 'werden', 'AUX', 'VAFIN', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'),
+	       ('hat', 'haben', 'AUX', 'VAFIN', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'),
+	       ('kann', 'können', 'AUX', 'VMFIN', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'),
+	       ('Zeit', 'Zeit', 'NOUN', 'NN', 'Gender=Fem|Number=Sing'), ('Menschen', 'Mensch', 'NOUN', 'NN', 'Number=Plur'),
+	       ('Regierung', 'Regierung', 'NOUN', 'NN', 'Gender=Fem|Number=Sing'), ('Frage', 'Frage', 'NOUN', 'NN', 'Number=Sing'),
+	       ('Entwicklung', 'Entwicklung', 'NOUN', 'NN', 'Gender=Fem|Number=Sing'), ('Berlin', 'Berlin', 'PROPN', 'NE', '_'),
+	       ('sagen', 'sagen', 'VERB', 'VVINF', 'VerbForm=Inf'), ('sagte', 'sagen', 'VERB', 'VVFIN', 'Mood=Ind|Tense=Past|VerbForm=Fin'),
+	       ('gemacht', 'machen', 'VERB', 'VVPP', 'VerbForm=Part'), ('lässt', 'lassen', 'VERB', 'VVFIN', 'Mood=Ind|Tense=Pres|VerbForm=Fin'),
+	       ('gut', 'gut', 'ADJ', 'ADJD', 'Degree=Pos'), ('besser', 'gut', 'ADJ', 'ADJD', 'Degree=Cmp'),
+	       ('wichtige', 'wichtig', 'ADJ', 'ADJA', 'Degree=Pos'), ('sehr', 'sehr', 'ADV', 'ADV', '_'),
+	       ('auch', 'auch', 'ADV', 'ADV', '_'), ('drei', 'drei', 'NUM', 'CARD', 'NumType=Card')],
+	'ru': [('и', 'и', 'CCONJ', '_', '_'), ('или', 'или', 'CCONJ', '_', '_'), ('но', 'но', 'CCONJ', '_', '_'),
+	       ('что', 'что', 'SCONJ', '_', '_'), ('потому', 'потому', 'ADV', '_', 'Degree=Pos'), ('если', 'если', 'SCONJ', '_', '_'),
+	       ('который', 'который', 'PRON', '_', 'Case=Nom|Gender=Masc|Number=Sing'), ('где', 'где', 'ADV', '_', 'Degree=Pos'),
+	       ('тот', 'тот', 'DET', '_', 'Case=Nom|Gender=Masc|Number=Sing'), ('этот', 'этот', 'DET', '_', 'Case=Nom|Number=Sing'),
+	       ('в', 'в', 'ADP', '_', '_'), ('с', 'с', 'ADP', '_', '_'), ('не', 'не', 'PART', '_', 'Polarity=Neg'),
+	       ('я', 'я', 'PRON', '_', 'Case=Nom|Number=Sing|Person=1'), ('мы', 'мы', 'PRON', '_', 'Case=Nom|Number=Plur|Person=1'),
+	       ('наш', 'наш', 'DET', '_', 'Case=Nom|Gender=Masc|Number=Sing|Poss=Yes'), ('что-то', 'что-то', 'PRON', '_', 'Case=Nom'),
+	       ('был', 'быть', 'AUX', '_', 'Aspect=Imp|Mood=Ind|Tense=Past|VerbForm=Fin'),
+	       ('время', 'время', 'NOUN', '_', 'Case=Nom|Number=Sing'), ('люди', 'человек', 'NOUN', '_', 'Case=Nom|Number=Plur'),
+	       ('решение', 'решение', 'NOUN', '_', 'Case=Nom|Number=Sing'), ('развитие', 'развитие', 'NOUN', '_', 'Case=Acc|Number=Sing'),
+	       ('сотрудниками', 'сотрудник', 'NOUN', '_', 'Animacy=Anim|Case=Ins|Number=Plur'), ('Москва', 'Москва', 'PROPN', '_', 'Case=Nom'),
+	       ('сказать', 'сказать', 'VERB', '_', 'Aspect=Perf|VerbForm=Inf'),
+	       ('сказал', 'сказать', 'VERB', '_', 'Aspect=Perf|Mood=Ind|Tense=Past|VerbForm=Fin'),
+	       ('строятся', 'строить', 'VERB', '_', 'Aspect=Imp|Mood=Ind|Number=Plur|Person=3|Tense=Pres|VerbForm=Fin|Voice=Mid'),
+	       ('направлена', 'направить', 'VERB', '_', 'Aspect=Perf|Number=Sing|Tense=Past|Variant=Short|VerbForm=Part|Voice=Pass'),
+	       ('читая', 'читать', 'VERB', '_', 'Aspect=Imp|Tense=Pres|VerbForm=Conv|Voice=Act'),
+	       ('новый', 'новый', 'ADJ', '_', 'Case=Nom|Degree=Pos'), ('больший', 'большой', 'ADJ', '_', 'Case=Nom|Degree=Cmp'),
+	       ('самый', 'самый', 'ADJ', '_', 'Case=Nom|Degree=Pos'), ('очень', 'очень', 'ADV', '_', 'Degree=Pos'),
+	       ('три', 'три', 'NUM', '_', 'Case=Nom')],
+	'es': [('el', 'el', 'DET', 'DA0MS0', 'Definite=Def|Gender=Masc|Number=Sing|PronType=Art'),
+	       ('la', 'el', 'DET', 'DA0FS0', 'Definite=Def|Gender=Fem|Number=Sing|PronType=Art'),
+	       ('este', 'este', 'DET', 'DD0MS0', 'PronType=Dem'), ('de', 'de', 'ADP', 'SPS00', 'AdpType=Prep'),
+	       ('en', 'en', 'ADP', 'SPS00', 'AdpType=Prep'), ('no', 'no', 'ADV', 'RN', 'Polarity=Neg'),
+	       ('y', 'y', 'CCONJ', 'CC', '_'), ('o', 'o', 'CCONJ', 'CC', '_'), ('pero', 'pero', 'CCONJ', 'CC', '_'),
+	       ('que', 'que', 'SCONJ', 'CS', '_'), ('porque', 'porque', 'SCONJ', 'CS', '_'), ('si', 'si', 'SCONJ', 'CS', '_'),
+	       ('yo', 'yo', 'PRON', 'PP1CSN00', 'Case=Nom|Number=Sing|Person=1|PronType=Prs'),
+	       ('nosotros', 'nosotros', 'PRON', 'PP1MPN00', 'Case=Nom|Number=Plur|Person=1|PronType=Prs'),
+	       ('su', 'su', 'DET', 'DP3CS0', 'Number=Sing|Person=3|Poss=Yes|PronType=Prs'),
+	       ('todo', 'todo', 'PRON', 'PI0MS000', 'PronType=Tot'), ('nada', 'nada', 'PRON', 'PI0CS000', 'PronType=Neg'),
+	       ('es', 'ser', 'AUX', 'VSIP3S0', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'),
+	       ('fue', 'ser', 'AUX', 'VSIS3S0', 'Mood=Ind|Number=Sing|Person=3|Tense=Past|VerbForm=Fin'),
+	       ('tiempo', 'tiempo', 'NOUN', 'NCMS000', 'Gender=Masc|Number=Sing'), ('personas', 'persona', 'NOUN', 'NCFP000', 'Gender=Fem|Number=Plur'),
+	       ('gobierno', 'gobierno', 'NOUN', 'NCMS000', 'Gender=Masc|Number=Sing'), ('Madrid', 'Madrid', 'PROPN', 'NP00000', '_'),
+	       ('decir', 'decir', 'VERB', 'VMN0000', 'VerbForm=Inf'), ('dijo', 'decir', 'VERB', 'VMIS3S0', 'Mood=Ind|Tense=Past|VerbForm=Fin'),
+	       ('hecho', 'hacer', 'VERB', 'VMP00SM', 'Gender=Masc|Number=Sing|Tense=Past|VerbForm=Part'),
+	       ('nuevo', 'nuevo', 'ADJ', 'AQ0MS0', 'Gender=Masc|Number=Sing'), ('mejor', 'mejor', 'ADJ', 'AQ0CS0', 'Degree=Cmp'),
+	       ('muy', 'muy', 'ADV', 'RG', '_'), ('también', 'también', 'ADV', 'RG', '_'), ('tres', 'tres', 'NUM', 'Z', 'NumType=Card')],
+}
+punctuation = {'en': '.', 'de': '$.', 'ru': '_', 'es': 'Fp'}
+
+## the relations that a word of a UPOS can have with their weights, and those of the words in the searchlists
+deprels = {
+	'NOUN': {'nsubj': 4, 'obj': 4, 'obl': 3, 'nmod': 3, 'iobj': 0.5, 'conj': 1, 'appos': 0.5, 'nsubj:pass': 1,
+	         'compound': 0.5, 'flat': 0.2, 'vocative': 0.1, 'dislocated': 0.1},
+	'PROPN': {'nsubj': 3, 'obj': 1, 'nmod': 1, 'flat:name': 1, 'appos': 0.5},
+	'PRON': {'nsubj': 4, 'obj': 2, 'obl': 1, 'nmod:poss': 1, 'expl': 0.3, 'iobj': 0.5},
+	'VERB': {'advcl': 2, 'ccomp': 2, 'xcomp': 2, 'acl': 1, 'acl:relcl': 1.5, 'parataxis': 0.5, 'conj': 2, 'csubj': 0.3},
+	'AUX': {'aux': 3, 'cop': 2, 'aux:pass': 1},
+	'ADJ': {'amod': 5, 'xcomp': 1, 'acl': 0.3, 'conj': 0.5},
+	'ADV': {'advmod': 5, 'discourse': 0.2, 'fixed': 0.2},
+	'DET': {'det': 5, 'nmod:poss': 0.5},
+	'NUM': {'nummod': 3, 'obl': 0.3},
+	'ADP': {'case': 1},
+	'CCONJ': {'cc': 1},
+	'SCONJ': {'mark': 1},
+	'PART': {'mark': 1, 'advmod': 1},
+	'PUNCT': {'punct': 1},
+	'X': {'dep': 1, 'goeswith': 0.1, 'orphan': 0.1, 'list': 0.1, 'reparandum': 0.1},
+}
+# searchlist (by the end of its name) -> UPOS of its words; the DM lists are put in as whole phrases
+list_upos = {'adv_quantifiers': 'ADV', 'modal-adj_predicates': 'ADJ', 'deverbals_stop': 'NOUN', 'converts': 'NOUN'}
+dm_lists = ('additive', 'adversative', 'causal', 'temp_sequen', 'epistemic')
+# the share of the words in a sentence that come from the searchlists, and the probability of a DM phrase in it
+list_share = 0.15
+dm_rate = 0.4
+
+
+def read_list(path):
+	with open(path, encoding='utf-8') as f:
+		return [line.strip() for line in f if line.strip()]
+
+
+# the words and DM phrases of the searchlists of a language: ([(form, lemma, upos, xpos, feats)], [phrase words])
+def list_words(lang, folders=None):
+	words = []
+	phrases = []
+	for folder in folders or lists_folders[lang]:
+		for path in sorted(glob.glob(folder + lang + '_*.lst') + glob.glob(folder + 'dms/' + lang + '_*.lst')):
+			name = os.path.basename(path)[len(lang) + 1:-len('.lst')]
+			if name in dm_lists:
+				phrases += [line.split() for line in read_list(path)]
+			elif name in list_upos:
+				upos = list_upos[name]
+				words += [(w, w, upos, '_', '_') for w in read_list(path) if ' ' not in w]
+	return words, phrases
+
+
+class Generator(object):
+	'''
+	draws the sentences of one language; rng is a random.Random, so that a seed gives the same corpus
+	sent_mu, sent_sigma -- the parameters of the lognormal distribution of the sentence length (in words)
+	deprel_weights -- relation -> factor for its weight in deprels (0 drops the relation where there are others)
+	'''
+	def __init__(self, lang, rng, sent_mu=2.7, sent_sigma=0.5, min_len=4, max_len=80, deprel_weights=None,
+	             lists=None):
+		self.lang = lang
+		self.rng = rng
+		self.sent_mu = sent_mu
+		self.sent_sigma = sent_sigma
+		self.min_len = min_len
+		self.max_len = max_len
+		self.words = lexicon[lang]
+		self.list_words, self.phrases = list_words(lang, lists)
+		deprel_weights = deprel_weights or {}
+		self.deprels = {}
+		for upos, weights in deprels.items():
+			rels = [(rel, weight * deprel_weights.get(rel, 1)) for rel, weight in weights.items()]
+			if not any(weight for rel, weight in rels):
+				rels = list(weights.items())
+			self.deprels[upos] = ([rel for rel, weight in rels], [weight for rel, weight in rels])
+
+	def length(self):
+		n = int(round(self.rng.lognormvariate(self.sent_mu, self.sent_sigma)))
+		return min(max(n, self.min_len), self.max_len)
+
+	def word(self):
+		if self.list_words and self.rng.random() < list_share:
+			return self.rng.choice(self.list_words)
+		return self.rng.choice(self.words)
+
+	def relation(self, upos):
+		rels, weights = self.deprels.get(upos, self.deprels['X'])
+		return self.rng.choices(rels, weights)[0]
+
+	# one sentence as the lines of its words: the root is the first verb (or a random word),
+	# the words are attached in random order to the words attached before them
+	def sentence(self):
+		rng = self.rng
+		words = [self.word() for _ in range(self.length() - 1)]
+		fixed = set()  # the positions of the words after the first one of a DM phrase
+		if self.phrases and rng.random() < dm_rate:
+			phrase = rng.choice(self.phrases)
+			at = rng.randint(0, len(words))
+			words[at:at] = [(w, w.lower(), 'ADV', '_', '_') for w in phrase]
+			fixed.update(range(at + 1, at + len(phrase)))
+		if words:
+			words[0] = (words[0][0][:1].upper() + words[0][0][1:],) + words[0][1:]
+		words.append(('?' if rng.random() < 0.1 else '.', '.', 'PUNCT', punctuation[self.lang], '_'))
+
+		n = len(words)
+		verbs = [i for i, w in enumerate(words) if w[2] == 'VERB']
+		content = [i for i, w in enumerate(words) if w[2] != 'PUNCT' and i not in fixed]
+		root = verbs[0] if verbs else rng.choice(content)
+		heads = [0] * n
+		rels = ['root'] * n
+		placed = [root]
+		order = [i for i in content if i != root]
+		rng.shuffle(order)
+		for i in order:
+			heads[i] = rng.choice(placed) + 1
+			rels[i] = self.relation(words[i][2])
+			placed.append(i)
+		for i in range(n):
+			if i in fixed:
+				heads[i], rels[i] = (i if i - 1 not in fixed else heads[i - 1]), 'fixed'
+			elif words[i][2] == 'PUNCT':
+				heads[i], rels[i] = root + 1, 'punct'
+
+		return ['\t'.join((str(i + 1), w[0], w[1], w[2], w[3], w[4], str(heads[i]), rels[i], '_', '_'))
+		        for i, w in enumerate(words)]
+
+	def document(self, nsents):
+		lines = []
+		for s in range(nsents):
+			words = self.sentence()
+			lines.append('# sent_id = %d' % (s + 1))
+			lines.append('# text = ' + ' '.join(line.split('\t')[1] for line in words))
+			lines += words
+			lines.append('')
+		return '\n'.join(lines) + '\n'
+
+
+# writes docs documents of about sents sentences for each language to outdir/korp/status/lang/;
+# each language has its own random generator, so the documents of a language do not depend on the other languages;
+# returns {lang: [paths]}
+def generate(outdir, langs=('en', 'de', 'ru', 'es'), docs=10, sents=50, seed=1, korp='synthetic', status='bench',
+             **options):
+	res = {}
+	for lang in langs:
+		rng = random.Random('%s-%s' % (seed, lang))
+		generator = Generator(lang, rng, **options)
+		folder = os.path.join(outdir, korp, status, lang)
+		os.makedirs(folder, exist_ok=True)
+		res[lang] = []
+		for d in range(docs):
+			path = os.path.join(folder, '%s_%s_%d.conllu' % (lang, status, d))
+			with open(path, 'w', encoding='utf-8') as f:
+				f.write(generator.document(rng.randint(max(1, sents // 2), max(1, sents * 3 // 2))))
+			res[lang].append(path)
+	return res
+
+
+# 'acl:relcl=4' -> ('acl:relcl', 4.0)
+def weight_arg(value):
+	rel, _, weight = value.rpartition('=')
+	if not rel:
+		raise argparse.ArgumentTypeError("expected relation=weight, got %r" % value)
+	return rel, float(weight)
+
+
+def add_arguments(parser):
+	parser.add_argument('--langs', nargs='+', default=['en', 'de', 'ru', 'es'], choices=sorted(lexicon))
+	parser.add_argument('--docs', default=10, type=int, help="Number of documents per language")
+	parser.add_argument('--sents', default=50, type=int, help="Mean number of sentences per document")
+	parser.add_argument('--seed', default=1, type=int)
+	parser.add_argument('--sent-mu', default=2.7, type=float, help="Mean of the log of the sentence length")
+	parser.add_argument('--sent-sigma', default=0.5, type=float, help="Standard deviation of the log of the sentence length")
+	parser.add_argument('--deprel', nargs='+', default=[], type=weight_arg,
+	                    help="Scale the weight of a relation, like so: --deprel acl:relcl=4 parataxis=0")
+
+
+def generator_options(args):
+	return {'sent_mu': args.sent_mu, 'sent_sigma': args.sent_sigma, 'deprel_weights': dict(args.deprel)}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--output', required=True, help="Folder for the corpus: output/synthetic/bench/lang/*.conllu")
+	add_arguments(parser)
+	args = parser.parse_args()
+
+	paths = generate(args.output, args.langs, args.docs, args.sents, args.seed, **generator_options(args))
+	for lang, files in paths.items():
+		print('%s: %s documents in %s' % (lang, len(files), os.path.dirname(files[0])), file=sys.stderr)
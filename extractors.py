@@ -8,8 +8,8 @@
 
 import numpy as np
 import re
-from igraph import *
 import itertools
+from time import perf_counter
 from helpfunctions import *
 
 
@@ -61,27 +61,14 @@ def av_s_length(trees, lang):
 def prsp(tree, lang):
 	count = 0
 	matches = []
+	# the pronoun lists are ppron_lists; the lexicon is empty for other languages
+	lexicon = inline_lexicons.get(lang, {})
 	for w in tree:
 		token = w[1].lower()
-		if lang == 'en':
-			if 'PRON' in w[3] and 'Person=' in w[5] and not 'Poss=Yes' in w[5]:
-				if token in ['i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them']:
-					count += 1
-					matches.append(w[2].lower())
-		elif lang == 'de':
-			if 'PRON' in w[3] and 'Person=' in w[5] and not 'Poss=Yes' in w[5]:
-				if token in ['ich', 'ihr', 'du', 'er', 'sie', 'es', 'wir', 'mich', 'mir', 'dich', 'dir', 'ihm', 'ihn',
-				             'uns', 'ihnen']:
-					count += 1
-					matches.append(w[2].lower())
-		elif lang == 'ru':
-			if 'PRON' in w[3] and 'Person=' in w[5] and not 'Poss=Yes' in w[5]:
-				if token in ['я', 'ты', 'вы', 'он', 'она', 'оно', 'мы', 'они', 'меня', 'тебя', 'его', 'её', 'ее',
-				             'нас', 'вас', 'их', 'неё', 'нее', 'него', 'них', 'мне', 'тебе', 'ей', 'ему', 'нам', 'вам',
-				             'им', 'ней', 'нему', 'ним', 'меня', 'тебя', 'него', 'мной', 'мною', 'тобой', 'тобою',
-				             'Вами', 'им', 'ей', 'ею', 'нами', 'вами', 'ими', 'ним', 'нем', 'нём', 'ней', 'нею', 'ними']:
-					count += 1
-					matches.append(w[2].lower())
+		if 'PRON' in w[3] and 'Person=' in w[5] and not 'Poss=Yes' in w[5]:
+			if lexicon.get(token, 0) & lexicon_bits['ppron']:
+				count += 1
+				matches.append(w[2].lower())
 	return count, matches
 
 
@@ -89,21 +76,18 @@ def possdet(tree, lang):
 	count = 0
 	matches = []
 	example = []
+	# the lists are possdet_lists (eurer does not occur in DE)
+	lexicon = inline_lexicons.get(lang, {})
 	for w in tree:
 		lemma = w[2].lower()
 		# own and eigen are not included as they do not compare to свой, it seems
-		if lang == 'en':
-			if lemma in ['my', 'your', 'his', 'her', 'its', 'our', 'their']:
-				if w[3] in ['DET', 'PRON'] and 'Poss=Yes' in w[5]:
-					count += 1
-					matches.append(w[2].lower())
-		elif lang == 'de':
-			if lemma in ['mein', 'dein', 'sein', 'ihr', 'Ihr|ihr', 'unser', 'eurer']:  # eurer does not occur
+		if lang == 'en' or lang == 'de':
+			if lexicon.get(lemma, 0) & lexicon_bits['possdet']:
 				if w[3] in ['DET', 'PRON'] and 'Poss=Yes' in w[5]:
 					count += 1
 					matches.append(w[2].lower())
 		elif lang == 'ru':
-			if 'DET' in w[3] and lemma in ['мой', 'твой', 'ваш', 'его', 'ее', 'её', 'наш', 'их', 'ихний', 'свой']:
+			if 'DET' in w[3] and lexicon.get(lemma, 0) & lexicon_bits['possdet']:
 				count += 1
 				matches.append(w[2].lower())
 	return count, matches
@@ -586,9 +570,10 @@ def pasttense(tree):
 
 ## graph-based feature
 
-## this function tests connectedness of the graph; it is called from skeakdiff below and helps to skip malformed sentences
-## additionally it produces the sentence graph (NB!! it slows down the process, hence if graphs are needed call a separate function)
+## this function produces the sentence graph for speakdiff_visuals below; it also shows disconnected trees
+## (NB!! it slows down the process; igraph is imported here, because only the visuals need it)
 def test_sanity(tree):
+	from igraph import Graph, ARPACKOptions
 	ARPACKOptions.maxiter = 3000
 	bad_trees = 0
 	sentence_graph = Graph(len(tree) + 1)
@@ -613,34 +598,52 @@ def test_sanity(tree):
 	return sentence_graph
 
 
+## mean hierarchical distance (MHD, distance from ROOT) and mean dependency distance (MDD, see readerdiff below)
+## in one pass over the head ids of the sentence, without building a graph;
+## a tree is connected if every non-punct word reaches ROOT through non-punct heads,
+## malformed trees (syntactic analysis errors of assigning dependents to punctuation) get 0
+def tree_depths(tree):
+	s = [w for w in tree if w[7] != 'punct']
+	positions = {w[0]: i for i, w in enumerate(s)}  # id -> index among non-punct words
+	# -1 stands for ROOT, None for a head that is punctuation or is not in the sentence
+	heads = [-1 if w[6] == 0 else positions.get(w[6]) for w in s]
+	depths = [0] * len(s)
+	for i in range(len(s)):
+		# climb to ROOT or to a word with a known depth, then set the depths on the way back
+		path = []
+		j = i
+		while True:
+			if j is None or len(path) > len(s):
+				return 0, 0  # disconnected or cyclic tree
+			if j == -1 or depths[j]:
+				break
+			path.append(j)
+			j = heads[j]
+		d = depths[j] if j != -1 else 0
+		for k in reversed(path):
+			d += 1
+			depths[k] = d
+
+	hds = [depths[i] for i, w in enumerate(s) if w[7] != 'root']
+	if not hds:
+		return 0, 0
+	dds = [abs(i - heads[i]) - 1 for i in range(len(s)) if heads[i] != -1]
+	mhd = sum(hds) / len(hds)
+	mdd = sum(dds) / len(dds) if dds else np.nan  # as np.average([]) in readerdiff
+
+	return mhd, mdd
+
+
 def speakdiff(tree):
-	# call the above function to get the graph and counts for disintegrated trees
-	# (syntactic analysis errors of assigning dependents to punctuation)
-	graph = test_sanity(tree)
-	
-	parts = graph.components(mode=WEAK)
-	mhd = 0
-	errors = 0
-	if len(parts) == 1:
-		nodes = [word[1] for word in tree if word[7] != 'punct' and word[7] != 'root']
-		all_hds = []  # or a counter = 0?
-		for node in nodes:
-			try:
-				hd = graph.shortest_paths_dijkstra('ROOT', node, mode=ALL)
-				all_hds.append(hd[0][0])
-			except ValueError:
-				errors += 1
-		# print(tree)
-		if all_hds:
-			mhd = np.average(all_hds)
-	# print(errors)
-	return mhd
+	# MHD only; call tree_depths to get MDD from the same pass
+	return tree_depths(tree)[0]
 
 
 ### this is a slower function which allows to print graphs for sentences (to be used in overall_freqs)
 def speakdiff_visuals(tree):
 	# call the above function to get the graph and counts for disintegrated trees
 	# (syntactic analysis errors of assigning dependents to punctuation)
+	from igraph import InternalError, WEAK, ALL
 	graph = test_sanity(tree)
 	# this is needed to see disconnected graphs from overall_freqs file
 	try:
@@ -670,19 +673,11 @@ def readerdiff(tree):
 	
 	inbtw = []
 	if len(s) > 1:
-		for s_word_id in range(len(s)):  # use s-index to refer to words
-			w = s[s_word_id]
-			head_id = w[6]
-			if head_id == 0:
+		positions = {w[0]: i for i, w in enumerate(s)}  # use s-index to refer to words
+		for s_word_id, w in enumerate(s):
+			if w[6] == 0:
 				continue
-			s_head_id = None
-			for s_word_id_2 in range(len(s)):
-				w1 = s[s_word_id_2]
-				if head_id == w1[0]:
-					s_head_id = s_word_id_2
-					break
-			# print(file, type(s_head_id), type(s_word_id), no)
-			dd = abs(s_word_id - s_head_id) - 1
+			dd = abs(s_word_id - positions[w[6]]) - 1
 			inbtw.append(dd)
 	# use this function instead of overt division of list sum by list length: if smth is wrong you'll get a warning!
 	mdd = np.average(inbtw)
@@ -1240,17 +1235,20 @@ def nominals(trees, lang, stop_dict, deverbs):
         print(f"Warning: Missing language data for {lang}")
         return res
     
-    stoplst = stop_dict[lang]
-    converted = deverbs[lang]
+    # one lexicon lookup instead of scanning the stoplist and the converts for each word
+    lexicon = compile_lexicon(lang, stop_dict=stop_dict, deverbs=deverbs)
+    stop_bit, convert_bit = lexicon_bits['deverb_stop'], lexicon_bits['convert']
+    suffixes = suffix_table(nominal_endings[lang])
 
     # Define a function to handle English-specific logic
     def process_english(w, tree):
         nonlocal res
-        if w[2] not in stoplst:
-            if 'NOUN' in w[3] and (w[2].endswith('ment') or w[2].endswith('tion')):
+        bits = lexicon.get(w[2], 0)
+        if not bits & stop_bit:
+            if 'NOUN' in w[3] and suffix_bits(w[2], suffixes):
                 res += 1
         
-        if 'NOUN' in w[3] and w[2] in converted:
+        if 'NOUN' in w[3] and bits & convert_bit:
             if w[1].endswith('ing'):
                 return
             kids_pos = get_kids_pos(w, tree)
@@ -1262,20 +1260,19 @@ def nominals(trees, lang, stop_dict, deverbs):
     # Define a function to handle German-specific logic
     def process_german(w):
         nonlocal res
-        if w[2] not in stoplst:
-            if 'NOUN' in w[3] and (w[2].endswith('ung') or w[2].endswith('tion')):
+        bits = lexicon.get(w[2], 0)
+        if not bits & stop_bit:
+            if 'NOUN' in w[3] and suffix_bits(w[2], suffixes):
                 res += 1
         
-        if 'NOUN' in w[3] and w[2] in converted:
+        if 'NOUN' in w[3] and bits & convert_bit:
             res += 1
 
     # Define a function to handle Russian-specific logic
     def process_russian(w):
         nonlocal res
-        if w[2] not in stoplst and 'NOUN' in w[3] \
-                and (w[2].endswith('тие') or w[2].endswith('ение')
-                     or w[2].endswith('ание') or w[2].endswith('ство')
-                     or w[2].endswith('ция') or w[2].endswith('ота')) \
+        if not lexicon.get(w[2], 0) & stop_bit and 'NOUN' in w[3] \
+                and suffix_bits(w[2], suffixes) \
                 and 'Number=Plur' not in w[5]:
             res += 1
 
@@ -1601,7 +1598,7 @@ def count_dms(searchlists, trees, lang):
 	res = 0
 	lst = searchlists[lang]
 	for tree in trees:
-		sent = ' '.join(w[1] for w in tree)
+		sent = shared(tree, 'text')
 		for i in lst:
 			i = i.strip()
 			try:
@@ -1629,6 +1626,27 @@ def count_dms(searchlists, trees, lang):
 	return res
 
 
+## the same counts as count_dms for all DM categories at once: each sentence is joined once and scanned once
+## by the automaton compiled from the searchlists (automata is a lang-dictionary of dms_automaton results)
+def count_all_dms(automata, trees, lang):
+	cats, goto, fail, out = automata[lang]
+	res = {cat: 0 for cat in cats}
+	for tree in trees:
+		sent = shared(tree, 'text')
+		found = set()
+		state = 0
+		for char in sent:
+			while state and char not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(char, 0)
+			if out[state]:
+				found.update(out[state])
+		# every list item is counted once per sentence, as in count_dms
+		for cat, item_id in found:
+			res[cat] += 1
+	return res
+
+
 def get_epistemic_stance(trees, lang):
 	verbs = 0
 	
@@ -1637,7 +1655,7 @@ def get_epistemic_stance(trees, lang):
 			'''
 			include stance verbs in Tense=Pres with i, we as nsubj into the counts
 			'''
-			sent = ' '.join(w[1] for w in tree)
+			sent = shared(tree, 'text')
 			for w in tree:
 				if w[1] in ['argue', 'doubt', 'assume', 'believe', 'find'] \
 						and has_kid_by_lemlist(w, tree, ['I', 'we']) \
@@ -1822,30 +1840,21 @@ def comparison_degrees(trees, lang):
 
 def polarity(trees, lang):
 	negs = 0
+	'''
+	neg_lists:
+	The UK is n't some offshore tax paradise .
+	America no longer has a Greatest Generation .
+	But almost no major economy scores in the top 10
+	Aber es gibt wohl keinen Patienten , der gegen ..
+	In diesem Fall wirkt das Kalzium allerdings nicht elektrisch , sondern chemisch .
+	которых ни у каких претендентов на власть , как правило , нет
+	Никаких сенсаций не будет , не рассчитывайте " , - сказал он журналистам .
+	'''
+	lexicon = inline_lexicons.get(lang, {})
 	for tree in trees:
 		for w in tree:
-			if lang == 'en':
-				if w[2] in ['no', 'not', 'neither']:
-					negs += 1
-					'''
-					The UK is n't some offshore tax paradise .
-					America no longer has a Greatest Generation .
-					But almost no major economy scores in the top 10
-					'''
-			if lang == 'de':
-				if w[2] in ['kein', 'nicht']:
-					negs += 1
-					'''
-					Aber es gibt wohl keinen Patienten , der gegen ..
-					In diesem Fall wirkt das Kalzium allerdings nicht elektrisch , sondern chemisch .
-					'''
-			if lang == 'ru':
-				if w[2] in ['нет', 'не']:
-					negs += 1
-					'''
-					которых ни у каких претендентов на власть , как правило , нет
-					Никаких сенсаций не будет , не рассчитывайте " , - сказал он журналистам .
-					'''
+			if lexicon.get(w[2], 0) & lexicon_bits['neg']:
+				negs += 1
 	return negs
 
 
@@ -1866,34 +1875,16 @@ def sents_complexity(trees):
 
 def demdeterm(trees, lang):
 	res = 0
+	'''
+	dem_lists are ranked by frequency;
+	for Russian there is no distinction between эти полномочия и его полномочия
+	'''
+	## muted item for RU: 'свой',
+	lexicon = inline_lexicons.get(lang, {})
 	for tree in trees:
 		for w in tree:
-			if lang == 'en':
-				'''
-				the list is ranked by frequency
-				'''
-				if w[7] == 'det' and w[2] in ['this', 'some', 'these', 'that', 'any', 'all',
-				                              'every', 'another', 'each', 'those',
-				                              'either', 'such']:
-					res += 1
-			
-			if lang == 'de':
-				if w[7] == 'det' and w[2] in ['dies', 'alle', 'jed', 'einige', 'solch', 'viel',
-				                              'ander ', 'jen', 'all', 'irgendwelch',
-				                              'dieselbe', 'jeglich', 'daßelbe', 'irgendein', 'diejenigen']:
-					res += 1
-			
-			if lang == 'ru':
-				'''
-				for Russian there is no distinction between эти полномочия и его полномочия
-				listed here in order of freq
-				'''
-				## muted item: 'свой',
-				if w[7] == 'det' and w[2] in ['этот', 'весь', 'тот', 'такой', 'какой',
-				                              'каждый', 'любой', 'некоторый', 'какой-то',
-				                              'один', 'сей', 'это', 'всякий', 'некий', 'какой-либо',
-				                              'какой-нибудь', 'кое-какой']:
-					res += 1
+			if w[7] == 'det' and lexicon.get(w[2], 0) & lexicon_bits['dem']:
+				res += 1
 	return res
 
 
@@ -1928,8 +1919,34 @@ def relation_distribution(tree, i_relations):
 	return distribution
 
 
-def ud_probabilities(trees, lang):
-	relations = "acl aux aux:pass ccomp nsubj:pass parataxis xcomp".split() # mark
+## integer ids of the columns of a relation histogram, built once for all documents
+def histogram_columns(*relation_lists):
+	columns = {}
+	for relations in relation_lists:
+		for rel in relations:
+			columns.setdefault(rel, len(columns))
+	return columns
+
+
+## sentences x relations matrix of counts in the document, built with one np.bincount
+def relation_histogram(trees, columns):
+	ncols = len(columns)
+	cells = []
+	for s, tree in enumerate(trees):
+		row = s * ncols
+		for w in tree:
+			k = columns.get(w[7])
+			if k is not None:
+				cells.append(row + k)
+	counts = np.bincount(np.array(cells, dtype=np.int64), minlength=len(trees) * ncols)
+	return counts.reshape(len(trees), ncols), columns
+
+
+ud_relations = "acl aux aux:pass ccomp nsubj:pass parataxis xcomp".split() # mark
+
+
+def ud_probabilities(trees, lang, hist=None):
+	relations = ud_relations
 	'''
 	previous research has shown that
 		aux, ccomp, acl:relcl, mark, xcomp,
@@ -1941,22 +1958,757 @@ def ud_probabilities(trees, lang):
 	                'mark nmod appos nummod acl amod det clf case conj cc fixed flat compound list parataxis orphan ' \
 	                'goeswith reparandum punct root dep acl:relcl flat:name nsubj:pass nummod:gov aux:pass ' \
 	                'flat:foreign obl:agent nummod:entity'.split()
-	relations_d = {rel: [] for rel in relations}
-	for tree in trees:
-		rel_distribution = relation_distribution(tree, relations_d)
-		'''
-		this returns probabilities for the picked dependencies in this sent
-		'''
-		for rel in relations_d.keys():  # reusing the empty dict
-			'''
-			this collects and average the probability stats over sents of the text to the global empty dict
-			'''
-			relations_d[rel].append(rel_distribution[rel])
-			'''
-			values in this dict are lists of probabilities in each sentence; need to average them
-			'''
+	counts, columns = hist if hist else relation_histogram(trees, histogram_columns(relations))
+	counts = counts[:, [columns[rel] for rel in relations]]
+	## relation_distribution for every sentence at once: rows without any of the relations stay zeros
+	totals = counts.sum(axis=1, keepdims=True)
+	probabilities = np.divide(counts, totals, out=counts.astype(float), where=totals > 0)
+	'''
+	values in each column are the probabilities in each sentence; need to average them
+	'''
 	dict_out = {}
-	for rel in relations_d.keys():
-		dict_out[rel] = np.average(relations_d[rel])
+	for i, rel in enumerate(relations):
+		dict_out[rel] = np.average(probabilities[:, i])
 	
 	return dict_out
+
+
+## word lists shared by the single-pass engine and the vectorized kernel below (as in the extractors above)
+ppron_lists = {
+	'en': ['i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'],
+	'de': ['ich', 'ihr', 'du', 'er', 'sie', 'es', 'wir', 'mich', 'mir', 'dich', 'dir', 'ihm', 'ihn', 'uns', 'ihnen'],
+	'ru': ['я', 'ты', 'вы', 'он', 'она', 'оно', 'мы', 'они', 'меня', 'тебя', 'его', 'её', 'ее', 'нас', 'вас', 'их',
+		'неё', 'нее', 'него', 'них', 'мне', 'тебе', 'ей', 'ему', 'нам', 'вам', 'им', 'ней', 'нему', 'ним', 'мной',
+		'мною', 'тобой', 'тобою', 'ею', 'нами', 'вами', 'ими', 'нем', 'нём', 'нею', 'ними']}
+possdet_lists = {
+	'en': ['my', 'your', 'his', 'her', 'its', 'our', 'their'],
+	'de': ['mein', 'dein', 'sein', 'ihr', 'Ihr|ihr', 'unser', 'eurer'],
+	'ru': ['мой', 'твой', 'ваш', 'его', 'ее', 'её', 'наш', 'их', 'ихний', 'свой']}
+cconj_lists = {
+	'en': ['and', 'but', 'or', 'both', 'yet', 'either', '&', 'nor', 'plus', 'neither', 'ether'],
+	'de': ['und', 'oder', 'aber', 'sondern', 'sowie', 'als', 'wie', 'doch', 'sowohl', 'denn', 'desto', 'noch',
+		'weder', 'entweder', 'bzw', 'beziehungsweise', 'weshalb', 'und/oder', 'ob', 'woher', 'wenn', 'jedoch',
+		'wofür', 'insbesondere', 'obwohl', 'um'],
+	'ru': ['и', 'а', 'но', 'или', 'ни', 'да', 'причем', 'либо', 'зато', 'иначе', 'только', 'ан', 'и/или', 'иль']}
+neg_lists = {'en': ['no', 'not', 'neither'], 'de': ['kein', 'nicht'], 'ru': ['нет', 'не']}
+dem_lists = {
+	'en': ['this', 'some', 'these', 'that', 'any', 'all', 'every', 'another', 'each', 'those', 'either', 'such'],
+	'de': ['dies', 'alle', 'jed', 'einige', 'solch', 'viel', 'ander ', 'jen', 'all', 'irgendwelch', 'dieselbe',
+		'jeglich', 'daßelbe', 'irgendein', 'diejenigen'],
+	'ru': ['этот', 'весь', 'тот', 'такой', 'какой', 'каждый', 'любой', 'некоторый', 'какой-то', 'один', 'сей',
+		'это', 'всякий', 'некий', 'какой-либо', 'какой-нибудь', 'кое-какой']}
+modal_lists = {'en': [], 'de': ['dürfen', 'können', 'mögen', 'müssen', 'sollen', 'wollen'], 'ru': []}
+nominal_endings = {'en': ['ment', 'tion'], 'de': ['ung', 'tion'], 'ru': ['тие', 'ение', 'ание', 'ство', 'ция', 'ота']}
+
+
+## lexicon tables: the word lists above and the support lists (searchlists/*.lst) of one language compiled into
+## one dict of word -> bitmask of the lists it is in, so that a word gets all its lexical features with one lookup;
+## ppron is looked up by the lowercased token, possdet by the lowercased lemma, the other lists by the lemma
+lexicon_bits = {name: 1 << k for k, name in enumerate(
+	['ppron', 'possdet', 'cconj', 'neg', 'dem', 'modal', 'mpred', 'madv', 'deverb_stop', 'convert'])}
+
+
+def compile_lexicon(lang, mpred_dic=None, madv_dic=None, stop_dict=None, deverbs=None):
+	lists = {'ppron': ppron_lists.get(lang, []), 'possdet': possdet_lists.get(lang, []),
+		'cconj': cconj_lists.get(lang, []), 'neg': neg_lists.get(lang, []), 'dem': dem_lists.get(lang, []),
+		'modal': modal_lists.get(lang, [])}
+	# the support lists are passed as in compile_rules, ex. mpred_dic = {'en': [...], 'de': [...], 'ru': [...]}
+	for name, dic in [('mpred', mpred_dic), ('madv', madv_dic), ('deverb_stop', stop_dict), ('convert', deverbs)]:
+		if dic is not None:
+			lists[name] = dic[lang]
+	lexicon = {}
+	for name, words in lists.items():
+		for wd in words:
+			lexicon[wd] = lexicon.get(wd, 0) | lexicon_bits[name]
+	return lexicon
+
+
+## reversed-suffix table for word endings (ex. the deverbal suffixes in nominal_endings): ending spelt backwards -> bitmask;
+## suffix_bits reverses the word once and looks up its first k letters for each ending length k
+def suffix_table(endings):
+	table = {}
+	for k, ending in enumerate(endings):
+		table[ending[::-1]] = table.get(ending[::-1], 0) | 1 << k
+	return table, sorted({len(ending) for ending in endings})
+
+
+def suffix_bits(word, table):
+	suffixes, lengths = table
+	backwards = word[::-1]
+	bits = 0
+	for k in lengths:
+		bits |= suffixes.get(backwards[:k], 0)
+	return bits
+
+
+## the lexicons of the word lists above for the extractors that do not get support lists
+inline_lexicons = {lang: compile_lexicon(lang) for lang in ['en', 'de', 'ru']}
+
+
+## shared precomputations: what the extractors need from a sentence besides its words.
+## kids (the children index of Sentence) and feats (the FEATS bitmasks in w[8]) are built once per sentence by
+## read_trees(indexed=True, parse_feats=True); the items of sentence_data are built by shared() the first time
+## a rule or an extractor asks for them, and a Sentence keeps them for all the others
+# the children-by-relation table of a Sentence: position -> {relation: positions of the dependents in the sentence order}
+def kids_by_rel(tree):
+	table = [{} for _ in tree]
+	for i, head in enumerate(tree.heads):
+		if head is not None:
+			table[head].setdefault(tree[i][7], []).append(i)
+	return table
+
+
+sentence_data = {
+	'text': lambda tree: ' '.join(w[1] for w in tree),  # the DM lists and the 'feel like' of epist_stance
+	'depths': tree_depths,  # mhd and mdd
+	'kids_by_rel': kids_by_rel,  # the dependency patterns below
+}
+
+
+def shared(tree, name):
+	cache = getattr(tree, 'cache', None)  # a plain list of words gets it built every time
+	if cache is None:
+		return sentence_data[name](tree)
+	if name not in cache:
+		cache[name] = sentence_data[name](tree)
+	return cache[name]
+
+
+## what the rules of each counter of the engine need (in any of the languages); compile_rules collects the needs
+## of the compiled counters in rules['needs'], so that the collector only builds what the selected features use.
+## The counters that are not here need the words only. The denominators of normalization are counters too
+## (wc, sentnum, verbnum, comp_all, nnargs_all...) and are declared by their features in normalization.spec
+counter_needs = {
+	'ppron': ('feats',), 'possdet': ('feats',), 'indef': ('feats',), 'attrib': ('feats',), 'pasttense': ('feats',),
+	'finites': ('feats', 'kids'), 'mpred': ('feats', 'kids'), 'mquantif': ('kids',),
+	'comp': ('feats', 'kids'), 'sup': ('feats', 'kids'), 'deverbals': ('feats', 'kids'),
+	'epist_stance': ('kids', 'text'), 'mhd': ('depths',), 'mdd': ('depths',),
+	'relativ': ('kids',), 'pied': ('kids',), 'correl': ('kids',), 'lex_ty': ('kids',), 'lex_to': ('kids',),
+	'infs': ('feats', 'kids'), 'pverbals': ('feats', 'kids'), 'bypassives': ('feats', 'kids'),
+	'longpassives': ('feats', 'kids'),
+}
+
+
+## dependency patterns: a pattern is a dict of constraints on a word of a Sentence and on the words around it
+##   form, lemma, upos, xpos, rel -- the field is the value, or one of the values if the value is a list
+##   form_end, upos_has, rel_has -- the field ends with / contains the value ('obl' in w[7] is rel_has='obl')
+##   feats -- the word has the FEATS pairs of the value ('VerbForm=Part' or 'Number=Plur|Person=3'), see w[8];
+##            with one value per attribute, as in UD, this is the substring test 'Number=Plur|Person=3' in w[5]
+##   not_<one of the above> -- the word fails the test
+##   first -- whether the word is the first of the sentence (the positions returned by choose_kid_by_* are often
+##            tested for truth, which leaves out the first word)
+##   head -- a pattern for the head of the word; None: the word has no head in the sentence
+##   kid -- a pattern, or a list of patterns, each matched by some dependent of the word
+##   no_kid -- a pattern, or a list of patterns, none of them matched by a dependent of the word
+##   kids, kids_min -- (pattern, n): exactly / at least n dependents match the pattern
+##   last_kid -- (selection, pattern): the last dependent that matches the selection (as in choose_kid_by_*) exists
+##               and matches the pattern
+##   any -- a list of patterns, one of which the word matches
+##   not -- a pattern, or a list of patterns, that the word does not match
+##   test -- a function (tree, i) for what is left
+## compile_pattern turns a pattern into a function (tree, i) -> bool for the word at position i: the tests of the fields
+## come first, and the dependents of a kid pattern with one relation are looked up in kids_by_rel
+pattern_fields = {'form': 1, 'lemma': 2, 'upos': 3, 'xpos': 4, 'rel': 7}
+
+
+def feats_bits(pairs):  # 'Number=Plur|Person=3'
+	mask = 0
+	for pair in pairs.split('|'):
+		mask |= feat_bit(*pair.split('='))
+	return mask
+
+
+def compile_pattern(pattern):
+	fields = []
+	relations = []
+	for key, value in pattern.items():
+		negated = key.startswith('not_')
+		name = key[4:] if negated else key
+		if name in pattern_fields:
+			k = pattern_fields[name]
+			if isinstance(value, str):
+				test = lambda tree, i, k=k, value=value: tree[i][k] == value
+			else:
+				test = lambda tree, i, k=k, values=frozenset(value): tree[i][k] in values
+		elif name in ('form_end', 'upos_has', 'rel_has'):
+			k = pattern_fields[name.split('_')[0]]
+			if name == 'form_end':
+				test = lambda tree, i, k=k, value=value: tree[i][k].endswith(value)
+			else:
+				test = lambda tree, i, k=k, value=value: value in tree[i][k]
+		elif name == 'feats':
+			mask = feats_bits(value)
+			test = lambda tree, i, mask=mask: tree[i][8] & mask == mask
+		elif name == 'first':
+			test = lambda tree, i, value=value: (i == 0) == value
+		elif key == 'test':
+			continue
+		else:
+			relations.append(compile_relation(key, value))
+			continue
+		fields.append((lambda tree, i, test=test: not test(tree, i)) if negated else test)
+	tests = fields + relations + ([pattern['test']] if 'test' in pattern else [])
+	
+	def match(tree, i):
+		for test in tests:
+			if not test(tree, i):
+				return False
+		return True
+	
+	return match
+
+
+def compile_kid(pattern):
+	rel = pattern.get('rel')
+	if isinstance(rel, str):
+		match = compile_pattern({key: value for key, value in pattern.items() if key != 'rel'})
+		return lambda tree, i: [k for k in shared(tree, 'kids_by_rel')[i].get(rel, ()) if match(tree, k)]
+	match = compile_pattern(pattern)
+	return lambda tree, i: [k for k in tree.kids[i] if match(tree, k)]
+
+
+def compile_relation(key, value):
+	def patterns(value):
+		return value if isinstance(value, list) else [value]
+	
+	if key == 'head':
+		if value is None:
+			return lambda tree, i: tree.heads[i] is None
+		match = compile_pattern(value)
+		return lambda tree, i: tree.heads[i] is not None and match(tree, tree.heads[i])
+	if key == 'kid':
+		kids = [compile_kid(pattern) for pattern in patterns(value)]
+		return lambda tree, i: all(kid(tree, i) for kid in kids)
+	if key == 'no_kid':
+		kids = [compile_kid(pattern) for pattern in patterns(value)]
+		return lambda tree, i: not any(kid(tree, i) for kid in kids)
+	if key == 'kids':
+		kid, n = compile_kid(value[0]), value[1]
+		return lambda tree, i: len(kid(tree, i)) == n
+	if key == 'kids_min':
+		kid, n = compile_kid(value[0]), value[1]
+		return lambda tree, i: len(kid(tree, i)) >= n
+	if key == 'last_kid':
+		kid, match = compile_kid(value[0]), compile_pattern(value[1])
+		
+		def last_kid(tree, i):
+			found = kid(tree, i)
+			return bool(found) and match(tree, found[-1])
+		
+		return last_kid
+	if key == 'any':
+		alternatives = [compile_pattern(pattern) for pattern in value]
+		return lambda tree, i: any(match(tree, i) for match in alternatives)
+	if key == 'not':
+		excluded = [compile_pattern(pattern) for pattern in patterns(value)]
+		return lambda tree, i: not any(match(tree, i) for match in excluded)
+	raise ValueError('unknown pattern key: %s' % key)
+
+
+## single-pass engine for the counts in mega_collector.py
+## compile_rules turns the per-word conditions of the extractors above into rules for one language;
+## each rule is filed under the form, lemma, POS, XPOS or relation it requires, so that a word is only checked against
+## the rules that can fire for it (rules testing FEATS are checked for every word).
+## A rule returns the increment for its counter. The syntactic extractors (modpred, finites for DE, infinitives,
+## participles, passives, get_epistemic_stance) are dependency patterns (see compile_pattern), filed in the same way.
+## The extractors that look at the whole sentence (relativ, which works on the word order, lex_ty_to, tree_depths)
+## are sentence rules: they get the whole tree once in the same loop and return a tuple of increments
+## counters is the set of counters to compile the rules for (all of them by default): the rules of the other counters,
+## and the sentence rules none of whose counters are asked for, are left out
+## NB! the conditions below repeat those in the extractors; if you change one, change the other
+def compile_rules(lang, mpred_dic, madv_dic, stop_dict, deverbs, counters=None):
+	rules = {'form': {}, 'lemma': {}, 'lemma_lower': {}, 'upos': {}, 'xpos': {}, 'rel': {},
+			 'feats': [], 'every': [], 'sent': [], 'zeros': [], 'counters': {'wc'}}
+	if counters is not None and 'simple' in counters:
+		counters = set(counters) | {'numcls'}  # simple sentences are those without numcls
+
+	def wanted(*names):
+		return counters is None or any(name in counters for name in names)
+
+	# index is the field the rule is filed under: form and lemma_lower are lowercased w[1] and w[2]
+	def add(index, keys, counter, check=None):
+		if not wanted(counter):
+			return
+		rules['counters'].add(counter)
+		for key in set(keys):  # a list item occurring twice is still counted once
+			rules[index].setdefault(key, []).append((counter, check))
+
+	def add_every(counter, check):
+		if not wanted(counter):
+			return
+		rules['counters'].add(counter)
+		rules['every'].append((counter, check))
+
+	def add_sent(names, func):
+		if not wanted(*names):
+			return
+		rules['counters'].update(names)
+		rules['sent'].append((names, func))
+
+	# a pattern is filed under its lemma, XPOS, relation, form, FEATS or POS, if it has one;
+	# weight is the increment of a match
+	def add_pattern(counter, pattern, weight=1):
+		if not wanted(counter):
+			return
+		index = next((key for key in ('lemma', 'xpos', 'rel', 'form', 'feats', 'upos') if key in pattern), None)
+		# the form index is lowercased, so the pattern keeps its own test of the form
+		match = compile_pattern({key: value for key, value in pattern.items() if key != index or index == 'form'})
+		check = (lambda w, i, tree: match(tree, i)) if weight == 1 else (lambda w, i, tree: weight * match(tree, i))
+		if index is None:
+			add_every(counter, check)
+		elif index == 'feats':
+			rules['counters'].add(counter)
+			rules['feats'].append((feats_bits(pattern['feats']), counter, check))
+		else:
+			keys = [pattern[index]] if isinstance(pattern[index], str) else pattern[index]
+			add(index, [key.lower() for key in keys] if index == 'form' else keys, counter, check)
+
+	# list membership inside the checks is one lookup in the lexicon of the language
+	lexicon = compile_lexicon(lang, mpred_dic, madv_dic, stop_dict, deverbs)
+	modal_bit, mpred_bit = lexicon_bits['modal'], lexicon_bits['mpred']
+	stop_bit, convert_bit = lexicon_bits['deverb_stop'], lexicon_bits['convert']
+	deverbal_suffixes = suffix_table(nominal_endings[lang])
+
+	## normalization: wordcount is counted by the engine itself, sents_num and verbs_num
+	# FEATS tests are ANDs with the bitmask of the word in w[8]: the trees come from get_trees(data, parse_feats=True)
+	person, poss, pron_ind = feat_bit('Person'), feat_bit('Poss', 'Yes'), feat_bit('PronType', 'Ind')
+	part, fin, past = feat_bit('VerbForm', 'Part'), feat_bit('VerbForm', 'Fin'), feat_bit('Tense', 'Past')
+	short, sing, plur = feat_bit('Variant', 'Short'), feat_bit('Number', 'Sing'), feat_bit('Number', 'Plur')
+	degree_cmp, degree_sup, degree_pos = feat_bit('Degree', 'Cmp'), feat_bit('Degree', 'Sup'), feat_bit('Degree', 'Pos')
+
+	endings = {'en': [':', ';', 'Mr.', 'Dr.'], 'de': [':', ';', 'z.B.', 'Dr.'], 'ru': [':', ';', 'Дж.']}[lang]
+	add_sent(('sentnum',), lambda tree: (tree[-1][2] not in endings,))
+	add('upos', ['VERB'], 'verbnum')
+
+	## prsp
+	add('form', ppron_lists[lang], 'ppron', lambda w, i, tree: 'PRON' in w[3] and w[8] & person > 0 and not w[8] & poss)
+
+	## possdet
+	if lang == 'ru':
+		add('lemma_lower', possdet_lists[lang], 'possdet', lambda w, i, tree: 'DET' in w[3])
+	else:
+		add('lemma_lower', possdet_lists[lang], 'possdet',
+			lambda w, i, tree: w[3] in ['DET', 'PRON'] and w[8] & poss > 0)
+
+	## anysome
+	if lang == 'en':
+		add('lemma', ['anybody', 'anyone', 'anything', 'everybody', 'everyone', 'everything', 'nobody', 'none',
+			'nothing', 'somebody', 'someone', 'something', 'elsewhere', 'nowhere', 'everywhere', 'somewhere',
+			'anywhere'], 'indef')
+	elif lang == 'de':
+		add('lemma', ['etwas', 'irgendetwas', 'irgendwelch', 'irgendwas', 'jedermann', 'jedermanns', 'jemand',
+			'alles', 'niemand', 'nichts', 'irgendwo', 'manch'], 'indef', lambda w, i, tree: w[8] & pron_ind > 0)
+	elif lang == 'ru':
+		add('lemma', ['некто', 'нечто', 'нечего', 'никто', 'ничто', 'нигде', 'никуда', 'ниоткуда'], 'indef',
+			lambda w, i, tree: w[3] == 'PRON')
+		add('lemma', ['кто-кто', 'кого-кого', 'кому-кому', 'кем-кем', 'ком-ком', 'что-что', 'чего-чего', 'чему-чему',
+			'чем-чем', 'куда-куда', 'где-где'], 'indef')
+		# -то, -нибудь, -либо and кое- are counted separately, a word can get both
+		add_every('indef', lambda w, i, tree: 'какой' not in w[2] and (
+			bool(re.search(r'-то|-нибудь|-либо', w[2], re.UNICODE)) + w[2].startswith('кое')))
+
+	## cconj, sconj, whconj
+	add('lemma', cconj_lists[lang], 'cconj', lambda w, i, tree: 'CCONJ' in w[3])
+	sconjs = {
+		'en': ['that', 'if', 'as', 'of', 'while', 'because', 'by', 'for', 'to', 'than', 'whether', 'in', 'about',
+			'before', 'after', 'on', 'with', 'from', 'like', 'although', 'though', 'since', 'once', 'so', 'at',
+			'without', 'until', 'into', 'despite', 'unless', 'whereas', 'over', 'upon', 'whilst', 'beyond', 'towards',
+			'toward', 'but', 'except', 'cause', 'together'],
+		'de': ['daß', 'wenn', 'dass', 'weil', 'da', 'ob', 'wie', 'als', 'indem', 'während', 'obwohl', 'wobei', 'damit',
+			'bevor', 'nachdem', 'sodass', 'denn', 'falls', 'bis', 'sobald', 'solange', 'weshalb', 'ditzen', 'sofern',
+			'warum', 'obgleich', 'zumal', 'sodaß', 'aber', 'wenngleich', 'wennen', 'wodurch', 'wohingegen', 'ehe',
+			'worauf', 'seit', 'inwiefern', 'anstatt', 'der', 'vordem', 'insofern', 'nahezu', 'wohl', 'manchmal',
+			'weilen', 'weiterhin', 'doch', 'mit', 'gleichfalls'],
+		'ru': ['что', 'как', 'если', 'чтобы', 'то', 'когда', 'чем', 'хотя', 'поскольку', 'пока', 'тем', 'ведь',
+			'нежели', 'ибо', 'пусть', 'будто', 'словно', 'дабы', 'раз', 'насколько', 'тот', 'коли', 'коль', 'хоть',
+			'разве', 'сколь', 'ежели', 'покуда', 'постольку']}
+	add('lemma', sconjs[lang], 'sconj', lambda w, i, tree: 'SCONJ' in w[3])
+	whconjs = {'en': ['when', 'where', 'why'], 'de': ['wann', 'wo', 'warum'],
+		'ru': ['когда', 'где', 'куда', 'откуда', 'отчего', 'почему', 'зачем']}
+	add('lemma', whconjs[lang], 'whconj', lambda w, i, tree: tree[-1][2] != '?' and tree[-2][2] != '?')
+
+	## copulas: minus one for each 'there' among the three preceding words
+	add('rel', ['cop'], 'copula', lambda w, i, tree: w[2] in ['be', 'sein', 'быть', 'это'] and (
+		1 - [tree[i - 1][2], tree[i - 2][2], tree[i - 3][2]].count('there')))
+
+	## attrib, pasttense, finites
+	add_every('attrib', lambda w, i, tree: ('ADJ' in w[3] or w[8] & part > 0) and 'amod' in w[7])
+	add_every('pasttense', lambda w, i, tree: w[8] & past > 0)
+	if lang == 'de':
+		# ('sein' and 'werden') in kids_lem of finites is 'werden' in kids_lem
+		not_finite = [{'lemma': 'werden'}, {'lemma': ['können', 'müssen', 'sollen', 'wollen', 'mögen', 'dürfen', 'konnen',
+			'mußen']}]
+		add_pattern('finites', {'feats': 'VerbForm=Fin', 'no_kid': not_finite})
+		# finites() does not get to the Part test for the Fin it leaves out
+		add_pattern('finites', {'feats': 'VerbForm=Part', 'kid': {'rel': 'nsubj'},
+			'no_kid': [{'upos': 'AUX'}, {'lemma': ['sein', 'werden', 'haben']}],
+			'not': [{'feats': 'VerbForm=Fin', 'kid': kid} for kid in not_finite]})
+	else:
+		add_every('finites', lambda w, i, tree: w[8] & fin > 0)
+
+	## modpred
+	mpred_lst = mpred_dic[lang]
+	# the RU modal predicates are also subtracted from infinitives
+	ru_modals = [{'lemma': ['мочь', 'можно', 'нельзя', 'надо']},
+		{'lemma': 'следовать', 'kid': [{'upos': 'VERB'}, {'feats': 'VerbForm=Inf'}]},
+		{'lemma': mpred_lst, 'feats': 'Variant=Short'}] if lang == 'ru' else []
+	if lang == 'en':
+		def have_to(tree, i):
+			w = tree[i]
+			inf_kid_id = choose_kid_by_posfeat(w, tree, 'VERB', 'VerbForm=Inf')
+			if inf_kid_id != None and abs(w[0] - inf_kid_id) < 4:
+				causative1 = choose_kid_by_posrel(w, tree, 'NOUN', 'obj')
+				return not (causative1 != None and causative1 < inf_kid_id)
+			return 0
+
+		add('xpos', ['MD'], 'mpred', lambda w, i, tree: w[2] != 'will' and w[2] != 'shall')
+		add_pattern('mpred', {'lemma': mpred_lst, 'kid': {'upos': 'AUX'}})
+		add_pattern('mpred', {'lemma': 'have', 'not_upos': 'AUX', 'test': have_to})
+	elif lang == 'de':
+		def modal_de(w, i, tree):
+			bits = lexicon.get(w[2], 0)
+			# tagged VM or one of the modal lemmas (misspelt, mislemmatized and mistagged modals)
+			if 'VM' in w[4] or bits & modal_bit:
+				return 1
+			if bits & mpred_bit:
+				kids_lem = get_kids_lem(w, tree)
+				return 'sein' in kids_lem or 'werden' in kids_lem
+			return 0
+
+		add_every('mpred', modal_de)
+	elif lang == 'ru':
+		for pattern in ru_modals:
+			add_pattern('mpred', pattern)
+
+	## advquantif
+	madv_lst = madv_dic[lang]
+	if lang == 'de':
+		def quantif_de(w, i, tree):
+			if w[3] != 'ADV':
+				return 0
+			head = get_headwd(w, tree)
+			return bool(head) and head[3] != 'NOUN'
+
+		add('lemma', madv_lst, 'mquantif', quantif_de)
+	else:
+		add('lemma', madv_lst, 'mquantif', lambda w, i, tree: w[3] == 'ADV')
+	if lang == 'ru':
+		non_ADVquantif = ['еле', 'очень', 'вшестеро', 'невыразимо', 'излишне', 'еле-еле', 'чуть-чуть', 'едва-едва',
+			'только', 'капельку', 'чуточку', 'едва']
+		add('form', non_ADVquantif, 'mquantif', lambda w, i, tree: w[1] in non_ADVquantif)  # based on token, not lemma
+
+	## sentence rules
+	def depths(tree):
+		mhd, mdd = shared(tree, 'depths')
+		return (mhd, mdd) if mhd else (0, 0)
+
+	add_sent(('mhd', 'mdd'), depths)
+	def relatives(tree):
+		rel, _, ppiping, correlat = relativ(tree, lang)
+		return rel, ppiping, correlat
+
+	add_sent(('relativ', 'pied', 'correl'), relatives)
+	add_sent(('lex_ty', 'lex_to'), lambda tree: lex_ty_to(tree, lang))
+
+	## infinitives
+	if lang == 'en':
+		to = {'lemma': 'to', 'upos': 'PART'}
+
+		# the object of have precedes the infinitive: to have the euro replace the dollar
+		def causative(tree, i):
+			obj = choose_kid_by_posrel(tree[tree.heads[i]], tree, 'NOUN', 'obj')
+			return obj != None and obj < tree[i][0]
+
+		add_pattern('infs', {'feats': 'VerbForm=Inf', 'kid': to, 'head': None})
+		add_pattern('infs', {'feats': 'VerbForm=Inf', 'kid': to, 'head': {'lemma': 'have'}, 'test': causative})
+		add_pattern('infs', {'feats': 'VerbForm=Inf', 'kid': to, 'head': {'not_lemma': ['have', 'go'] + mpred_lst}})
+		add_pattern('infs', {'feats': 'VerbForm=Inf', 'no_kid': to, 'not_upos': 'AUX', 'head': {'lemma': [
+			'help', 'make', 'bid', 'let', 'see', 'hear', 'watch', 'dare', 'feel', 'have']}})
+	elif lang == 'de':
+		zu = {'lemma': 'zu', 'upos': 'PART'}
+		add_pattern('infs', {'feats': 'VerbForm=Inf', 'kid': zu, 'not': {'head': {'lemma': mpred_lst}}})
+		add_pattern('infs', {'feats': 'VerbForm=Inf', 'no_kid': zu, 'head': {'lemma': [
+			'hören', 'sehen', 'spüren', 'lassen', 'gehen', 'bleiben', 'helfen', 'lehren']}})
+	elif lang == 'ru':
+		# the быть exclusion of infinitives() never applies: has_auxkid_by_lem returns None
+		add_pattern('infs', {'feats': 'VerbForm=Inf'})
+		for pattern in ru_modals:
+			add_pattern('infs', pattern, weight=-1)
+
+	## participles
+	if lang == 'en':
+		add_pattern('pverbals', {'feats': 'VerbForm=Part', 'not_rel_has': 'amod', 'no_kid': {'upos': 'AUX'},
+			'not': {'form': 'been', 'head': {'kids_min': ({'upos': 'AUX'}, 2)}}})
+		add_pattern('pverbals', {'feats': 'VerbForm=Ger', 'not_rel_has': 'amod', 'head': None})
+	elif lang == 'de':
+		add_pattern('pverbals', {'feats': 'VerbForm=Part', 'not_rel_has': 'amod', 'head': None,
+			'no_kid': [{'upos': 'AUX'}, {'lemma': 'sein'}, {'rel': ['nsubj', 'nsubj:pass']}]})
+		# participles() skips the ADJD test for the participles it leaves out for their dependents or head
+		analytical = {'feats': 'VerbForm=Part', 'not_rel_has': 'amod', 'any': [{'kid': {'upos': 'AUX'}},
+			{'kid': {'lemma': 'sein'}}, {'kid': {'rel': ['nsubj', 'nsubj:pass']}},
+			{'head': {'kid': {'lemma': ['haben', 'werden']}}}]}
+		add_pattern('pverbals', {'xpos': 'ADJD', 'form_end': 'd', 'rel': ['advmod', 'acl'], 'head': {'upos': 'VERB'},
+			'not': analytical})
+	elif lang == 'ru':
+		add_pattern('pverbals', {'feats': 'VerbForm=Part', 'not_feats': 'Variant=Short', 'not_rel_has': 'amod',
+			'no_kid': {'upos': 'AUX'}})
+		add_pattern('pverbals', {'feats': 'VerbForm=Conv', 'no_kid': {'upos': 'AUX'}})
+
+	## passives: longpassives are all passives less the bypassives, plus the passive-like constructions;
+	## a bypassive is an obl dependent of the passive predicate with a by/von dependent (the last obl of each POS)
+	if lang == 'ru':
+		passive = {'feats': 'Voice=Pass', 'any': [{'feats': 'Variant=Short|VerbForm=Part'}, {'feats': 'VerbForm=Fin'}]}
+		# an animate noun in Ins without a preposition, Animacy=Anim being its first FEATS pair
+		agent = {'first': False, 'feats': 'Case=Ins', 'kid': {}, 'no_kid': {'upos': 'ADP'},
+			'not_lemma': ['образ', 'лето', 'осень', 'зима', 'весна', 'утро', 'вечер', 'ночь'],
+			'test': lambda tree, i: tree[i][5].split('|')[0] == 'Animacy=Anim'}
+	else:
+		passive = {'rel': 'aux:pass', 'head': {'feats': 'Voice=Pass' if lang == 'en' else 'VerbForm=Part'}}
+		agent = {'first': False, 'kid': {'lemma': 'by' if lang == 'en' else 'von', 'upos': 'ADP', 'first': False}}
+	add_pattern('longpassives', passive)
+	# passives() does not get to the tests below for the passives without an obl
+	no_obl = {'no_kid': {'upos': ['NOUN', 'PRON', 'PROPN'], 'rel_has': 'obl', 'first': False}}
+	for pos in ['NOUN', 'PRON', 'PROPN']:
+		by_pos = {'last_kid': ({'upos': pos, 'rel_has': 'obl'}, agent)}
+		bypassive = dict(passive, head=dict(passive['head'], **by_pos)) if lang != 'ru' else dict(passive, **by_pos)
+		add_pattern('bypassives', bypassive)
+		add_pattern('longpassives', bypassive, weight=-1)
+	if lang == 'de':
+		# lassen sich + VerbForm=Inf
+		add_pattern('longpassives', {'lemma': 'lassen', 'upos': 'VERB', 'kid': [
+			{'upos': 'PRON', 'feats': 'PronType=Prs|Reflex=Yes', 'first': False},
+			{'upos': 'VERB', 'feats': 'VerbForm=Inf', 'first': False}],
+			'not': dict(passive, head=dict(passive['head'], **no_obl))})
+	elif lang == 'ru':
+		# generic personal sentences with a plural verb: на ошибках учатся, стадион возводят на новом месте
+		def not_approximate(tree, i):
+			text = [w[1] for w in tree] + [w[3] for w in tree]
+			return not ('около' in text and 'NUM' in text)
+
+		plural = {'upos_has': 'VERB', 'feats': 'Number=Plur|Person=3', 'rel_has': 'root', 'not_form': ['есть', 'имеют'],
+			'not': dict(passive, **no_obl), 'test': not_approximate}
+		# one singular nsubj, which is not a quantity, coordinated or counted
+		singular = {'first': False, 'no_kid': [{'rel': 'conj'}, {'upos': 'NUM'}], 'not_lemma': ['все', 'большинство',
+			'часть', 'парочка', 'ряд', 'количество', 'половина', 'треть', 'четверть', 'группа']}
+		add_pattern('longpassives', dict(plural, kids=({'rel': 'nsubj'}, 1),
+			last_kid=({'rel': 'nsubj', 'feats': 'Number=Sing'}, singular)))
+		# no nsubj, and a plural obj only with Voice=Mid (the obj is often the nsubj of an inverted sentence)
+		add_pattern('longpassives', dict(plural, no_kid={'rel': 'nsubj'}, any=[{'feats': 'Voice=Mid'},
+			{'not': {'last_kid': ({'rel': 'obj', 'feats': 'Number=Plur'}, {'first': False})}}]))
+
+	## doc-level functions: polarity, demdeterm, nouns_to_all, sents_complexity, but_counts
+	add('lemma', neg_lists[lang], 'neg')
+	add('lemma', dem_lists[lang], 'demdets', lambda w, i, tree: w[7] == 'det')
+	add('rel', ['nsubj', 'obj', 'iobj'], 'nnargs_all')
+	add('rel', ['nsubj', 'obj', 'iobj'], 'nnargs_nouns', lambda w, i, tree: w[3] == 'NOUN' or w[3] == 'PROPN')
+	add('rel', ['csubj', 'acl:relcl', 'advcl', 'acl', 'xcomp', 'parataxis'], 'numcls')
+	if wanted('simple'):
+		rules['counters'].add('simple')
+		rules['zeros'].append(('numcls', 'simple'))  # sentences without clauses
+
+	# mind that tree[w[0]] is the next word, see but_counts
+	def but(stop):
+		def check(w, i, tree):
+			try:
+				return tree[w[0]][2] not in stop
+			except IndexError:
+				return 0
+		return check
+
+	buts = {'en': ('but', ['also']), 'de': ('aber', ['auch']), 'ru': ('но', ['и', 'также'])}
+	add('lemma', [buts[lang][0]], 'but', but(buts[lang][1]))
+
+	## comparison_degrees: comp and sup are divided by the count of ADJ+ADV (comp_all) in the collector
+	add('upos', ['ADJ', 'ADV'], 'comp_all')
+	add('upos', ['ADJ', 'ADV'], 'comp', lambda w, i, tree: w[8] & degree_cmp > 0)
+	add('upos', ['ADJ', 'ADV'], 'sup', lambda w, i, tree: w[8] & degree_sup > 0)
+	if lang == 'en':
+		# the formants of analytical comparisons
+		add('upos', ['ADJ', 'ADV'], 'comp', lambda w, i, tree: bool(choose_kid_by_lempos(w, tree, 'more', 'ADV')))
+		add('upos', ['ADJ', 'ADV'], 'sup', lambda w, i, tree: bool(choose_kid_by_lempos(w, tree, 'most', 'ADV')))
+	elif lang == 'de':
+		def mehr(w, i, tree):
+			if w[8] & degree_cmp:
+				return 0
+			mehrs_head = get_headwd(w, tree)
+			return bool(mehrs_head) and mehrs_head[3] == 'VERB'
+
+		add('lemma', ['mehr'], 'comp', mehr)
+	elif lang == 'ru':
+		add('upos', ['ADJ', 'ADV'], 'comp', lambda w, i, tree: w[2] == 'больший' and w[8] & degree_pos > 0)
+		add('upos', ['ADJ', 'ADV'], 'sup', lambda w, i, tree: w[2].startswith('наи') and w[8] & degree_pos > 0
+			and not w[2] in ['наивный', 'наискосок'])
+		add('upos', ['ADJ', 'ADV'], 'sup', lambda w, i, tree: bool(choose_kid_by_lempos(w, tree, 'наиболее', 'ADV')))
+		add('upos', ['ADJ', 'ADV'], 'sup', lambda w, i, tree: bool(choose_kid_by_lempos(w, tree, 'самый', 'ADJ')))
+
+	## nominals: the suffixes are in nominal_endings
+	if lang == 'en':
+		def deverbal_en(w, i, tree):
+			bits = lexicon.get(w[2], 0)
+			res = not bits & stop_bit and suffix_bits(w[2], deverbal_suffixes) > 0
+			if bits & convert_bit and not w[1].endswith('ing'):
+				kids_pos = get_kids_pos(w, tree)
+				res += 'DET' in kids_pos or 'ADJ' in kids_pos or not w[8] & sing
+			return res
+
+		add('upos', ['NOUN'], 'deverbals', deverbal_en)
+	elif lang == 'de':
+		def deverbal_de(w, i, tree):
+			bits = lexicon.get(w[2], 0)
+			return (not bits & stop_bit and suffix_bits(w[2], deverbal_suffixes) > 0) + (bits & convert_bit > 0)
+
+		add('upos', ['NOUN'], 'deverbals', deverbal_de)
+	elif lang == 'ru':
+		add('upos', ['NOUN'], 'deverbals', lambda w, i, tree: not lexicon.get(w[2], 0) & stop_bit
+			and suffix_bits(w[2], deverbal_suffixes) > 0 and not w[8] & plur)
+
+	## get_epistemic_stance (added to the epistemic DMs in the collector)
+	if lang == 'en':
+		speaker = {'lemma': ['I', 'we']}
+		add_pattern('epist_stance', {'form': ['argue', 'doubt', 'assume', 'believe', 'find'], 'kid': speaker,
+			'no_kid': {'upos': 'AUX', 'form': 'did'}})
+		add_pattern('epist_stance', {'form': 'say', 'kid': [{'upos': 'AUX', 'form': 'would'}, speaker]})
+		add_pattern('epist_stance', {'form': ['convinced', 'persuaded'], 'kid': [{'lemma': 'be'}, speaker]})
+		add_pattern('epist_stance', {'form': 'feel', 'kid': speaker, 'test': lambda tree, i:
+			'feel like' in shared(tree, 'text') or 'feel that' in shared(tree, 'text')})
+	elif lang == 'ru':
+		add_pattern('epist_stance', {'lemma': ['убежденный', 'уверенный'], 'kid': {'lemma': ['я', 'мы']},
+			'no_kid': {'lemma': 'быть'}})
+	elif wanted('epist_stance'):
+		rules['counters'].add('epist_stance')
+
+	rules['needs'] = set()
+	for counter in rules['counters']:
+		rules['needs'].update(counter_needs.get(counter, ()))
+	return rules
+
+
+## visits every word of every sentence once and returns the dict of counters for the document;
+## the trees need the FEATS bitmasks, get_trees(data, parse_feats=True)
+def fused_counts(trees, rules):
+	res = dict.fromkeys(rules['counters'], 0)
+	by_form, by_lemma, by_lemma_lower = rules['form'], rules['lemma'], rules['lemma_lower']
+	by_upos, by_xpos, by_rel = rules['upos'], rules['xpos'], rules['rel']
+	every = rules['every']
+	zeros = rules['zeros']
+	# the rules filed under FEATS pairs are looked up by the bitmask of the word: the rules whose pairs it has
+	feats_rules = rules['feats']
+	by_feats = {}
+	for tree in trees:
+		res['wc'] += len(tree)
+		before = [res[counter] for counter, _ in zeros]
+		for i, w in enumerate(tree):
+			feats_hits = None
+			if feats_rules:
+				feats_hits = by_feats.get(w[8])
+				if feats_hits is None:
+					feats_hits = by_feats[w[8]] = [(counter, check) for mask, counter, check in feats_rules
+						if w[8] & mask == mask]
+			for hits in (by_form.get(w[1].lower()), by_lemma.get(w[2]), by_lemma_lower.get(w[2].lower()),
+						 by_upos.get(w[3]), by_xpos.get(w[4]), by_rel.get(w[7]), feats_hits):
+				if hits:
+					for counter, check in hits:
+						res[counter] += 1 if check is None else check(w, i, tree)
+			for counter, check in every:
+				res[counter] += check(w, i, tree)
+		for (counter, zero), n in zip(zeros, before):
+			if res[counter] == n:
+				res[zero] += 1
+		for counters, func in rules['sent']:
+			for counter, n in zip(counters, func(tree)):
+				res[counter] += n
+
+	return res
+
+
+## profiling (mega_collector.py --profile-features): the same rules, each of them timed;
+## times[name] is [seconds, calls] for the counter of a rule, or for the counters of a sentence rule joined with /
+def timed_rules(rules, times):
+	def timed(name, check):
+		entry = times.setdefault(name, [0.0, 0])
+
+		def call(*args):
+			start = perf_counter()
+			res = 1 if check is None else check(*args)
+			entry[0] += perf_counter() - start
+			entry[1] += 1
+			return res
+
+		return call
+
+	res = dict(rules)
+	for index in ('form', 'lemma', 'lemma_lower', 'upos', 'xpos', 'rel'):
+		res[index] = {key: [(counter, timed(counter, check)) for counter, check in hits]
+					  for key, hits in rules[index].items()}
+	res['feats'] = [(mask, counter, timed(counter, check)) for mask, counter, check in rules['feats']]
+	res['every'] = [(counter, timed(counter, check)) for counter, check in rules['every']]
+	res['sent'] = [(names, timed('/'.join(names), func)) for names, func in rules['sent']]
+	return res
+
+
+## vectorized kernel for the features that count words matching a condition on their own fields (no tree context);
+## works on CorpusArrays (helpfunctions.py): a condition on a field is evaluated once per vocabulary entry,
+## the boolean table is indexed with the token column, and the masks are summed per document with np.bincount.
+## Each entry gets the mask function m(field, condition) and the language, and returns a token mask
+## (or None if the feature needs the tree for this language, ex. finites for DE; such documents get -1).
+## The counts are those of fused_counts on the same strings, except comp and sup, that miss the analytical forms
+## (so they are at most the counts of the engine), and nn, that the engine does not count; benchmarks/equivalence.py
+## checks this. The strings are those of the reader: corpus_arrays reads ISO-8859-1 like read_doc in mega_collector.py,
+## and on a corpus read as UTF-8 the lemma and form lists of DE and RU (neg, demdets, possdet, ppron, cconj) match
+## other words than in the collector
+kernel_features = {
+	'wc': lambda m, lang: m('upos', lambda s: True),
+	'verbnum': lambda m, lang: m('upos', lambda s: s == 'VERB'),
+	'pasttense': lambda m, lang: m('feats', lambda s: 'Tense=Past' in s),
+	'finites': lambda m, lang: None if lang == 'de' else m('feats', lambda s: 'VerbForm=Fin' in s),
+	'attrib': lambda m, lang: (m('upos', lambda s: 'ADJ' in s) | m('feats', lambda s: 'VerbForm=Part' in s))
+		& m('rel', lambda s: 'amod' in s),
+	'nn': lambda m, lang: m('upos', lambda s: 'NOUN' in s),
+	'neg': lambda m, lang: m('lemma', lambda s: s in neg_lists[lang]),
+	'demdets': lambda m, lang: m('rel', lambda s: s == 'det') & m('lemma', lambda s: s in dem_lists[lang]),
+	'possdet': lambda m, lang: m('lemma', lambda s: s.lower() in possdet_lists[lang]) & (
+		m('upos', lambda s: 'DET' in s) if lang == 'ru'
+		else m('upos', lambda s: s in ['DET', 'PRON']) & m('feats', lambda s: 'Poss=Yes' in s)),
+	'ppron': lambda m, lang: m('upos', lambda s: 'PRON' in s) & m('form', lambda s: s.lower() in ppron_lists[lang])
+		& m('feats', lambda s: 'Person=' in s and 'Poss=Yes' not in s),
+	'cconj': lambda m, lang: m('upos', lambda s: 'CCONJ' in s) & m('lemma', lambda s: s in cconj_lists[lang]),
+	# the Degree counts of comparison_degrees (without the analytical forms with more/most, наиболее/самый)
+	'comp_all': lambda m, lang: m('upos', lambda s: s == 'ADJ' or s == 'ADV'),
+	'comp': lambda m, lang: m('upos', lambda s: s == 'ADJ' or s == 'ADV') & m('feats', lambda s: 'Degree=Cmp' in s),
+	'sup': lambda m, lang: m('upos', lambda s: s == 'ADJ' or s == 'ADV') & m('feats', lambda s: 'Degree=Sup' in s),
+}
+
+
+# langs is the language of each document, by default the name of its folder (data hierarchy: croco/pro/de/*.conllu)
+def kernel_counts(corpus, langs=None, features=None):
+	if langs is None:
+		langs = [os.path.basename(os.path.dirname(name)) for name in corpus.docs]
+	if features is None:
+		features = list(kernel_features)
+	ndocs = len(corpus.docs)
+	doc_index = corpus.doc_index()
+	lang_codes = {lang: i for i, lang in enumerate(sorted(set(langs)))}
+	token_langs = np.array([lang_codes[lang] for lang in langs], dtype=np.int16)[doc_index]
+	res = {f: np.zeros(ndocs, dtype=np.int64) for f in features}
+	
+	for lang, code in lang_codes.items():
+		selected = np.flatnonzero(token_langs == code)
+		docs = doc_index[selected]
+		columns = {}
+		
+		def m(field, condition):
+			table = np.fromiter((condition(s) for s in corpus.strings[field]), dtype=bool,
+			                    count=len(corpus.strings[field]))
+			if field not in columns:
+				columns[field] = getattr(corpus, field)[selected]
+			return table[columns[field]]
+		
+		lang_docs = np.array([l == lang for l in langs])
+		for f in features:
+			mask = kernel_features[f](m, lang)
+			if mask is None:
+				res[f][lang_docs] = -1
+			else:
+				res[f] += np.bincount(docs[mask], minlength=ndocs)
+	
+	return res
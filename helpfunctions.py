@@ -4,11 +4,13 @@
 '''
 this sctipt contains only the lang-independent functions
 '''
-import os
-from igraph import Graph, ARPACKOptions
-from collections import OrderedDict
+import os, sys
+import csv
+from array import array
+from collections import OrderedDict, deque
 from operator import itemgetter
 import warnings
+import numpy as np
 import chardet
 warnings.simplefilter("ignore")
 
@@ -26,46 +28,281 @@ def get_meta(input):
 
 	return lang0,korp0,status0
 
-def get_trees(data): # data is one object: a text or all of corpus as one file
-	sentences = []
-	only_punct = []
+class Sentence(list):
+	'''
+	a sentence that behaves as the usual list of word tuples, but keeps its tree indexed for the helpers below:
+	positions -- UD identifier -> position in the list (no assumption that the first id is 1)
+	heads -- position of each word's head, None for root and for heads that are not in the sentence
+	kids -- positions of each word's dependents in the order of the sentence
+	cache -- the shared precomputations of the sentence (the sentence string, the tree depths), see shared in extractors.py
+	'''
+	__slots__ = ('positions', 'heads', 'kids', 'cache')
+	
+	def __init__(self, words):
+		list.__init__(self, words)
+		self.positions = {w[0]: i for i, w in enumerate(self)}
+		self.heads = [self.positions.get(w[6]) for w in self]
+		self.kids = [[] for _ in self]
+		for i, head in enumerate(self.heads):
+			if head is not None:
+				self.kids[head].append(i)
+		self.cache = {}
+	
+	def kids_of(self, node):
+		own = self.positions.get(node[0])
+		if own is None:
+			return [i for i, w in enumerate(self) if w[6] == node[0]]
+		return self.kids[own]
+
+
+## FEATS as a bitmask: every attribute=value pair, and every attribute for tests like 'Person=' in w[5], is interned
+## the first time it is seen and gets its own bit; values of multivalued features (PronType=Int,Rel) get one bit each.
+## The bits are assigned in the process that parses the data, so masks are only comparable within one process
+feat_bits = {}
+feats_masks = {}
+
+
+def feat_bit(attr, value=None):
+	key = attr if value is None else attr + '=' + value
+	bit = feat_bits.get(key)
+	if bit is None:
+		bit = feat_bits[key] = 1 << len(feat_bits)
+	return bit
+
+
+def feats_mask(feats):  # the FEATS column, ex. 'Number=Sing|Person=3|VerbForm=Fin'
+	mask = feats_masks.get(feats)
+	if mask is None:
+		mask = 0
+		if feats != '_':
+			for pair in feats.split('|'):
+				attr, _, values = pair.partition('=')
+				mask |= feat_bit(attr)
+				for value in values.split(','):
+					mask |= feat_bit(attr, value)
+		feats_masks[feats] = mask
+	return mask
+
+
+# has_feat(w, 'VerbForm', 'Fin') instead of 'VerbForm=Fin' in w[5]; has_feat(w, 'Person') for any Person value;
+# uses the mask in w[8] if the word comes from get_trees(data, parse_feats=True)
+def has_feat(tok, attr, value=None):
+	mask = tok[8] if len(tok) > 8 else feats_mask(tok[5])
+	return mask & feat_bit(attr, value) != 0
+
+
+## streaming reader: yields the sentences of a conllu file (or of any iterable of lines) one by one in a single pass;
+## words at the beginning of a sentence are thrown away as long as the sentence consists of PUNCT only,
+## sentences shorter than minlen are skipped; the counts of both go to stats['bad'] and stats['short'] if stats is given.
+## indexed=True yields Sentence objects, parse_feats=True adds the FEATS bitmask to each word as w[8] (see feats_mask)
+def read_trees(lines, minlen=4, indexed=False, parse_feats=False, stats=None):
+	if stats is None:
+		stats = {}
+	stats.setdefault('bad', 0)
+	stats.setdefault('short', 0)
 	current_sentence = []
-	for line in data:
-		if line.strip() == '':
+	only_punct = True
+	for line in lines:
+		line = line.strip()
+		if not line:
 			if current_sentence:
-				sentences.append(current_sentence)
-
+				if len(current_sentence) >= minlen:
+					yield Sentence(current_sentence) if indexed else current_sentence
+				else:
+					stats['short'] += 1
 			current_sentence = []
-			only_punct = []
-
+			only_punct = True
 			continue
-		if line.strip().startswith('#'):
+		if line[0] == '#':
 			continue
-		res = line.strip().split('\t')
-		(identifier, token, lemma, upos, xpos, feats, head, rel, misc1, misc2) = res
+		(identifier, token, lemma, upos, xpos, feats, head, rel, misc1, misc2) = line.split('\t')
 		if '.' in identifier or '-' in identifier:  # ignore empty nodes possible in the enhanced representations
 			continue
-
-		for i in res:
-			only_punct.append(res[3])
-		var = list(set(only_punct))
+		
 		# throw away sentences that consist of just PUNCT, particularly rare 4+ PUNCT
-		if len(var) == 1 and var[0] == 'PUNCT':
-			continue
+		only_punct = only_punct and upos == 'PUNCT'
+		if only_punct:
+			stats['bad'] += 1
+		elif parse_feats:
+			current_sentence.append((int(identifier), token, lemma, upos, xpos, feats, int(head), rel, feats_mask(feats)))
 		else:
 			current_sentence.append((int(identifier), token, lemma, upos, xpos, feats, int(head), rel))
-
+	
 	if current_sentence:
-		sentences.append(current_sentence)
+		if len(current_sentence) >= minlen:
+			yield Sentence(current_sentence) if indexed else current_sentence
+		else:
+			stats['short'] += 1
+
+
+# data is one object: a text or all of corpus as one file; indexed=True returns Sentence objects;
+# parse_feats=True adds the FEATS bitmask to each word as w[8] (see feats_mask)
+def get_trees(data, indexed=False, parse_feats=False):
+	return list(read_trees(data, indexed=indexed, parse_feats=parse_feats))
+
+
+class CorpusArrays(object):
+	'''
+	columnar representation of a parsed corpus: one NumPy array per field for all tokens of all documents
+	(instead of an 8-tuple of strings per token), for extractors that run as array operations over the whole corpus;
+	string fields are interned: vocabs[field] maps a string to its id, strings[field] maps the id back
+	ids, head -- UD identifier and head identifier of each token (as in the tuples)
+	head_pos -- position of the head in the token arrays, -1 for root and for heads that are not in the sentence
+	sent_offsets -- sentence i is tokens sent_offsets[i]:sent_offsets[i+1]
+	doc_offsets -- document d is sentences doc_offsets[d]:doc_offsets[d+1]; docs[d] is its name (path)
+	the sentences are those that mega_collector.py reads (get_trees on the files read as ISO-8859-1 by read_doc,
+	see corpus_arrays), so that the usual extractors can be run on sentence(i); a corpus read with another encoding
+	has other strings for the non-ASCII words (the lemma lists of de and ru do not match them)
+	'''
+	fields = ('form', 'lemma', 'upos', 'xpos', 'feats', 'rel')
+	
+	def __init__(self, documents):  # documents is an iterable of (name, trees from get_trees)
+		self.vocabs = {f: {} for f in self.fields}
+		self.strings = {f: [] for f in self.fields}
+		self.docs = []
+		# array('i') keeps the columns compact while the corpus is read
+		cols = {f: array('i') for f in self.fields + ('ids', 'head', 'head_pos')}
+		sent_offsets = array('q', [0])
+		doc_offsets = array('q', [0])
+		for name, trees in documents:
+			for tree in trees:
+				start = len(cols['ids'])
+				positions = {w[0]: start + i for i, w in enumerate(tree)}
+				for w in tree:
+					cols['ids'].append(w[0])
+					cols['head'].append(w[6])
+					cols['head_pos'].append(positions.get(w[6], -1) if w[6] != 0 else -1)
+					for f, value in zip(self.fields, (w[1], w[2], w[3], w[4], w[5], w[7])):
+						cols[f].append(self.intern(f, value))
+				sent_offsets.append(len(cols['ids']))
+			doc_offsets.append(len(sent_offsets) - 1)
+			self.docs.append(name)
 		
-	sentences = [s for s in sentences if len(s) >= 4]
+		# the smallest integer type that holds every vocabulary; UPOS and relations fit in int8/int16
+		for f in self.fields:
+			setattr(self, f, np.array(cols[f], dtype=np.min_scalar_type(-len(self.strings[f]) or -1)))
+		self.ids = np.array(cols['ids'], dtype=np.int32)
+		self.head = np.array(cols['head'], dtype=np.int32)
+		self.head_pos = np.array(cols['head_pos'], dtype=np.int64)
+		self.sent_offsets = np.array(sent_offsets, dtype=np.int64)
+		self.doc_offsets = np.array(doc_offsets, dtype=np.int64)
+	
+	def intern(self, field, value):
+		vocab = self.vocabs[field]
+		i = vocab.get(value)
+		if i is None:
+			i = vocab[value] = len(self.strings[field])
+			self.strings[field].append(value)
+		return i
+	
+	def __len__(self):
+		return len(self.ids)
+	
+	@property
+	def nbytes(self):
+		return sum(getattr(self, f).nbytes for f in self.fields + ('ids', 'head', 'head_pos', 'sent_offsets', 'doc_offsets'))
+	
+	def code(self, field, values):
+		# ids of the strings for np.isin(corpus.lemma, corpus.code('lemma', [...])); unseen strings are left out
+		vocab = self.vocabs[field]
+		return np.array([vocab[v] for v in values if v in vocab], dtype=getattr(self, field).dtype)
+	
+	def sentence(self, i, indexed=False):
+		# sentence i as the list of word tuples returned by get_trees
+		a, b = self.sent_offsets[i], self.sent_offsets[i + 1]
+		columns = [self.ids[a:b].tolist()]
+		for f in ('form', 'lemma', 'upos', 'xpos', 'feats'):
+			strings = self.strings[f]
+			columns.append([strings[k] for k in getattr(self, f)[a:b].tolist()])
+		columns.append(self.head[a:b].tolist())
+		columns.append([self.strings['rel'][k] for k in self.rel[a:b].tolist()])
+		words = list(zip(*columns))
+		return Sentence(words) if indexed else words
+	
+	def document(self, d, indexed=False):
+		return [self.sentence(i, indexed) for i in range(self.doc_offsets[d], self.doc_offsets[d + 1])]
+	
+	# segment ids: number of the sentence (document) of each token, for np.bincount(corpus.sent_index(), weights=...)
+	def sent_index(self):
+		return np.repeat(np.arange(len(self.sent_offsets) - 1), np.diff(self.sent_offsets))
+	
+	def doc_index(self):
+		return np.repeat(np.arange(len(self.docs)), self.doc_lengths())
+	
+	def doc_lengths(self):
+		# number of tokens in each document
+		return np.diff(self.sent_offsets[self.doc_offsets])
+
+
+# reads all *.conllu in the folder tree (ex. preprocessed/croco/pro/de/) into one CorpusArrays;
+# the encoding is that of read_doc in mega_collector.py, so the strings are those the collector sees
+def corpus_arrays(folder, encoding='ISO-8859-1'):
+	paths = []
+	for subdir, dirs, files in os.walk(folder):
+		paths += [subdir + os.sep + file for file in sorted(files) if file.endswith('.conllu')]
+	return conllu_arrays(paths, encoding)
+
+
+def conllu_arrays(paths, encoding='ISO-8859-1'):
+	def documents():
+		for path in paths:
+			with open(path, encoding=encoding) as f:
+				yield path, get_trees(f)
+	
+	return CorpusArrays(documents())
+
+
+class RowWriter(object):
+	'''
+	a table that is written row by row as the documents are processed:
+	the rows go to path + '.tmp', which is flushed every flush_every rows and renamed to path by close(),
+	so that an interrupted run never leaves a half-written table in place of the previous one;
+	rows are dicts, their values are written in the order of the header
+	'''
+	def __init__(self, path, header, flush_every=100, delimiter='\t'):
+		self.path = path
+		self.tmp = path + '.tmp'
+		self.header = header
+		self.flush_every = flush_every
+		self.rows = 0
+		self.file = open(self.tmp, 'w')
+		self.writer = csv.writer(self.file, delimiter=delimiter)
+		self.writer.writerow(header)
+	
+	def writerow(self, row):
+		self.writer.writerow([row[k] for k in self.header])
+		self.rows += 1
+		if self.rows % self.flush_every == 0:
+			self.file.flush()
+	
+	def close(self):
+		self.file.close()
+		os.replace(self.tmp, self.path)
+	
+	def discard(self):
+		self.file.close()
+		os.remove(self.tmp)
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc, tb):
+		if exc_type is None:
+			self.close()
+		else:
+			self.discard()
 
-	return sentences
 
 ## functions to traverse the trees
 def get_headwd(node, sentence): # when calling, test whether head exists --- if head:
 	head_word = None
 	head_id = node[6]
+	
+	if isinstance(sentence, Sentence):
+		head = sentence.positions.get(head_id)
+		if head is not None:
+			head_word = sentence[head]
+		return head_word
 
 	for word in sentence:
 		if head_id == word[0]:
@@ -76,26 +313,37 @@ def get_headwd(node, sentence): # when calling, test whether head exists --- if
 def get_kids(node, sentence):
 	kids = []
 	own_id = node[0]
+	
+	if isinstance(sentence, Sentence):
+		return [sentence[i] for i in sentence.kids_of(node)]
 
 	for word in sentence:
 		if own_id == word[6]:
 			kids.append(word)
 	return kids # requires iteration of children to get info on individual properties
 
+# position of a dependent in the sentence list, to be used as tree[targetedkid_ind]
+def kid_index(kid, sentence):
+	if isinstance(sentence, Sentence):
+		return sentence.positions[kid[0]]
+	## -1 is needed because tree[id] is refering to a 0-based list of words!
+	## if no -1, I get: true_id=17, tree[true_id]==(18, ':', ':', 'PUNCT', ':', '_', 14, 'punct')
+	if sentence[0][0] == 2:
+		'''
+		this is a systemic error: in ru-data I have 7% of sentences that start with 2, instead of 1 which screws indexing
+		ex. Нападения на иностранных студентов: tree[1] gets 'на' which has id=3, but in a zero-based Python tree-list is 1
+		Sentence objects (get_trees(data, indexed=True)) look the position up instead
+		'''
+		return kid[0] - 2
+	return kid[0] - 1
+
 def choose_kid_by_featrel(node, sentence, feat, rel):
 	targetedkid_ind = None
 	kids = get_kids(node, sentence)
 	for kid in kids:
 		# specify kids features
 		if kid[7] == rel and feat in kid[5]:
-			if sentence[0][0] == 2:
-				'''
-				this is a systemic error: in ru-data I have 7% of sentences that start with 2, instead of 1 which screws indexing
-				ex. Нападения на иностранных студентов: tree[1] gets 'на' which has id=3, but in a zero-based Python tree-list is 1
-				'''
-				targetedkid_ind = kid[0] - 2
-			else:
-				targetedkid_ind = kid[0]-1  # to be used as tree[targetedkid_ind]
+			targetedkid_ind = kid_index(kid, sentence)
 	return targetedkid_ind
 
 def choose_kid_by_posfeat(node, sentence, pos, feat):
@@ -104,14 +352,7 @@ def choose_kid_by_posfeat(node, sentence, pos, feat):
 	for kid in kids:
 		# specify kids features
 		if kid[3] == pos and feat in kid[5]:
-			if sentence[0][0] == 2:
-				'''
-				this is a systemic error: in ru-data I have 7% of sentences that start with 2, instead of 1 which screws indexing
-				ex. Нападения на иностранных студентов: tree[1] gets 'на' which has id=3, but in a zero-based Python tree-list is 1
-				'''
-				targetedkid_ind = kid[0] - 2
-			else:
-				targetedkid_ind = kid[0]-1  # to be used as tree[targetedkid_ind]
+			targetedkid_ind = kid_index(kid, sentence)
 	return targetedkid_ind
 
 def choose_kid_by_posrel(node, sentence, pos, rel):
@@ -120,16 +361,7 @@ def choose_kid_by_posrel(node, sentence, pos, rel):
 	for kid in kids:
 		# specify kids features
 		if kid[3] == pos and rel in kid[7]:
-			## -1 is needed because tree[id] is refering to a 0-based list of words!
-			## if no -1, I get: true_id=17, tree[true_id]==(18, ':', ':', 'PUNCT', ':', '_', 14, 'punct')
-			if sentence[0][0] == 2:
-				'''
-				this is a systemic error: in ru-data I have 7% of sentences that start with 2, instead of 1 which screws indexing
-				ex. Нападения на иностранных студентов: tree[1] gets 'на' which has id=3, but in a zero-based Python tree-list is 1
-				'''
-				targetedkid_ind = kid[0] - 2
-			else:
-				targetedkid_ind = kid[0]-1  # to be used as tree[targetedkid_ind]
+			targetedkid_ind = kid_index(kid, sentence)
 	return targetedkid_ind
 
 def choose_kid_by_lempos(node, sentence, lemma, pos):
@@ -138,14 +370,7 @@ def choose_kid_by_lempos(node, sentence, lemma, pos):
 	for kid in kids:
 		# specify kids features
 		if kid[3] == pos and kid[2] == lemma:
-			if sentence[0][0] == 2:
-				'''
-				this is a systemic error: in ru-data I have 7% of sentences that start with 2, instead of 1 which screws indexing
-				ex. Нападения на иностранных студентов: tree[1] gets 'на' which has id=3, but in a zero-based Python tree-list is 1
-				'''
-				targetedkid_ind = kid[0] - 2
-			else:
-				targetedkid_ind = kid[0] - 1  # to be used as tree[targetedkid_ind]
+			targetedkid_ind = kid_index(kid, sentence)
 	return targetedkid_ind
 	
 def has_auxkid_by_lem(node, sentence, lemma):
@@ -177,63 +402,39 @@ def has_auxkid_by_tok(node, sentence, token):
 
 # list of dependents pos
 def get_kids_pos(node, sentence):  # there are no native tags (XPOS) in Russian corpora
-	kids_pos = []
-	own_id = node[0]
-	for word in sentence:
-		if own_id == word[6]:
-			kids_pos.append(word[3])
-	return kids_pos
+	return [word[3] for word in get_kids(node, sentence)]
 
 # list of dependents pos
 def get_kids_xpos(node, sentence):  # there are no native tags (XPOS) in Russian corpora
-	kids_xpos = []
-	own_id = node[0]
-	for word in sentence:
-		if own_id == word[6]:
-			kids_xpos.append(word[4])
-	return kids_xpos
+	return [word[4] for word in get_kids(node, sentence)]
 
 # list of dependents dependency relations to the node
 def get_kids_rel(node, sentence):
-	kids_rel = []
-	own_id = node[0]
-	for word in sentence:
-		if own_id == word[6]:
-			kids_rel.append(word[7])
-	return kids_rel
+	return [word[7] for word in get_kids(node, sentence)]
 
 # flattened list of grammatical values; use with care in cases where there are many dependents
 # -- gr feature can be on some other dependent
 def get_kids_feats(node, sentence):
-	deps_feats0 = []
-	deps_feats1 = []
 	deps_feats = []
-	own_id = node[0]
-	for word in sentence:
-		if own_id == word[6]:
-			deps_feats0.append(word[5])
+	for word in get_kids(node, sentence):
 		# split the string of several features and flatten the list
-		for el in deps_feats0:
-			try:
-				el_lst = el.split('|')
-				deps_feats1.append(el_lst)
-			except:
-				deps_feats1.append(el)
-		deps_feats = [y for x in deps_feats1 for y in x]  # flatten the list
+		deps_feats.extend(word[5].split('|'))
 	return deps_feats
 
 # list of dependents lemmas
 def get_kids_lem(node, sentence):
-	kids_lem = []
-	own_id = node[0]
-	for word in sentence:
-		if own_id == word[6]:
-			kids_lem.append(word[2])
-	return kids_lem
+	return [word[2] for word in get_kids(node, sentence)]
 
 
 def get_prev(node, sentence):
 	prev = None
+	
+	if isinstance(sentence, Sentence):
+		node_id = sentence.positions.get(node[0])
+		if node_id is not None and sentence[node_id] == node:
+			prev = sentence[node_id - 1]
+		return prev
+	
 	for i,w in enumerate(sentence):
 		if w == node:
 			node_id = i
@@ -405,3 +606,47 @@ def dms_support_all_langs(lang):
 
 	
 	return add_list, adv_list, caus_list, temp_sequen_list, epist_list
+
+
+## a multi-pattern (Aho-Corasick) automaton for the five DM searchlists of one language
+# lists is a dict of category -> searchlist, ex. {'addit': [...], 'advers': [...]}, see count_all_dms in extractors.py;
+# the patterns keep the padding of count_dms: 'Upper ' for capitalised items, ' lower ' and 'Lower ' for the rest
+def dms_automaton(lists):
+	goto = [{}]
+	out = [()]
+	for cat, lst in lists.items():
+		for item_id, i in enumerate(lst):
+			i = i.strip()
+			if not i:
+				print('blank line in the %s list is ignored' % cat, file=sys.stderr)
+				continue
+			if i[0].isupper():
+				patterns = [i + ' ']
+			else:
+				patterns = [' ' + i + ' ', i.capitalize() + ' ']
+			for pattern in patterns:
+				state = 0
+				for char in pattern:
+					if char not in goto[state]:
+						goto[state][char] = len(goto)
+						goto.append({})
+						out.append(())
+					state = goto[state][char]
+				# an item is identified by its list position, so that duplicates in a list are counted twice as before
+				if (cat, item_id) not in out[state]:
+					out[state] += ((cat, item_id),)
+	
+	# failure links are set breadth-first; each state inherits the matches of its failure state
+	fail = [0] * len(goto)
+	queue = deque(goto[0].values())
+	while queue:
+		state = queue.popleft()
+		for char, nxt in goto[state].items():
+			queue.append(nxt)
+			f = fail[state]
+			while f and char not in goto[f]:
+				f = fail[f]
+			fail[nxt] = goto[f].get(char, 0)
+			out[nxt] += tuple(m for m in out[fail[nxt]] if m not in out[nxt])
+	
+	return list(lists), goto, fail, out
@@ -1,26 +1,43 @@
 '''
 produces a dictionary with each text values for each feature + a class value (type) for three languages
 the language index is taken from the folder name and needs to be set up accordingly
+
+USAGE:
+python3 mega_collector.py
+python3 mega_collector.py --input /your/path/preprocessed --output out.tsv --jobs 8
+-- with --jobs N documents are processed in N worker processes; rows are written in the os.walk order,
+so the table is the same as the one produced by a serial run
+python3 mega_collector.py --input /your/path/preprocessed --output out.tsv --manifest out.manifest.json
+-- the manifest keeps the content hash of each document with its raw results; a rerun only re-extracts new or changed
+documents, and only the DM counts if just the DM searchlists have changed
+python3 mega_collector.py --input /your/path/preprocessed --output dms_ud.tsv --features dms ud
+python3 mega_collector.py --input /your/path/preprocessed --output out.tsv --exclude-features mhd mdd relativ pied correl
+-- only the extractors needed for the chosen features are run (see the feature registry below)
+python3 mega_collector.py --input /your/path/preprocessed --output out.tsv --profile-features
+-- times each extractor per language and prints the total time, calls, mean time per sentence and share of runtime;
+the table is also saved next to the output as out_profile.tsv
+python3 mega_collector.py --input /your/path/preprocessed --output raw.tsv --raw
+-- writes the raw counts and the denominators (wc, sentnum, verbnum, etc.) instead of the features;
+the features are normalised as set in normalization.spec (see --spec), or later from raw.tsv with normalize.py
 '''
 import os, sys
-import csv
+import json
+import hashlib
+import argparse
+from time import perf_counter
+from multiprocessing import Pool
+import helpfunctions
 from extractors import *
+from normalize import meta, default_spec, load_spec, normalize
 
 rootdir = 'C:/Users/Fox0197/Desktop/funktion//'
 data = rootdir + 'preprocessed'
 outname = rootdir + 'out.tsv'
 
-# here, for each file we collect counts averaged over number of words or number of sentences
-## muted features: passives interrog andor wdlength mark nn
-keys = 'afile alang akorp astatus ' \
-       'sentlength ppron possdet indef cconj whconj relativ pied correl copula ' \
-       'attrib pasttense lexdens lexTTR mquantif mpred finites infs pverbals deverbals ' \
-       'bypassives longpassives sconj addit advers caus tempseq epist but comp ' \
-       'sup neg numcls simple demdets nnargs mhd mdd acl aux ' \
-       'aux:pass ccomp nsubj:pass parataxis xcomp'.split()
-master_dict = {k: [] for k in keys}
-
-basic_stats = {}
+# here, for each file we collect raw counts; the features are these counts averaged over number of words
+# or number of sentences, etc., as set in normalization.spec
+dm_categories = ['addit', 'advers', 'caus', 'tempseq', 'epist']
+
 languages = ['en', 'de', 'ru']
 adv_support = {}
 mpred_support = {}
@@ -32,244 +49,436 @@ adversative = {}
 causal = {}
 sequen = {}
 epistem = {}
+dm_automata = {}
+fused_rules = {}
+# hashes of the support lists each part of the results depends on, by language (see doc_parts)
+support_hashes = {}
 
-for l in languages:
-	# import all the lists for the three languages and add them to a lang-dictionary with three lang-keys
-	adv_lst, mpred_lst, pseudo_deverbs_lst, vconverts_lst = support_all_lang(l)
-	adv_support[l] = adv_lst
-	mpred_support[l] = mpred_lst
-	pseudo_deverbs[l] = pseudo_deverbs_lst
-	vconverts[l] = vconverts_lst
-	
-	additive_lst, adversative_lst, causal_lst, sequen_lst, epistem_lst = dms_support_all_langs(l)
-	additive[l] = additive_lst
-	adversative[l] = adversative_lst
-	causal[l] = causal_lst
-	sequen[l] = sequen_lst
-	epistem[l] = epistem_lst
-	
-	print('---', file=sys.stderr)
-	print('Importing support lists for %s:' % l.upper(), file=sys.stderr)
-	print('==%s adverbial qualtifiers' % len(adv_support[l]), file=sys.stderr)
-	print('==%s modal predicative adjectives' % len(mpred_support[l]),file=sys.stderr)
-	print('==%s stopwords for deverbal nouns' % len(pseudo_deverbs[l]), file=sys.stderr)
-	print('==%s verbal nouns by conversion' % len(vconverts[l]), file=sys.stderr)
-	print('',file=sys.stderr)
-	print('Importing DM searchlists for %s:' % l.upper(), file=sys.stderr)
-	print('==%s additive' % len(additive[l]), file=sys.stderr)
-	print('==%s adversative' % len(adversative[l]),file=sys.stderr)
-	print('==%s causative' % len(causal[l]), file=sys.stderr)
-	print('==%s temporal/sequencial' % len(sequen[l]), file=sys.stderr)
-	print('==%s DM of epistemic stance' % len(epistem[l]), file=sys.stderr)
-	
-for subdir, dirs, files in os.walk(data):
-	for i, file in enumerate(files):
-		
-		filepath = subdir + os.sep + file
-		last_folder = subdir + os.sep
-		
-		lang_folder = len(os.path.abspath(last_folder).split(os.sep)) - 1  # 'ru' # 'en', #'de'
 
-		language = os.path.abspath(last_folder).split(os.sep)[lang_folder]
-		
-		# data hierachy: /your/path/preprocessed/croco/pro/de/*.conllu
-		
-		# this collects counts for every sentence in a document
-		# prepare for writing metadata:
-		lang, korp, status = get_meta(last_folder)
-		meta_str = '_'.join(get_meta(last_folder)) # lang, korp, status
-		
-		if i % 20 == 0:
-			print('I have processed %s files from %s' % (i, meta_str.upper()), file=sys.stderr)
-		
-		# don't forget the filename
-		doc = os.path.splitext(os.path.basename(last_folder + filepath))[0]  # without extention
+def hash_lists(*lists):
+	h = hashlib.sha1()
+	for lst in lists:
+		h.update('\n'.join(lst).encode('utf-8'))
+		h.update(b'\0')
+	return h.hexdigest()
 
-		data = open(filepath, encoding='ISO-8859-1').readlines()
-		
-		corp_id = lang + '_' + status + '_' + korp
-		sents = get_trees(data)
-		if corp_id in basic_stats.keys():
-			basic_stats[corp_id] += len(sents)
-		else:
-			basic_stats[corp_id] = len(sents)
-		
-		current = {}
-		
-		# call functions that operate at doc-level and write to dic for current file
-		# get text parameters for normalization
-		normBy_wc = wordcount(sents)
-		normBy_sentnum = sents_num(sents, language)
-		normBy_verbnum = verbs_num(sents, language)
-		
-		## create text-level counters for each feature values
-		ppron_res = 0
-		possdet_res = 0
-		anysome_res = 0
-		cconj_res = 0
-		sconj_res = 0
-		advconj_res = 0
-		relativ_res = 0
-		pied_res = 0
-		correl_res = 0
-		copula_res = 0
-		# wdlength_res = 0
-		# interrog_res = 0
-		# nn_res = 0
-		attrib_res = 0
-		pasttense_res = 0
-		lex_ty_res = 0
-		lex_to_res = 0
-		mpred_res = 0
-		mquantif_res = 0
-		finites_res = 0
-		### adding July2019 features
-		infs_res = 0
-		pverbals_res = 0
-		# passives_res = 0
-		bypassives_res = 0
-		longpassives_res = 0
+
+# counters are the counters of the engine to compile the rules for (all by default), see compile_rules
+def load_supports(verbose=False, counters=None):
+	for l in languages:
+		# import all the lists for the three languages and add them to a lang-dictionary with three lang-keys
+		adv_lst, mpred_lst, pseudo_deverbs_lst, vconverts_lst = support_all_lang(l)
+		adv_support[l] = adv_lst
+		mpred_support[l] = mpred_lst
+		pseudo_deverbs[l] = pseudo_deverbs_lst
+		vconverts[l] = vconverts_lst
 		
-		speakdiff_res = 0
-		readerdiff_res = 0
+		additive_lst, adversative_lst, causal_lst, sequen_lst, epistem_lst = dms_support_all_langs(l)
+		additive[l] = additive_lst
+		adversative[l] = adversative_lst
+		causal[l] = causal_lst
+		sequen[l] = sequen_lst
+		epistem[l] = epistem_lst
+		dm_automata[l] = dms_automaton(dict(zip(dm_categories,
+		                                        [additive_lst, adversative_lst, causal_lst, sequen_lst, epistem_lst])))
+		fused_rules[l] = compile_rules(l, mpred_support, adv_support, pseudo_deverbs, vconverts, counters=counters)
+		support_hashes[l] = {'counts': hash_lists(adv_lst, mpred_lst, pseudo_deverbs_lst, vconverts_lst),
+		                     'dms': hash_lists(additive_lst, adversative_lst, causal_lst, sequen_lst, epistem_lst),
+		                     'text': ''}
 		
+		if not verbose:
+			continue
+		print('---', file=sys.stderr)
+		print('Importing support lists for %s:' % l.upper(), file=sys.stderr)
+		print('==%s adverbial qualtifiers' % len(adv_support[l]), file=sys.stderr)
+		print('==%s modal predicative adjectives' % len(mpred_support[l]),file=sys.stderr)
+		print('==%s stopwords for deverbal nouns' % len(pseudo_deverbs[l]), file=sys.stderr)
+		print('==%s verbal nouns by conversion' % len(vconverts[l]), file=sys.stderr)
+		print('',file=sys.stderr)
+		print('Importing DM searchlists for %s:' % l.upper(), file=sys.stderr)
+		print('==%s additive' % len(additive[l]), file=sys.stderr)
+		print('==%s adversative' % len(adversative[l]),file=sys.stderr)
+		print('==%s causative' % len(causal[l]), file=sys.stderr)
+		print('==%s temporal/sequencial' % len(sequen[l]), file=sys.stderr)
+		print('==%s DM of epistemic stance' % len(epistem[l]), file=sys.stderr)
+
+
+# pool initializer: each worker process reads the lists once and reuses them for all its documents
+def init_worker(counters=None, profile=False, lists=None):
+	if lists:
+		helpfunctions.lists_path = os.path.join(lists, '')
+	load_supports(counters=counters)
+	if profile:
+		start_profile()
+
+
+## --profile-features: feature_times[lang][name] is [seconds, calls] of an extractor, i.e. of the rules of a counter
+## of the engine (see timed_rules in extractors.py), or of the reading and of each part of the results of a document;
+## it stays None without the flag, and then nothing is timed
+feature_times = None
+
+
+def start_profile():
+	global feature_times
+	feature_times = {l: {} for l in languages}
+	for l in languages:
+		fused_rules[l] = timed_rules(fused_rules[l], feature_times[l])
+
+
+def timed_part(language, name, func, *args):
+	if feature_times is None:
+		return func(*args)
+	start = perf_counter()
+	res = func(*args)
+	entry = feature_times[language].setdefault(name, [0.0, 0])
+	entry[0] += perf_counter() - start
+	entry[1] += 1
+	return res
+
+
+# in a worker: the results of a document with the times collected for it, which are reset for the next document
+def profiled_parts(job):
+	res = extract_parts(job)
+	snapshot = {}
+	for l, times in feature_times.items():
+		snapshot[l] = {name: list(entry) for name, entry in times.items() if entry[1]}
+		for entry in times.values():
+			entry[0], entry[1] = 0.0, 0
+	return res, snapshot
+
+
+def merge_times(snapshot):
+	for l, times in snapshot.items():
+		for name, (seconds, calls) in times.items():
+			entry = feature_times[l].setdefault(name, [0.0, 0])
+			entry[0] += seconds
+			entry[1] += calls
+
+
+# rows of the profile for the languages with documents; the share is that of the runtime of the documents
+# of the language (reading and parts), so the extractors of the engine add up to the share of counts
+def profile_rows(sents):
+	rows = []
+	for l in languages:
+		times = feature_times[l]
+		if not sents.get(l):
+			continue
+		total = sum(times[part][0] for part in ('read',) + doc_parts if part in times) or 1.0
+		for name, (seconds, calls) in sorted(times.items(), key=lambda item: -item[1][0]):
+			rows.append({'language': l, 'feature': name, 'seconds': '%.4f' % seconds, 'calls': calls,
+			             'us_per_sentence': '%.2f' % (seconds * 1e6 / sents[l]), 'share': '%.4f' % (seconds / total)})
+	return rows
+
+
+## feature registry: each feature of the table needs the raw columns of its line in normalization.spec;
+## a raw column comes from one part of the results (doc_parts): the DM categories from dms, the sentence count,
+## sentence length and UD probabilities from text, and all the other columns from the counters of the engine in counts.
+## Only the parts and the engine rules needed for the selected features are run; text is always there for basic_stats
+feature_groups = {'dms': dm_categories, 'ud': ud_relations}
+text_columns = ['sents', 'sentlength'] + ud_relations
+
+
+# the lines of the spec for the features (or groups of features) asked for, without the excluded ones
+def select_features(spec, features=None, exclude=None):
+	def expand(names):
+		res = []
+		for name in names:
+			res.extend(feature_groups.get(name, [name]))
+		return res
+	
+	known = [feature for feature, _, _ in spec]
+	unknown = [name for name in expand((features or []) + (exclude or [])) if name not in known]
+	if unknown:
+		raise ValueError('unknown features: %s; the features are %s' % (' '.join(unknown), ' '.join(known)))
+	chosen = set(expand(features)) if features else set(known)
+	excluded = set(expand(exclude or []))
+	return [line for line in spec if line[0] in chosen and line[0] not in excluded]
+
+
+def column_part(col):
+	if col in dm_categories:
+		return 'dms'
+	if col in text_columns:
+		return 'text'
+	return 'counts'
+
+
+# the raw columns needed for the spec, by part
+def needed_columns(spec):
+	columns = {part: set() for part in doc_parts}
+	for feature, numerator, denominator in spec:
+		for col in numerator + ([denominator] if denominator else []):
+			columns[column_part(col)].add(col)
+	return columns
+
+
+# the parts of the results for a document: with --manifest a part is recomputed only if the document, the extractors
+# or the support lists the part depends on (see support_hashes) have changed since the last run
+doc_parts = ('counts', 'dms', 'text')
+
+
+# the language is the name of the last folder: /your/path/preprocessed/croco/pro/de/*.conllu
+def doc_language(subdir):
+	last_folder = subdir + os.sep
+	lang_folder = len(os.path.abspath(last_folder).split(os.sep)) - 1  # 'ru' # 'en', #'de'
+	return os.path.abspath(last_folder).split(os.sep)[lang_folder]
+
+
+# what the parts need from the sentences besides the words, see sentence_data in extractors.py;
+# the needs of counts are those of the compiled rules
+part_needs = {'dms': {'text'}, 'text': set()}
+
+
+# reads the sentences of a document with what the parts need from them:
+# the reader builds the children index and the FEATS bitmasks only if the parts need them (see counter_needs);
+# the shared precomputations of a sentence are kept in its index
+def read_doc(filepath, language, parts, encoding='ISO-8859-1'):
+	needs = set()
+	for part in parts:
+		needs.update(fused_rules[language]['needs'] if part == 'counts' else part_needs[part])
+	with open(filepath, encoding=encoding) as f:
+		return timed_part(language, 'read', lambda: list(read_trees(f, indexed='kids' in needs,
+		                                                             parse_feats='feats' in needs)))
+
+
+# the requested parts of the results for the sentences of a document
+def sents_parts(sents, language, parts):
+	res = {}
+	if 'counts' in parts:
+		# one traversal of the document collects all counts of the sentence-level and doc-level extractors
+		# (see compile_rules and fused_counts in extractors.py) and the text parameters for normalization
+		res['counts'] = timed_part(language, 'counts', fused_counts, sents, fused_rules[language])
+	if 'dms' in parts:
 		## text-level counts
-		deverbals_res = nominals(sents, language, pseudo_deverbs, vconverts)
-		
-		addit_res = count_dms(additive, sents, language)
-		advers_res = count_dms(adversative, sents, language)
-		caus_res = count_dms(causal, sents, language)
-		tempseq_res = count_dms(sequen, sents, language)
-		epist_res = count_dms(epistem, sents, language)+get_epistemic_stance(sents, language)
-		
-		# andor_res = and_or_counts(sents, language)
-		but_res = but_counts(sents, language)
-		
-		## counts for degrees of comparison normalized internally for num of adj+adv
-		comp_res, sup_res = comparison_degrees(sents, language)
-		
-		neg_res = polarity(sents, language)
-		
-		# average number of clauses per sentence and ratio of simple sentences in text
-		numcls_res, simple_res = sents_complexity(sents)
-		
-		demdets_res = demdeterm(sents, language)
-		nnargs_res = nouns_to_all(sents)
-		
-		## run functions and get absolute freqs for each text
-		for sent in sents:
-			ppron_res += prsp(sent, language)[0]
-			possdet_res += possdet(sent, language)[0]
-			anysome_res += anysome(sent, language)[0]
-			cconj_res += cconj(sent, language)[0]
-			sconj_res += sconj(sent, language)[0]
-			advconj_res += whconj(sent, language)[0]
-			mhd = speakdiff(sent)
-			if mhd:
-				speakdiff_res += speakdiff(sent)
-				readerdiff_res += readerdiff(sent)
-			rel,_,ppiping,correlat = relativ(sent, language)
-			relativ_res += rel
-			pied_res += ppiping
-			correl_res += correlat
-			copula_res += copulas(sent)
-			# wdlength_res += word_length(sent)
-			# interrog_res += interrog(sent, language)[0]
-			# nn_res += nn(sent, language)[0]
-			attrib_res += attrib(sent)[0]
-			pasttense_res += pasttense(sent)
-			ty, to = lex_ty_to(sent, language) # counts of content types and tokens are needed elsewhere
-			lex_ty_res += ty
-			lex_to_res += to
-			mpred_res += modpred(sent, language,mpred_support)[0]
-			mquantif_res += advquantif(sent, language,adv_support)[0]
-			finites_res += finites(sent,language)[0]
-			infs_res += infinitives(sent,language,mpred_support)
-			pverbals_res += participles(sent,language)
-			bys, nobys = passives(sent, language)
-			# passives_res += (bys+nobys)
-			bypassives_res += bys
-			longpassives_res += nobys
-			# add functions here, except for these that operate on the text, rather than sentence level
-		
-		# run functions that are doc(file)-level
-		avsents = av_s_length(sents, language)
-		# and add the values to the dic for this text
-		current['sentlength'] = avsents
-		
-		# normalisation for the absolute sentence-level freqs is done mostly(NB!) in two different ways:
-		## by number of words in the text
-		current['ppron'] = ppron_res/normBy_wc
-		current['possdet'] = possdet_res / normBy_wc
-		current['indef'] = anysome_res / normBy_wc
-		current['cconj'] = cconj_res / normBy_sentnum
-		current['sconj'] = sconj_res / normBy_sentnum
-		current['whconj'] = advconj_res / normBy_sentnum
-		# current['nn'] = nn_res / normBy_wc
-		current['lexdens'] = lex_ty_res / normBy_wc
-		current['mquantif'] = mquantif_res / normBy_wc
-		
-		current['lexTTR'] = lex_ty_res / lex_to_res
-		
-		current['mpred'] = mpred_res / normBy_sentnum # need to normalize to number of finites when I get it :-)
-		
-		## by number of sentences
-		current['mhd'] = speakdiff_res / normBy_sentnum
-		current['mdd'] = readerdiff_res / normBy_sentnum
-		current['relativ'] = relativ_res / normBy_sentnum
-		current['pied'] = pied_res / normBy_sentnum
-		current['correl'] = correl_res / normBy_sentnum
-		current['copula'] = copula_res / normBy_sentnum
-		# current['interrog'] = interrog_res / normBy_sentnum
-		current['attrib'] = attrib_res / normBy_sentnum
-		current['pasttense'] = pasttense_res / normBy_sentnum
-		# current['wdlength'] = wdlength_res / normBy_sentnum
-		current['finites'] = finites_res / normBy_verbnum
-		
-		## alternatively normalize these three features by number of verbs using / normBy_verbnum
-		current['infs'] = infs_res / normBy_verbnum
-		current['pverbals'] = pverbals_res / normBy_verbnum
-		current['deverbals'] = deverbals_res / normBy_verbnum
-		
-		# current['passives'] = passives_res / normBy_sentnum
-		current['bypassives'] = bypassives_res / normBy_sentnum ## maybe these two need to be counted as one feature
-		current['longpassives'] = longpassives_res / normBy_sentnum
-		## here are counts for 5 semantic groups of DMs + conts for and/or and but (maybe merge them!)
-		current['addit'] = addit_res / normBy_sentnum
-		current['advers'] = advers_res / normBy_sentnum
-		current['caus'] = caus_res / normBy_sentnum
-		current['tempseq'] = tempseq_res / normBy_sentnum
-		current['epist'] = epist_res / normBy_sentnum
-		# current['andor'] = andor_res / normBy_sentnum
-		current['but'] = but_res / normBy_sentnum
-		current['comp'] = comp_res
-		current['sup'] = sup_res
-		current['neg'] = neg_res / normBy_sentnum
-		current['numcls'] = numcls_res
-		current['simple'] = simple_res
-		current['demdets'] = demdets_res / normBy_wc
-		current['nnargs'] = nnargs_res
-		
-		## add 7 UD features from a dict
-		dep_prob_dict = ud_probabilities(sents, language)
-		for k, val in dep_prob_dict.items():
-			current[k] = val
-		
-		# get filename, text type (learner, pro, ref) and register to the features
-		current['afile'] = doc
-		current['alang'] = lang
-		current['akorp'] = korp
-		current['astatus'] = status
-		
-		# re-writing the dictionary to get the frequencies from all 10 subcorpora in one database to be written as a tsv spreadsheet
-		for key in master_dict.keys():
-			master_dict[key].append(current[key])
+		# one pass of the DM automaton replaces count_dms(additive, ...), count_dms(adversative, ...), etc.
+		res['dms'] = timed_part(language, 'dms', count_all_dms, dm_automata, sents, language)
+	if 'text' in parts:
+		# run functions that are doc(file)-level; 7 UD features in a dict
+		res['text'] = timed_part(language, 'text', text_part, sents, language)
+	
+	return res
+
+
+# extracts the requested parts of the results for one document; job is (subdir, file, parts)
+def extract_parts(job):
+	subdir, file, parts = job
+	language = doc_language(subdir)
+	sents = read_doc(subdir + os.sep + file, language, parts)
+	return sents_parts(sents, language, parts)
+
 
-	with open(outname, "w") as outfile:
+def text_part(sents, language):
+	return {'sents': len(sents), 'sentlength': av_s_length(sents, language), 'ud': ud_probabilities(sents, language)}
+
+
+# the raw counts of one document from its parts with its metadata, see normalization.spec for the features;
+# returns the row and the number of sentences for basic_stats
+def doc_row(subdir, file, parts):
+	filepath = subdir + os.sep + file
+	last_folder = subdir + os.sep
+	
+	# prepare for writing metadata:
+	lang, korp, status = get_meta(last_folder)
+	
+	# don't forget the filename
+	doc = os.path.splitext(os.path.basename(last_folder + filepath))[0]  # without extention
+	corp_id = lang + '_' + status + '_' + korp
+	
+	# the parts not needed for the selected features are missing
+	raw = dict(parts.get('counts', {}))
+	raw.update(parts.get('dms', {}))
+	raw['sents'] = parts['text']['sents']
+	raw['sentlength'] = parts['text']['sentlength']
+	raw.update(parts['text']['ud'])
+	
+	# get filename, text type (learner, pro, ref) and register to the features
+	raw['afile'] = doc
+	raw['alang'] = lang
+	raw['akorp'] = korp
+	raw['astatus'] = status
 	
-		writer = csv.writer(outfile, delimiter="\t")
-		writer.writerow(keys)
+	return raw, corp_id, parts['text']['sents']
 
-		writer.writerows(zip(*[master_dict[key] for key in keys]))
 
-print('Your data is ready. Lets see whether we can see any patterns in it')
+# the columns of the table of raw counts (--raw); columns is the set of the raw columns to keep (all by default)
+def raw_keys(columns=None):
+	counters = set()
+	for rules in fused_rules.values():
+		counters.update(rules['counters'])
+	keys = ['sents', 'sentlength'] + sorted(counters) + dm_categories + ud_relations
+	return meta + [k for k in keys if columns is None or k in columns]
+
+
+def extract_doc(job):
+	subdir, file = job
+	return doc_row(subdir, file, extract_parts((subdir, file, doc_parts)))
+
+
+## the manifest of a run: relative path of a document -> {'hash': content hash, 'version': extractor version,
+## 'parts': {part: {'lists': hash of the support lists, 'value': the raw results of the part}}}
+# any change to extractors.py or helpfunctions.py is a new version
+def extractor_version():
+	h = hashlib.sha1()
+	for module in ['extractors.py', 'helpfunctions.py']:
+		with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module), 'rb') as f:
+			h.update(f.read())
+	return h.hexdigest()
+
+
+def file_hash(path):
+	with open(path, 'rb') as f:
+		return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_manifest(path):
+	if not os.path.exists(path):
+		return {}
+	with open(path, encoding='utf-8') as f:
+		return json.load(f)
+
+
+def save_manifest(manifest, path):
+	tmp = path + '.tmp'
+	with open(tmp, 'w', encoding='utf-8') as f:
+		json.dump(manifest, f)
+	os.replace(tmp, path)
+
+
+# the parts that are still valid in the manifest entry of a document (none if the document or the extractors changed);
+# counts computed for fewer features than needed now (see needed_columns) are not valid
+def valid_parts(entry, content, version, language, columns):
+	if not entry or entry['hash'] != content or entry['version'] != version:
+		return {}
+	lists = support_hashes[language]
+	return {part: res for part, res in entry['parts'].items()
+	        if res['lists'] == lists.get(part) and (part != 'counts' or columns[part] <= set(res['value']))}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--input', default=data, help="Path to the tree of folders with *.conllu: korp/status/lang/")
+	parser.add_argument('--output', default=outname, help="Path to, and name of, the resulting spreadsheet")
+	parser.add_argument('--jobs', default=1, type=int, help="Number of worker processes to extract features")
+	parser.add_argument('--raw', action='store_true',
+	                    help="Write the raw counts and the denominators instead of the features, see normalize.py")
+	parser.add_argument('--spec', default=default_spec, help="Path to the normalisation spec for the features")
+	parser.add_argument('--features', nargs='+', default=None,
+	                    help="Extract only these features (names from the spec, or the groups dms and ud)")
+	parser.add_argument('--exclude-features', nargs='+', default=None, help="Do not extract these features (or groups)")
+	parser.add_argument('--manifest', default=None,
+	                    help="Path to a JSON manifest of the previous run: only new or changed documents are re-extracted")
+	parser.add_argument('--lists', default=None,
+	                    help="Path to the folder with the searchlists (lists_path in helpfunctions.py by default)")
+	parser.add_argument('--profile-features', action='store_true',
+	                    help="Time each extractor per language; the table is saved as <output>_profile.tsv")
+	args = parser.parse_args()
+	
+	spec = load_spec(args.spec)
+	try:
+		spec = select_features(spec, args.features, args.exclude_features)
+	except ValueError as e:
+		parser.error(str(e))
+	selected = args.features or args.exclude_features
+	columns = needed_columns(spec)
+	columns['text'].add('sents')
+	parts_needed = [part for part in doc_parts if columns[part]]
+	counters = columns['counts'] if selected else None
+	
+	if args.lists:
+		helpfunctions.lists_path = os.path.join(args.lists, '')
+	load_supports(verbose=True, counters=counters)
+	if args.profile_features:
+		start_profile()
+	keys = raw_keys(set.union(*columns.values()) if selected else None) if args.raw \
+		else meta + [feature for feature, _, _ in spec]
+	
+	# the order of documents is fixed before extraction to get the same table with any number of jobs
+	jobs = []
+	for subdir, dirs, files in os.walk(args.input):
+		for file in files:
+			jobs.append((subdir, file))
+	
+	# with --manifest, the parts of the results that are still valid are taken from the previous run
+	manifest = load_manifest(args.manifest) if args.manifest else {}
+	version = extractor_version()
+	entries = {}
+	todo = []
+	for subdir, file in jobs:
+		path = subdir + os.sep + file
+		key = os.path.relpath(path, args.input)
+		content = file_hash(path) if args.manifest else None
+		valid = valid_parts(manifest.get(key), content, version, doc_language(subdir), columns)
+		entries[key] = {'hash': content, 'version': version, 'parts': valid}
+		parts = [part for part in parts_needed if part not in valid]
+		if parts:
+			todo.append((subdir, file, parts))
+	if args.manifest:
+		print('%s of %s documents are new or changed' % (len(todo), len(jobs)), file=sys.stderr)
+	
+	if args.jobs > 1:
+		pool = Pool(args.jobs, initializer=init_worker, initargs=(counters, args.profile_features, args.lists))
+		results = pool.imap(profiled_parts if args.profile_features else extract_parts, todo)
+	else:
+		pool = None
+		results = map(extract_parts, todo)
+	
+	basic_stats = {}
+	profiled_sents = {}
+	
+	# each row is written as soon as it is computed; the table replaces the old one when all the documents are done
+	with RowWriter(args.output, keys) as table:
+		seen = {}
+		for subdir, file in jobs:
+			i = seen.get(subdir, 0)
+			seen[subdir] = i + 1
+			if i % 20 == 0:
+				meta_str = '_'.join(get_meta(subdir + os.sep))  # lang, korp, status
+				print('I have processed %s files from %s' % (i, meta_str.upper()), file=sys.stderr)
+			
+			# todo is in the order of jobs, so the next result belongs to this document
+			key = os.path.relpath(subdir + os.sep + file, args.input)
+			entry = entries[key] if args.manifest else entries.pop(key)
+			extracted = any(part not in entry['parts'] for part in parts_needed)
+			if extracted:
+				lists = support_hashes[doc_language(subdir)]
+				values = next(results)
+				if args.profile_features and pool:
+					values, snapshot = values
+					merge_times(snapshot)
+				for part, value in values.items():
+					entry['parts'][part] = {'lists': lists[part], 'value': value}
+			raw, corp_id, sents_count = doc_row(subdir, file, {part: res['value'] for part, res in entry['parts'].items()})
+			if extracted and args.profile_features:
+				language = doc_language(subdir)
+				profiled_sents[language] = profiled_sents.get(language, 0) + sents_count
+			
+			if corp_id in basic_stats.keys():
+				basic_stats[corp_id] += sents_count
+			else:
+				basic_stats[corp_id] = sents_count
+			
+			if args.raw:
+				table.writerow(raw)
+			else:
+				current = dict(raw)
+				current.update(normalize(raw, spec))
+				table.writerow(current)
+	
+	if pool:
+		pool.close()
+		pool.join()
+	
+	if args.manifest:
+		save_manifest(entries, args.manifest)
+	
+	if args.profile_features:
+		profile_keys = ['language', 'feature', 'seconds', 'calls', 'us_per_sentence', 'share']
+		rows = profile_rows(profiled_sents)
+		widths = {k: max([len(k)] + [len(str(row[k])) for row in rows]) for k in profile_keys}
+		for row in [dict(zip(profile_keys, profile_keys))] + rows:
+			print('  '.join(str(row[k]).ljust(widths[k]) for k in profile_keys), file=sys.stderr)
+		with RowWriter(os.path.splitext(args.output)[0] + '_profile.tsv', profile_keys) as table:
+			for row in rows:
+				table.writerow(row)
+	
+	print('Your data is ready. Lets see whether we can see any patterns in it')
@@ -4,7 +4,7 @@ this script prints examples (sentences) that are matched by the functions provid
 
 import os
 import csv
-from helpfunctions import dms_support_all_langs, get_trees, wordcount, sents_num, verbs_num
+from helpfunctions import dms_support_all_langs, read_trees, wordcount, sents_num, verbs_num
 from collections import defaultdict
 import argparse
 from collections import Counter
@@ -114,11 +114,9 @@ if __name__ == "__main__":
     for subdir, dirs, files in os.walk(input_dir):
         for i, file in enumerate(files):
             filepath = subdir + os.sep + file
-            data = open(filepath).readlines()
-
-            sents, bads, shorts = get_trees(data, minlen=args.minlen)
-            tot_bads += bads
-            tot_shorts += shorts
+            stats = {}
+            with open(filepath, encoding="utf-8") as f:
+                sents = list(read_trees(f, minlen=args.minlen, stats=stats))
 
             for sent in sents:
                 res, ex1 = preps(sent, language)
@@ -130,6 +128,8 @@ if __name__ == "__main__":
                     allofthem1.extend(ex1)
                 # if ex2:
                 #     allofthem2.extend(ex2)
+            tot_bads += stats['bad']
+            tot_shorts += stats['short']
 
     print(f'Which items in this set were not asked for? \n {set(allofthem1)}')
     freq_dict = Counter(allofthem1)
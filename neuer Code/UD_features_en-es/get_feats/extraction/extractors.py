@@ -3,12 +3,11 @@ Updated 6 December 2021 from Feb 5-10,2019 version
 - contains functions that are called from mega_collector.py to extract lang-independent features from conllu format;
 - calls functions from helpfunctions.py to traverse conllu sentence trees
 - each word is represented as: int(identifier), token, lemma, upos, xpos, feats, int(head), rel
-- pip install igraph  (library by Tamas Nepusz)
+- pip install igraph  (library by Tamas Nepusz), needed only for speakdiff_visuals
 """
 
+import sys
 import numpy as np
-from igraph import *
-from igraph._igraph import arpack_options
 from helpfunctions import has_kid_by_lemlist, has_auxkid_by_tok
 
 
@@ -96,10 +95,11 @@ def nn(tree):
 
 # graph-based feature
 
-# this function tests connectedness of the graph; it helps to skip malformed sentences
-# additionally it produces the sentence graph
-# (NB!! it slows down the process, hence if graphs are needed call a separate function)
+# this function produces the sentence graph for speakdiff_visuals below; it also shows disconnected trees
+# (NB!! it slows down the process; igraph is imported here, because only the visuals need it)
 def test_sanity(tree):
+    from igraph import Graph
+    from igraph._igraph import arpack_options
     arpack_options.maxiter = 3000
     bad_trees = 0
     sentence_graph = Graph(len(tree) + 1)
@@ -122,34 +122,52 @@ def test_sanity(tree):
     return sentence_graph
 
 
-def speakdiff(tree):
-    # call the above function to get the graph and counts for disintegrated trees
-    # (syntactic analysis errors of assigning dependents to punctuation)
-    graph = test_sanity(tree)
+# mean hierarchical distance (MHD, distance from ROOT) and mean dependency distance (MDD, see readerdiff below)
+# in one pass over the head ids of the sentence, without building a graph;
+# a tree is connected if every non-punct word reaches ROOT through non-punct heads,
+# malformed trees (syntactic analysis errors of assigning dependents to punctuation) get 0
+def tree_depths(tree):
+    s = [w for w in tree if w[7] != 'punct']
+    positions = {w[0]: i for i, w in enumerate(s)}  # id -> index among non-punct words
+    # -1 stands for ROOT, None for a head that is punctuation or is not in the sentence
+    heads = [-1 if w[6] == 0 else positions.get(w[6]) for w in s]
+    depths = [0] * len(s)
+    for i in range(len(s)):
+        # climb to ROOT or to a word with a known depth, then set the depths on the way back
+        path = []
+        j = i
+        while True:
+            if j is None or len(path) > len(s):
+                return 0, 0  # disconnected or cyclic tree
+            if j == -1 or depths[j]:
+                break
+            path.append(j)
+            j = heads[j]
+        d = depths[j] if j != -1 else 0
+        for k in reversed(path):
+            d += 1
+            depths[k] = d
+
+    hds = [depths[i] for i, w in enumerate(s) if w[7] != 'root']
+    if not hds:
+        return 0, 0
+    dds = [abs(i - heads[i]) - 1 for i in range(len(s)) if heads[i] != -1]
+    mhd = sum(hds) / len(hds)
+    mdd = sum(dds) / len(dds) if dds else np.nan  # as np.average([]) in readerdiff
+
+    return mhd, mdd
 
-    parts = graph.components(mode=WEAK)
-    mhd = 0
-    errors = 0
-    if len(parts) == 1:
-        nodes = [word[1] for word in tree if word[7] != 'punct' and word[7] != 'root']
-        all_hds = []  # or a counter = 0?
-        for node in nodes:
-            try:
-                hd = graph.shortest_paths_dijkstra('ROOT', node, mode=ALL)
-                all_hds.append(hd[0][0])
-            except ValueError:
-                errors += 1
-        # print(tree)
-        if all_hds:
-            mhd = np.average(all_hds)
-    # print(errors)
-    return mhd
+
+def speakdiff(tree):
+    # MHD only; call tree_depths to get MDD from the same pass
+    return tree_depths(tree)[0]
 
 
 # this is a slower function which allows to print graphs for sentences (to be used in overall_freqs)
 def speakdiff_visuals(tree):
     # call the above function to get the graph and counts for disintegrated trees
     # (syntactic analysis errors of assigning dependents to punctuation)
+    from igraph import InternalError, WEAK, ALL
     graph = test_sanity(tree)
     # this is needed to see disconnected graphs from overall_freqs file
     try:
@@ -179,19 +197,11 @@ def readerdiff(tree):
 
     inbtw = []
     if len(s) > 1:
-        for s_word_id in range(len(s)):  # use s-index to refer to words
-            w = s[s_word_id]
-            head_id = w[6]
-            if head_id == 0:
+        positions = {w[0]: i for i, w in enumerate(s)}  # use s-index to refer to words
+        for s_word_id, w in enumerate(s):
+            if w[6] == 0:
                 continue
-            s_head_id = None
-            for s_word_id_2 in range(len(s)):
-                w1 = s[s_word_id_2]
-                if head_id == w1[0]:
-                    s_head_id = s_word_id_2
-                    break
-            # print(file, type(s_head_id), type(s_word_id), no)
-            dd = abs(s_word_id - s_head_id) - 1
+            dd = abs(s_word_id - positions[w[6]]) - 1
             inbtw.append(dd)
     # use this function instead of overt division of list sum by list length: if smth is wrong you'll get a warning!
     mdd = np.average(inbtw)
@@ -272,6 +282,27 @@ def count_dms(searchlists, trees, lang):
     return res
 
 
+# the same counts as count_dms for all DM categories at once: each sentence is joined once and scanned once
+# by the automaton compiled from the searchlists (automata is a lang-dictionary of dms_automaton results)
+def count_all_dms(automata, trees, lang):
+    cats, goto, fail, out = automata[lang]
+    res = {cat: 0 for cat in cats}
+    for tree in trees:
+        sent = ' '.join(w[1] for w in tree)
+        found = set()
+        state = 0
+        for char in sent:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        # every list item is counted once per sentence, as in count_dms
+        for cat, item_id in found:
+            res[cat] += 1
+    return res
+
+
 def get_epistemic_stance(trees, lang):
     verbs = 0
 
@@ -300,18 +331,53 @@ def get_epistemic_stance(trees, lang):
     return verbs
 
 
-def sents_complexity(trees):
-    types = ['csubj', 'acl:relcl', 'advcl', 'acl', 'xcomp', 'parataxis']
-    simples = 0
-    clauses_counts = []
-    for tree in trees:
-        this_sent_cls = 0
+# relations that introduce clauses (sents_complexity) and the arguments of nouns_to_all
+clause_rels = ['csubj', 'acl:relcl', 'advcl', 'acl', 'xcomp', 'parataxis']
+nnargs_rels = ['nsubj', 'obj', 'iobj']
+
+
+# integer ids of the histogram columns: relations and relation/UPOS pairs (ex. 'nsubj/NOUN') for counts restricted by POS;
+# build the ids once for all documents, ex. histogram_columns(all_udrels, clause_rels)
+def histogram_columns(*relation_lists):
+    columns = {}
+    for relations in relation_lists:
+        for rel in relations:
+            columns.setdefault(rel, len(columns))
+
+    return columns
+
+
+# the columns that sents_complexity, nouns_to_all, ud_freqs and ud_probabilities read from a histogram
+def complexity_columns():
+    return clause_rels + nnargs_rels + [rel + '/' + pos for rel in nnargs_rels for pos in ['NOUN', 'PROPN']]
+
+
+# sentences x columns matrix of counts of the relations in the document, built with one np.bincount;
+# returns the matrix and the columns, which are passed as hist to the functions below
+def relation_histogram(trees, columns):
+    pairs = {tuple(col.split('/')): k for col, k in columns.items() if '/' in col}
+    pair_rels = {rel for rel, pos in pairs}
+    ncols = len(columns)
+    cells = []
+    for s, tree in enumerate(trees):
+        row = s * ncols
         for w in tree:
-            if w[7] in types:
-                this_sent_cls += 1
-        if this_sent_cls == 0:
-            simples += 1
-        clauses_counts.append(this_sent_cls)
+            k = columns.get(w[7])
+            if k is not None:
+                cells.append(row + k)
+            if w[7] in pair_rels:
+                k = pairs.get((w[7], w[3]))
+                if k is not None:
+                    cells.append(row + k)
+    counts = np.bincount(np.array(cells, dtype=np.int64), minlength=len(trees) * ncols)
+
+    return counts.reshape(len(trees), ncols), columns
+
+
+def sents_complexity(trees, hist=None):
+    counts, columns = hist if hist else relation_histogram(trees, histogram_columns(clause_rels))
+    clauses_counts = counts[:, [columns[rel] for rel in clause_rels]].sum(axis=1)
+    simples = int((clauses_counts == 0).sum())
     return np.average(clauses_counts), simples / len(trees)
 
 
@@ -323,21 +389,14 @@ def relation_counts(tree, i_relations):
     return counts
 
 
-def ud_freqs(trees, udfeats_=None):
+# average frequency of each relation per sentence; one column of the histogram per relation
+def ud_freqs(trees, udfeats_=None, hist=None):
     relations = udfeats_
-
-    relations_d = {rel: [] for rel in relations}
-    for tree in trees:
-        rel_distribution = relation_counts(tree, relations_d)
-        # this returns frequencies for the picked dependencies in this sent
-        for rel in relations_d.keys():  # reusing the empty dict
-            # this collects and average the probability stats over sents of the text to the global empty dict
-            relations_d[rel].append(rel_distribution[rel])
-            # values in this dict are lists of probabilities in each sentence; need to average them
+    counts, columns = hist if hist else relation_histogram(trees, histogram_columns(relations))
 
     dict_out = {}
-    for rel in relations_d.keys():
-        dict_out[rel] = np.average(relations_d[rel])
+    for rel in relations:
+        dict_out[rel] = np.average(counts[:, columns[rel]])
 
     return dict_out
 
@@ -361,35 +420,27 @@ def relation_distribution(tree, i_relations):
 
 # OLDER approach: previous research has shown that aux, ccomp, acl:relcl, mark, xcomp, parataxis and nsubj:pass; aux:pass
 # are good indicators of translationese for EN > RU
-def ud_probabilities(trees, udfeats_=None):
+def ud_probabilities(trees, udfeats_=None, hist=None):
     relations = udfeats_
-
-    relations_d = {rel: [] for rel in relations}
-    for tree in trees:
-        rel_distribution = relation_distribution(tree, relations_d)
-        # this returns probabilities for the picked dependencies in this sent
-        for rel in relations_d.keys():  # reusing the empty dict
-            # this collects and average the probability stats over sents of the text to the global empty dict
-            relations_d[rel].append(rel_distribution[rel])
-            # values in this dict are lists of probabilities in each sentence; need to average them
+    counts, columns = hist if hist else relation_histogram(trees, histogram_columns(relations))
+    counts = counts[:, [columns[rel] for rel in relations]]
+    # the same as relation_distribution for each sentence: sentences without any of the relations keep their zeros
+    totals = counts.sum(axis=1, keepdims=True)
+    probabilities = np.divide(counts, totals, out=counts.astype(float), where=totals > 0)
 
     dict_out = {}
-    for rel in relations_d.keys():
-        dict_out[rel] = np.average(relations_d[rel])
+    for i, rel in enumerate(relations):
+        dict_out[rel] = np.average(probabilities[:, i])
 
     return dict_out
 
 
 # ratio of NOUNS+proper names in these functions to the count of these functions
-def nouns_to_all(trees):
-    count = 0
-    nouns = 0
-    for tree in trees:
-        for w in tree:
-            if w[7] in ['nsubj', 'obj', 'iobj']:
-                count += 1
-                if w[3] == 'NOUN' or w[3] == 'PROPN':
-                    nouns += 1
+def nouns_to_all(trees, hist=None):
+    counts, columns = hist if hist else relation_histogram(trees, histogram_columns(complexity_columns()))
+    totals = counts.sum(axis=0)
+    count = int(sum(totals[columns[rel]] for rel in nnargs_rels))
+    nouns = int(sum(totals[columns[rel + '/' + pos]] for rel in nnargs_rels for pos in ['NOUN', 'PROPN']))
     res = nouns / count
     return res
 
@@ -5,7 +5,9 @@
 this sctipt contains only the lang-independent functions for translationese feature extraction with mega_collector.py
 """
 import os
-from collections import OrderedDict
+import sys
+import csv
+from collections import OrderedDict, deque
 from operator import itemgetter
 import warnings
 
@@ -28,49 +30,93 @@ def get_meta(input):
     return lang0, register0, status0
 
 
-def get_trees(data, minlen=None):  # data is one object: a text or all of corpus as one file
-    sentences0 = []
-    badsents = 0
-    only_punct = []
+# streaming reader: yields the sentences of a conllu file (or of any iterable of lines) one by one in a single pass;
+# words at the beginning of a sentence are thrown away as long as the sentence consists of punctuation marks only
+# (ex. '.)') or of numerals and punctuation (ex. '3.', 'II.'); each of them is counted in stats['bad'],
+# sentences shorter than minlen are skipped and counted in stats['short']
+def read_trees(lines, minlen=None, stats=None):
+    if stats is None:
+        stats = {}
+    stats.setdefault('bad', 0)
+    stats.setdefault('short', 0)
+    punct_num = {'PUNCT', 'NUM'}
     current_sentence = []
-    for line in data:
-        if line.strip() == '':
+    seen_pos = set()
+    for line in lines:
+        line = line.strip()
+        if not line:
             if current_sentence:
-                sentences0.append(current_sentence)
-            
+                if minlen is None or len(current_sentence) >= minlen:
+                    yield current_sentence
+                else:
+                    stats['short'] += 1
             current_sentence = []
-            only_punct = []
+            seen_pos = set()
             continue
 
-        if line.strip().startswith('#'):
+        if line[0] == '#':
             continue
 
-        res = line.strip().split('\t')
-        (identifier, token, lemma, upos, xpos, feats, head, rel, misc1, misc2) = res
+        (identifier, token, lemma, upos, xpos, feats, head, rel, misc1, misc2) = line.split('\t')
         if '.' in identifier or '-' in identifier:  # ignore empty nodes possible in the enhanced representations
             continue
 
-        only_punct.append(res[3])
-        var = list(set(only_punct))
-
-        # throw away sentences consisting of punctuation marks only (ex. '.)')
-        # and of numeral and a punctuation (ex. '3.', 'II.')
-        if len(var) == 1 and var[0] == 'PUNCT':
-            badsents += 1
-            continue
-
-        if len(var) == 2 and 'PUNCT' in var and 'NUM' in var:
-            badsents += 1
+        seen_pos.add(upos)
+        if len(seen_pos) < 3 and 'PUNCT' in seen_pos and seen_pos <= punct_num:
+            stats['bad'] += 1
         else:
             current_sentence.append((int(identifier), token, lemma, upos, xpos, feats, int(head), rel))
-    
+
     if current_sentence:
-        sentences0.append(current_sentence)
-    
-    sentences = [s for s in sentences0 if len(s) >= minlen]
-    shorts = len(sentences0) - len(sentences)
-    
-    return sentences, badsents, shorts
+        if minlen is None or len(current_sentence) >= minlen:
+            yield current_sentence
+        else:
+            stats['short'] += 1
+
+
+def get_trees(data, minlen=None):  # data is one object: a text or all of corpus as one file
+    stats = {}
+    sentences = list(read_trees(data, minlen=minlen, stats=stats))
+
+    return sentences, stats['bad'], stats['short']
+
+
+# the table is written row by row as the documents are processed: the rows go to path + '.tmp',
+# which is flushed every flush_every rows and renamed to path by close(), so that an interrupted run
+# never leaves a half-written table in place of the previous one; rows are dicts written in the order of the header
+class RowWriter(object):
+    def __init__(self, path, header, flush_every=100, delimiter='\t'):
+        self.path = path
+        self.tmp = path + '.tmp'
+        self.header = header
+        self.flush_every = flush_every
+        self.rows = 0
+        self.file = open(self.tmp, 'w')
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self.writer.writerow(header)
+
+    def writerow(self, row):
+        self.writer.writerow([row[k] for k in self.header])
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp, self.path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
 
 
 # functions to traverse the trees
@@ -428,4 +474,48 @@ def dms_support_all_langs(lang, lists_path=None):
     epistem = lists_path + lang + "_epistemic.lst"
     epist_list = [i.strip() for i in open(epistem, 'r').readlines()]
     
-    return add_list, adv_list, caus_list, temp_sequen_list, epist_list
\ No newline at end of file
+    return add_list, adv_list, caus_list, temp_sequen_list, epist_list
+
+
+# a multi-pattern (Aho-Corasick) automaton for the five DM searchlists of one language
+# lists is a dict of category -> searchlist, ex. {'addit': [...], 'advers': [...]}, see count_all_dms in extractors.py;
+# the patterns keep the padding of count_dms: 'Upper ' for capitalised items, ' lower ' and 'Lower ' for the rest
+def dms_automaton(lists):
+    goto = [{}]
+    out = [()]
+    for cat, lst in lists.items():
+        for item_id, i in enumerate(lst):
+            i = i.strip()
+            if not i:
+                print('blank line in the %s list is ignored' % cat, file=sys.stderr)
+                continue
+            if i[0].isupper():
+                patterns = [i + ' ']
+            else:
+                patterns = [' ' + i + ' ', i.capitalize() + ' ']
+            for pattern in patterns:
+                state = 0
+                for char in pattern:
+                    if char not in goto[state]:
+                        goto[state][char] = len(goto)
+                        goto.append({})
+                        out.append(())
+                    state = goto[state][char]
+                # an item is identified by its list position, so that duplicates in a list are counted twice as before
+                if (cat, item_id) not in out[state]:
+                    out[state] += ((cat, item_id),)
+
+    # failure links are set breadth-first; each state inherits the matches of its failure state
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and char not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(char, 0)
+            out[nxt] += tuple(m for m in out[fail[nxt]] if m not in out[nxt])
+
+    return list(lists), goto, fail, out
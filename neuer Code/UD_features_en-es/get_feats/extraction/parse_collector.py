@@ -0,0 +1,164 @@
+"""
+from clean text data, this script produces the same table as parser.py followed by new_mega_collector.py, without
+the *.conllu files in between: each worker parses a text with UDPipe and passes the sentences to the extractors
+in memory, and one row per document is written to the table
+- the folders are the same as for new_mega_collector.py, with *.txt instead of *.conllu:
+/your/path/anylength/txt/register/status/lang/*.txt, where txt is the name of the input folder
+- each language needs a model: --models en=get_feats/parsing/english-ewt-ud-2.5-191206.udpipe es=...;
+a worker loads the model of a language once, when it gets the first text in this language
+- the parses can still be kept with --conllu: they are written to the same tree of folders under that folder,
+named as parser.py names them
+
+USAGE (from kateryna/get_feats/extraction/ folder!):
+python3 get_feats/extraction/parse_collector.py --input corpus/txt/ --output data/debates_fiction.tsv
+--models en=get_feats/parsing/english-ewt-ud-2.5-191206.udpipe es=get_feats/parsing/spanish-gsd-ud-2.5-191206.udpipe
+--levels doc register type lang --jobs 8
+-- add --presegmented for texts with one sentence per line (see parser.py)
+-- add --conllu corpus/parsed/ to keep the parses
+"""
+
+import os
+import sys
+from ufal.udpipe import Pipeline
+from helpfunctions import read_trees, RowWriter
+import new_mega_collector
+from new_mega_collector import ud_features, all_udrels, extract_sents, doc_name, settings
+from collections import defaultdict
+from multiprocessing import Pool
+import time
+
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'parsing'))
+from parser import pipeline_options, load_model
+
+# the models and the pipelines of this process by language, loaded when they are first needed
+pipelines = {}
+
+
+# pool initializer: each worker reads the searchlists once; models are {lang: path to the .udpipe}
+def init_worker(languages, lists_path, minlen, levels, models, options, input_dir, conllu):
+    new_mega_collector.init_worker(languages, lists_path, minlen, levels)
+    settings['models'] = models
+    settings['options'] = options
+    settings['input'] = input_dir
+    settings['conllu'] = conllu
+
+
+def pipeline(lang):
+    if lang not in pipelines:
+        options = settings['options']
+        # the model is kept with the pipeline: the pipeline does not keep it alive
+        model = load_model(settings['models'][lang])
+        pipelines[lang] = model, Pipeline(model, options[0], options[1], options[2], 'conllu')
+    return pipelines[lang][1]
+
+
+def parse_doc(job):
+    subdir, file = job
+    language = os.path.basename(subdir)
+    with open(subdir + os.sep + file, 'r', errors='ignore', encoding="utf-8") as input_text:
+        text = input_text.read().strip()
+    ud_tagged = pipeline(language).process(text)
+
+    # the *.conllu named as parser.py names it
+    conllu_name = file.replace('.txt', '.conllu')
+    if settings['conllu']:
+        outdir = os.path.join(settings['conllu'], os.path.relpath(subdir, settings['input']))
+        os.makedirs(outdir, exist_ok=True)
+        with open(os.path.join(outdir, conllu_name), 'w', encoding="utf-8") as udout:
+            udout.write(ud_tagged,)
+
+    stats = {}
+    sents = list(read_trees(ud_tagged.split('\n'), minlen=settings['minlen'], stats=stats))
+    return extract_sents(sents, subdir, doc_name(conllu_name), stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default='corpus/txt/',
+                        help="Path to the tree of folders with *.txt named after your text categories",
+                        required=True)
+    parser.add_argument('--output', default='data/debates_fiction.tsv', help="Path to, and name of, the resulting spreadsheet",
+                        required=True)
+    parser.add_argument('--models', nargs='+', required=True,
+                        help='UDPipe model of each language like so: --models en=english.udpipe es=spanish.udpipe')
+    parser.add_argument('--conllu', default=None, help="Folder to keep the parses in (they are not written by default)")
+    parser.add_argument('--presegmented', action='store_true', help='The input has one sentence per line')
+    parser.add_argument('--supports', default='get_feats/extraction/searchlists/', help="Path to the folder with lists")
+    parser.add_argument('--minlen', default=2, type=int, help="Minimum allowed sent length")
+    parser.add_argument('--langs', nargs='+', default=['en', 'es'], help='Pass language indices like so: --langs en es')
+    parser.add_argument('--levels', nargs='+', default=['doc', 'register', 'type', 'lang'],
+                        help='Levels under rootdir. Example: for clean/ted/ref/ru/ --levels doc register type lang')
+    parser.add_argument('--jobs', default=1, type=int, help='Number of worker processes, each parsing and extracting')
+    start = time.time()
+    args = parser.parse_args()
+
+    models = dict(model.split('=', 1) for model in args.models)
+    missing = [lang for lang in args.langs if lang not in models]
+    if missing:
+        parser.error('no model for %s' % ' '.join(missing))
+
+    os.makedirs('data/', exist_ok=True)
+    outname = args.output
+
+    meta = args.levels
+    keys = meta + ['wc', 'sents'] + ud_features + all_udrels
+
+    languages = args.langs
+
+    initargs = (languages, args.supports, args.minlen, args.levels, models,
+                pipeline_options(args.presegmented), args.input, args.conllu)
+
+    # the list of documents is fixed before extraction, and Pool.imap returns rows in this order
+    jobs = []
+    for subdir, dirs, files in os.walk(args.input):
+        for file in files:
+            jobs.append((subdir, file))
+
+    # the models are checked before the first text, so that a bad one is a usage error and not a traceback
+    # (and the pool would replace the workers that fail to load it forever); a serial run keeps them
+    try:
+        if args.jobs > 1:
+            for lang in languages:
+                load_model(models[lang])
+        else:
+            init_worker(*initargs)
+            for lang in languages:
+                pipeline(lang)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    if args.jobs > 1:
+        pool = Pool(args.jobs, initializer=init_worker, initargs=initargs)
+        results = pool.imap(parse_doc, jobs)
+    else:
+        pool = None
+        results = map(parse_doc, jobs)
+
+    tot_bads = 0
+    tot_shorts = 0
+    counter = 0
+    seen = defaultdict(int)
+    with RowWriter(outname, keys) as table:
+        for (subdir, file), (current, corp_id, _, bads, shorts) in zip(jobs, results):
+            tot_bads += bads
+            tot_shorts += shorts
+
+            i = seen[subdir]
+            seen[subdir] += 1
+            if i % 50 == 0:
+                print(f'I have parsed and processed {i} files from {corp_id.upper()}')
+                print(f'{tot_bads} all-punct-num sents and additionally {tot_shorts} less-than-{args.minlen}-meaningful-words sents skipped')
+                print()
+
+            table.writerow(current)
+            counter += 1
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    end = time.time()
+    processing_time = int(end - start)
+    print(f'Parsing and feature extraction from {counter} files took {(processing_time / 60):.2f} minutes')
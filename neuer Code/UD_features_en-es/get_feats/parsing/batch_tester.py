@@ -0,0 +1,58 @@
+"""
+this script checks that parsing in batches (parser.py --batch) gives the same *.conllu as parsing each file at once:
+every file of the input folder is parsed both ways and the outputs are compared line by line, with the comments
+(newdoc, newpar, sent_id, text); the exit status is 1 if any file differs
+
+USAGE (from parsing folder):
+python3 batch_tester.py --input en_media --model english-ewt-ud-2.5-191206.udpipe --batch 500 5000
+-- add --presegmented to check the mode for one sentence per line
+"""
+
+import os
+import sys
+import difflib
+import tempfile
+import argparse
+from parser import init_worker, parse_batches, pipeline_options, udpipe
+
+
+def count_comments(lines, comment):
+    return sum(1 for line in lines if line.startswith(comment))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', help="Path to prepared input files", required=True)
+    parser.add_argument('--model', default='spanish-gsd-ud-2.5-191206.udpipe', help='Path to the lang model you want to use')
+    parser.add_argument('--batch', nargs='+', default=[500, 5000], type=int, help='Batch sizes to check')
+    parser.add_argument('--presegmented', action='store_true', help='The input has one sentence per line')
+    args = parser.parse_args()
+
+    init_worker(args.model, options=pipeline_options(args.presegmented))
+    tmp = tempfile.mkdtemp(prefix='batch_tester_')
+    differ = 0
+    checked = 0
+    for f in sorted(os.listdir(args.input)):
+        path = os.path.join(args.input, f)
+        with open(path, 'r', errors='ignore', encoding="utf-8") as input_text:
+            whole = udpipe['pipeline'].process(input_text.read().strip()).splitlines()
+        for size in args.batch:
+            udpipe['batch'] = size
+            out = os.path.join(tmp, f)
+            parse_batches(path, out)
+            with open(out, encoding="utf-8") as batched_text:
+                batched = batched_text.read().splitlines()
+            os.remove(out)
+            checked += 1
+            if batched == whole:
+                continue
+            differ += 1
+            print(f'{f} with --batch {size}: the output differs from the parse of the whole file')
+            for comment in ('# newdoc', '# newpar', '# sent_id'):
+                print(f'    {comment}: {count_comments(whole, comment)} in the whole, {count_comments(batched, comment)} in batches')
+            for line in list(difflib.unified_diff(whole, batched, 'whole', 'batches', n=0, lineterm=''))[:12]:
+                print('    ' + line)
+    os.rmdir(tmp)
+
+    print(f'{checked - differ} of {checked} batched parses are the same as the parses of the whole files')
+    sys.exit(1 if differ else 0)
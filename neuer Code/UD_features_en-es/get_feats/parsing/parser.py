@@ -1,60 +1,258 @@
-"""
-April
-26, 2020
-Given a folder of clean text data, get a folder with parsed texts in *.conllu format
-
-USAGE:
--- install
-pip install ufal.udpipe
--- choose and download a model for your language(description,
-inc.performance: http: // ufal.mff.cuni.cz / udpipe / models  # universal_dependencies_25_models)
--- go to parsing folder
-- - run: python3 parser.py --input en_media --output en_media_conllu
-"""
-
-
-import os
-from ufal.udpipe import Model, Pipeline
-import time
-import argparse
-
-parser = argparse.ArgumentParser()
-parser.add_argument('--input', help="Path to prepared input files", required=True)
-parser.add_argument('--output', help="Where you want the parsed texts", required=True)
-# parser.add_argument('--model', default='get_feats/parsing/english-ewt-ud-2.5-191206.udpipe', help='Path to the lang model you want to use')
-parser.add_argument('--model', default='get_feats/parsing/spanish-gsd-ud-2.5-191206.udpipe', help='Path to the lang model you want to use')
-args = parser.parse_args()
-
-start = time.time()
-
-parse_out = args.output
-os.makedirs(parse_out, exist_ok=True)
-
-model = Model.load(args.model)
-pipeline = Pipeline(model, 'tokenize', Pipeline.DEFAULT, Pipeline.DEFAULT, 'conllu')
-print('UD model is loaded')
-
-counter = 0
-files = [f for f in os.listdir(args.input)]
-for f in files:
-    with open(args.input + f, 'r', errors='ignore', encoding="utf-8") as input_text, \
-            open(args.output + f.replace('.txt', '.conllu'), 'w', encoding="utf-8") as udout:
-        try:
-            text = input_text.read().strip()
-            # print(f'got text from {f}')
-        except UnicodeDecodeError:
-            print('Unicode error in input file: %s; skipping it' % f)
-            continue
-
-        ud_tagged = pipeline.process(text)
-        udout.write(ud_tagged,)
-        # !!! change the counter value!
-        counter += 1
-
-        # Monitor progress:
-        if counter % 10 == 0:
-            print(f'{counter} files processed')
-
-end = time.time()
-processing_time = int(end - start)
-print(f'Processing {args.input} ({counter} files) took {(processing_time / 60):.2f} minites with {args.model} model')
+"""
+April
+26, 2020
+Given a folder of clean text data, get a folder with parsed texts in *.conllu format
+
+USAGE:
+-- install
+pip install ufal.udpipe
+-- choose and download a model for your language(description,
+inc.performance: http: // ufal.mff.cuni.cz / udpipe / models  # universal_dependencies_25_models)
+-- go to parsing folder
+- - run: python3 parser.py --input en_media --output en_media_conllu
+-- add --jobs 4 to parse in 4 worker processes; each of them loads the model once and takes the next file when it is done
+-- add --cache parse_cache to keep the parses by a hash of the text and of the model: a text that is already in the cache
+is copied from it (or left as it is, if the output file is the same), so after editing one file only that one is parsed
+-- add --presegmented for texts with one sentence per line (as all our txt subcorpora): UDPipe tokenizes each line
+as a sentence instead of segmenting the text again
+-- add --stages tag to tag without parsing: HEAD and DEPREL are left as _, so the output is for tools that need
+only the lemmas, tags and morphological features; the collectors in extraction/ cannot read it, they need the trees
+-- add --batch 100000 for very long texts (books, full sessions of debates): the file is read and parsed in batches of
+about 100000 characters that end at the end of a line, and the parse is written batch by batch with the sent_ids
+numbered through the whole text, so the memory does not grow with the size of the file (the tokenizer does not join
+a sentence over the end of a batch, which does not matter for one sentence per line)
+-- batch_tester.py checks that the batches give the same *.conllu as the whole files
+"""
+
+
+import os
+import shutil
+import filecmp
+import hashlib
+from ufal.udpipe import Model, Pipeline
+from multiprocessing import Pool
+import time
+import argparse
+
+# the model and the pipeline of this process, set by init_worker
+udpipe = {}
+
+
+# sha1 of the model file, read in blocks (the models are 50-100 MB)
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# the input format, tagger and parser of the UDPipe pipeline for the options of the command line
+def pipeline_options(presegmented=False, stages=('tag', 'parse')):
+    return ('tokenizer=presegmented' if presegmented else 'tokenize',
+            Pipeline.DEFAULT if 'tag' in stages else Pipeline.NONE,
+            Pipeline.DEFAULT if 'parse' in stages else Pipeline.NONE)
+
+
+# Model.load returns None (and Pipeline crashes on it) for a missing, empty or broken model file
+def load_model(model_path):
+    model = Model.load(model_path)
+    if model is None:
+        raise RuntimeError('cannot load the UDPipe model %s' % model_path)
+    return model
+
+
+# pool initializer: each worker process loads the model once and keeps it for all the files it gets;
+# with a cache folder, the parses are stored there by the hash of the model, of the options and of the text
+def init_worker(model_path, cache=None, model_digest=None, options=None, batch=0):
+    options = options or pipeline_options()
+    udpipe['cache'] = cache
+    udpipe['model_digest'] = model_digest
+    udpipe['options'] = options
+    udpipe['batch'] = batch
+    udpipe['model'] = load_model(model_path)
+    udpipe['pipeline'] = Pipeline(udpipe['model'], options[0], options[1], options[2], 'conllu')
+
+
+# the hash of the model and of the options, to be updated with the text
+def cache_key():
+    head = '\n'.join((udpipe['model_digest'],) + udpipe['options']) + '\n'
+    if udpipe['batch']:
+        head += 'batch=%s\n' % udpipe['batch']
+    return hashlib.sha1(head.encode('utf-8'))
+
+
+def cache_path(key):
+    return os.path.join(udpipe['cache'], key.hexdigest() + '.conllu')
+
+
+# the text of a file in batches of at least size characters that end at the end of a line, without the blank lines
+# at the start and at the end of the text (as read().strip()); yields (batch, whether it starts a paragraph)
+def text_batches(path, size, presegmented=False):
+    with open(path, 'r', errors='ignore', encoding="utf-8") as input_text:
+        batch, length, starts_par, blanks = [], 0, True, []
+        for line in input_text:
+            if not line.strip():
+                if batch:
+                    blanks.append(line)
+                continue
+            if batch and length >= size:
+                # the presegmented tokenizer gives the empty lines after a sentence to its last token and the blank
+                # lines from the first one with spaces on to the first token of the next paragraph, so these start
+                # the next batch; the other tokenizer gives all of them to the last token
+                keep = len(blanks)
+                if presegmented:
+                    keep = next((i for i, blank in enumerate(blanks) if blank != '\n'), keep)
+                yield ''.join(batch + blanks[:keep]), starts_par
+                batch, starts_par = blanks[keep:], bool(blanks)
+                length = sum(len(blank) for blank in batch)
+            elif not batch and starts_par:
+                line = line.lstrip()  # the first line of the text
+            else:
+                batch += blanks
+                length += sum(len(blank) for blank in blanks)
+            batch.append(line)
+            length += len(line)
+            blanks = []
+        if batch:
+            yield ''.join(batch).rstrip(), starts_par
+
+
+# parses the file batch by batch into out; UDPipe starts each batch as a new document numbered from 1,
+# so in the comments before the first sentence of the later batches the newdoc is left out, and so is the newpar
+# if the batch starts in the middle of a paragraph; the sent_ids are renumbered
+def parse_batches(path, out):
+    sent_id = 0
+    presegmented = udpipe['options'][0] == 'tokenizer=presegmented'
+    with open(out, 'w', encoding="utf-8") as udout:
+        for k, (batch, starts_par) in enumerate(text_batches(path, udpipe['batch'], presegmented)):
+            head = k > 0  # the first comment block of a later batch
+            for line in udpipe['pipeline'].process(batch).splitlines(True):
+                if not line.startswith('#'):
+                    head = False
+                elif head and (line.startswith('# newdoc') or (line.startswith('# newpar') and not starts_par)):
+                    continue
+                if line.startswith('# sent_id = '):
+                    sent_id += 1
+                    line = '# sent_id = %s\n' % sent_id
+                udout.write(line)
+
+
+# parses one file of the input folder into the output folder;
+# returns the file name and 'parsed', 'cached' (copied from the cache), 'unchanged' or None for an unreadable file
+def parse_file(job):
+    input_dir, output_dir, f = job
+    out = output_dir + f.replace('.txt', '.conllu')
+    key = cache_key() if udpipe['cache'] else None
+    if udpipe['batch']:
+        text = None
+        if key:
+            with open(input_dir + f, 'r', errors='ignore', encoding="utf-8") as input_text:
+                for line in input_text:
+                    key.update(line.encode('utf-8'))
+    else:
+        with open(input_dir + f, 'r', errors='ignore', encoding="utf-8") as input_text:
+            try:
+                text = input_text.read().strip()
+                # print(f'got text from {f}')
+            except UnicodeDecodeError:
+                return f, None
+        if key:
+            key.update(text.encode('utf-8'))
+
+    cached = cache_path(key) if key else None
+    if cached and os.path.exists(cached):
+        if os.path.exists(out) and filecmp.cmp(cached, out, shallow=False):
+            return f, 'unchanged'
+        shutil.copyfile(cached, out)
+        return f, 'cached'
+
+    if text is None:
+        parse_batches(input_dir + f, out)
+    else:
+        ud_tagged = udpipe['pipeline'].process(text)
+        with open(out, 'w', encoding="utf-8") as udout:
+            udout.write(ud_tagged,)
+    if cached:
+        # written under a temporary name first: two workers can parse the same text
+        tmp = '%s.%s.tmp' % (cached, os.getpid())
+        shutil.copyfile(out, tmp)
+        os.replace(tmp, cached)
+    return f, 'parsed'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', help="Path to prepared input files", required=True)
+    parser.add_argument('--output', help="Where you want the parsed texts", required=True)
+    # parser.add_argument('--model', default='get_feats/parsing/english-ewt-ud-2.5-191206.udpipe', help='Path to the lang model you want to use')
+    parser.add_argument('--model', default='get_feats/parsing/spanish-gsd-ud-2.5-191206.udpipe', help='Path to the lang model you want to use')
+    parser.add_argument('--jobs', default=1, type=int, help='Number of worker processes, each with its own copy of the model')
+    parser.add_argument('--cache', default=None, help='Folder with the parses by the hash of the text and of the model (none by default)')
+    parser.add_argument('--presegmented', action='store_true', help='The input has one sentence per line')
+    parser.add_argument('--stages', nargs='+', default=['tag', 'parse'], choices=['tag', 'parse'],
+                        help='UDPipe stages after the tokenizer (tag parse by default; tag to skip the parser, '
+                             'but the collectors need the trees)')
+    parser.add_argument('--batch', default=0, type=int,
+                        help='Parse each file in batches of about this many characters (0, the whole file at once, by default)')
+    args = parser.parse_args()
+
+    start = time.time()
+
+    parse_out = args.output
+    os.makedirs(parse_out, exist_ok=True)
+
+    model_digest = None
+    if args.cache:
+        os.makedirs(args.cache, exist_ok=True)
+        model_digest = file_digest(args.model)
+
+    if 'parse' in args.stages and 'tag' not in args.stages:
+        parser.error('--stages parse needs the tagger too: the parser uses its tags')
+    options = pipeline_options(args.presegmented, args.stages)
+
+    files = [f for f in os.listdir(args.input)]
+    jobs = [(args.input, args.output, f) for f in files]
+    try:
+        if args.jobs > 1:
+            # checked here: the pool would replace the workers that fail to load it forever
+            load_model(args.model)
+        else:
+            init_worker(args.model, args.cache, model_digest, options, args.batch)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    if args.jobs > 1:
+        # the files are handed out one by one to whichever worker is free, so long texts do not hold up the others
+        pool = Pool(args.jobs, initializer=init_worker, initargs=(args.model, args.cache, model_digest, options, args.batch))
+        results = pool.imap_unordered(parse_file, jobs)
+        print(f'UD model is loaded by each of {args.jobs} workers')
+    else:
+        pool = None
+        results = map(parse_file, jobs)
+        print('UD model is loaded')
+
+    counter = 0
+    statuses = {'parsed': 0, 'cached': 0, 'unchanged': 0}
+    for f, status in results:
+        if not status:
+            print('Unicode error in input file: %s; skipping it' % f)
+            continue
+        statuses[status] += 1
+        # !!! change the counter value!
+        counter += 1
+
+        # Monitor progress:
+        if counter % 10 == 0:
+            print(f'{counter} files processed')
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    end = time.time()
+    processing_time = int(end - start)
+    print(f'Processing {args.input} ({counter} files) took {(processing_time / 60):.2f} minites with {args.model} model '
+          f'in {args.jobs} processes')
+    if args.cache:
+        print(f'{statuses["parsed"]} parsed, {statuses["cached"]} copied from the cache, {statuses["unchanged"]} unchanged')
@@ -6,61 +6,14 @@ python3 wc_walks_UDfolders.py --root /path/to/folder/ --depth 2 --minlen 2
 """
 
 import os
+import sys
 from collections import defaultdict
 
 import argparse
 
-
-def wordcount(trees):
-    words = 0
-    for tree in trees:
-        words += len(tree)
-
-    return words
-
-
-def get_trees(data, min):  # data is one object: a text or all of corpus as one file
-    sentences0 = []
-    badsents = 0
-    only_punct = []
-    current_sentence = []
-    for line in data:
-        if line.strip() == '':
-            if current_sentence:
-                sentences0.append(current_sentence)
-
-            current_sentence = []
-            only_punct = []
-            continue
-
-        if line.strip().startswith('#'):
-            continue
-
-        res = line.strip().split('\t')
-        (identifier, token, lemma, upos, xpos, feats, head, rel, misc1, misc2) = res
-        if '.' in identifier or '-' in identifier:  # ignore empty nodes possible in the enhanced representations
-            continue
-
-        only_punct.append(res[3])
-
-        var = list(set(only_punct))
-        # throw away sentences consisting of punctuation marks only (ex. '.)')
-        # and of numeral and a punctuation (ex. '3.', 'II.')
-        if len(var) == 1 and var[0] == 'PUNCT':
-            badsents += 1
-            continue
-        if len(var) == 2 and 'PUNCT' in var and 'NUM' in var:
-            badsents += 1
-        else:
-            current_sentence.append((int(identifier), token, lemma, upos, xpos, feats, int(head), rel))
-
-    if current_sentence:
-        sentences0.append(current_sentence)
-
-    sentences = [s for s in sentences0 if len(s) >= min]
-    shorts = len(sentences0) - len(sentences)
-
-    return sentences, badsents, shorts
+# the conllu reader is shared with the feature extraction scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'get_feats', 'extraction'))
+from helpfunctions import read_trees
 
 
 if __name__ == "__main__":
@@ -91,15 +44,19 @@ if __name__ == "__main__":
                 corp_id = path_to_last_folder.split('/')[-1]
 
             try:
-                data = open(filepath, 'r', errors='replace').readlines()
-
-                sents, bad, short = get_trees(data, args.minlen)
-                tot_bad += bad
-                tot_short += short
+                # sentences are counted as they are read, without keeping the document in memory
+                stats = {}
+                normBy_wc = 0
+                sents_count = 0
+                with open(filepath, 'r', errors='replace') as f:
+                    for sent in read_trees(f, minlen=args.minlen, stats=stats):
+                        normBy_wc += len(sent)
+                        sents_count += 1
+                tot_bad += stats['bad']
+                tot_short += stats['short']
 
-                normBy_wc = wordcount(sents)
                 tot_wc[corp_id] += normBy_wc
-                tot_sents[corp_id] += len(sents)
+                tot_sents[corp_id] += sents_count
             except UnicodeDecodeError:
                 print(filepath)
 
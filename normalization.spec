@@ -0,0 +1,60 @@
+# how normalize.py (and mega_collector.py) turn the raw counts of a document into the features of the table
+# feature	numerator	denominator
+# the numerator is a raw column or a sum of raw columns (a+b); the denominator is a raw column or - (no division)
+# the raw columns are those of mega_collector.py --raw; the denominators are:
+# wc (words), sentnum (sentences by their endings), verbnum (VERB), sents (sentences read), comp_all (ADJ+ADV),
+# lex_to, nnargs_all (nsubj+obj+iobj)
+# the features come in the order of the columns of the table
+## muted features: passives interrog andor wdlength mark nn
+sentlength	sentlength	-
+ppron	ppron	wc
+possdet	possdet	wc
+indef	indef	wc
+cconj	cconj	sentnum
+whconj	whconj	sentnum
+relativ	relativ	sentnum
+pied	pied	sentnum
+correl	correl	sentnum
+copula	copula	sentnum
+attrib	attrib	sentnum
+pasttense	pasttense	sentnum
+lexdens	lex_ty	wc
+lexTTR	lex_ty	lex_to
+mquantif	mquantif	wc
+# need to normalize to number of finites when I get it :-)
+mpred	mpred	sentnum
+finites	finites	verbnum
+## alternatively normalize these three features by number of verbs using verbnum
+infs	infs	verbnum
+pverbals	pverbals	verbnum
+deverbals	deverbals	verbnum
+## maybe these two need to be counted as one feature
+bypassives	bypassives	sentnum
+longpassives	longpassives	sentnum
+sconj	sconj	sentnum
+## 5 semantic groups of DMs + counts for but (maybe merge them!)
+addit	addit	sentnum
+advers	advers	sentnum
+caus	caus	sentnum
+tempseq	tempseq	sentnum
+epist	epist+epist_stance	sentnum
+but	but	sentnum
+## degrees of comparison are normalized by the number of adj+adv, see comparison_degrees
+comp	comp	comp_all
+sup	sup	comp_all
+neg	neg	sentnum
+# average number of clauses per sentence and ratio of simple sentences in text, see sents_complexity
+numcls	numcls	sents
+simple	simple	sents
+demdets	demdets	wc
+nnargs	nnargs_nouns	nnargs_all
+mhd	mhd	sentnum
+mdd	mdd	sentnum
+## 7 UD features are averaged probabilities already, see ud_probabilities
+acl	acl	-
+aux	aux	-
+aux:pass	aux:pass	-
+ccomp	ccomp	-
+nsubj:pass	nsubj:pass	-
+parataxis	parataxis	-
+xcomp	xcomp	-
@@ -0,0 +1,76 @@
+'''
+turns the raw counts written by mega_collector.py --raw into the feature table as specified in normalization.spec;
+every feature is computed for all documents at once as an operation on the columns of the raw table,
+so that another normalisation does not need another extraction
+
+USAGE:
+python3 normalize.py --input raw.tsv --output out.tsv
+python3 normalize.py --input raw.tsv --output out_by_verbs.tsv --spec my_normalization.spec
+'''
+import os, sys
+import csv
+import argparse
+import numpy as np
+
+meta = ['afile', 'alang', 'akorp', 'astatus']
+default_spec = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'normalization.spec')
+
+
+## the spec is a list of (feature, numerator columns, denominator column or None), see normalization.spec
+def load_spec(path=default_spec):
+	spec = []
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			line = line.strip()
+			if not line or line.startswith('#'):
+				continue
+			feature, numerator, denominator = line.split()
+			spec.append((feature, numerator.split('+'), None if denominator == '-' else denominator))
+	return spec
+
+
+# raw is a dict of raw column -> value for one document or -> numpy array for all documents
+def normalize(raw, spec):
+	res = {}
+	for feature, numerator, denominator in spec:
+		value = raw[numerator[0]]
+		for col in numerator[1:]:
+			value = value + raw[col]
+		if denominator is not None:
+			value = value / raw[denominator]
+		res[feature] = value
+	return res
+
+
+def read_raw(path):
+	with open(path, newline='') as f:
+		rows = list(csv.reader(f, delimiter='\t'))
+	header, rows = rows[0], rows[1:]
+	columns = {}
+	for i, col in enumerate(header):
+		values = [row[i] for row in rows]
+		columns[col] = values if col in meta else np.array(values, dtype=float)
+	return columns
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--input', required=True, help="Path to the table of raw counts from mega_collector.py --raw")
+	parser.add_argument('--output', required=True, help="Path to, and name of, the resulting spreadsheet")
+	parser.add_argument('--spec', default=default_spec, help="Path to the normalisation spec")
+	args = parser.parse_args()
+	
+	spec = load_spec(args.spec)
+	raw = read_raw(args.input)
+	# zero denominators give nan or inf for the document instead of stopping the run
+	with np.errstate(divide='ignore', invalid='ignore'):
+		features = normalize(raw, spec)
+	keys = meta + [feature for feature, _, _ in spec]
+	columns = [raw[k] for k in meta] + [features[feature] for feature, _, _ in spec]
+	
+	with open(args.output, "w") as outfile:
+		writer = csv.writer(outfile, delimiter="\t")
+		writer.writerow(keys)
+		writer.writerows(zip(*columns))
+	
+	print('%s documents, %s features from %s' % (len(raw[meta[0]]), len(spec), args.spec), file=sys.stderr)